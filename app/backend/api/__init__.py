@@ -4,6 +4,11 @@ from .posts import posts_bp
 from .feed import feed_bp
 from .jobs import jobs_bp
 from .messaging import messaging_bp
+from .connections import connections_bp
+from .events import events_bp
+from .search import search_bp
+from .tags import tags_bp
+from .users import users_bp
 
 __all__ = [
     'auth_bp',
@@ -11,5 +16,10 @@ __all__ = [
     'posts_bp',
     'feed_bp',
     'jobs_bp',
-    'messaging_bp'
+    'messaging_bp',
+    'connections_bp',
+    'events_bp',
+    'search_bp',
+    'tags_bp',
+    'users_bp'
 ] 
\ No newline at end of file
@@ -2,11 +2,15 @@ from flask import Blueprint, request, jsonify, current_app
 from models.user import User, db
 from flask_jwt_extended import create_access_token
 from werkzeug.security import generate_password_hash
+from services.profiles import create_profile
+from services.search import index_person
+from services.sqlite import serialized_write
 import traceback
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/api/signup', methods=['POST'])
+@serialized_write
 def signup():
     try:
         print("🔵 Signup request received")
@@ -33,6 +37,9 @@ def signup():
         user = User(username=username, email=email)
         user.set_password(password)
         db.session.add(user)
+        db.session.flush()
+        create_profile(user)
+        index_person(user.id)
         db.session.commit()
         print("✅ User created successfully")
         return jsonify({"message": "User created"}), 201
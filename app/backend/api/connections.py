@@ -0,0 +1,102 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.connection import Connection
+from models.user import User, db
+from services.connections import MAX_STATUS_IDS, connection_status, connections_query, follow, unfollow
+from services.feed import schedule_author_fan_out
+from services.sqlite import serialized_write
+from utils.pagination import CursorPage, InvalidCursor
+
+connections_bp = Blueprint('connections', __name__)
+
+@connections_bp.route('/api/connections', methods=['GET'])
+@jwt_required()
+def get_connections():
+    """Get one page of the users someone follows (default) or is followed by"""
+    viewer_id = int(get_jwt_identity())
+    user_id = request.args.get('user_id', viewer_id, type=int)
+    direction = request.args.get('direction', 'following')
+    if direction not in ('following', 'followers'):
+        return jsonify({"message": "direction must be 'following' or 'followers'"}), 400
+
+    user = db.session.get(User, user_id)
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+
+    try:
+        page = CursorPage.from_args(request.args) or CursorPage()
+        rows = page.apply(connections_query(user_id, direction), Connection.created_at, Connection.id).all()
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
+
+    rows, next_cursor = page.finish(rows, key=lambda row: (row[0].created_at, row[0].id))
+    status = connection_status(viewer_id, [other.id for _, other in rows])
+
+    return jsonify({
+        "followers_count": user.followers_count,
+        "following_count": user.following_count,
+        "users": [{
+            "id": other.id,
+            "username": other.username,
+            "followers_count": other.followers_count,
+            "following_count": other.following_count,
+            "connected_at": connection.created_at,
+            **status[other.id]
+        } for connection, other in rows],
+        "next_cursor": next_cursor
+    }), 200
+
+@connections_bp.route('/api/connections', methods=['POST'])
+@jwt_required()
+@serialized_write
+def create_connection():
+    """Follow a user"""
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+
+    try:
+        followed_id = int(data.get('user_id'))
+    except (TypeError, ValueError):
+        return jsonify({"message": "user_id is required"}), 400
+    if followed_id == user_id:
+        return jsonify({"message": "You cannot follow yourself"}), 400
+    if not db.session.get(User, followed_id):
+        return jsonify({"message": "User not found"}), 404
+
+    created = follow(user_id, followed_id)
+    db.session.commit()
+
+    return jsonify({
+        "message": "Connected successfully" if created else "Already connected",
+        "following": True
+    }), 201 if created else 200
+
+@connections_bp.route('/api/connections/<int:followed_id>', methods=['DELETE'])
+@jwt_required()
+@serialized_write
+def remove_connection(followed_id):
+    """Unfollow a user"""
+    user_id = int(get_jwt_identity())
+
+    if not unfollow(user_id, followed_id):
+        return jsonify({"message": "Connection not found"}), 404
+    db.session.commit()
+    schedule_author_fan_out(followed_id)
+
+    return jsonify({"message": "Connection removed successfully", "following": False}), 200
+
+@connections_bp.route('/api/connections/status', methods=['GET'])
+@jwt_required()
+def get_connection_status():
+    """Relationship of the current user to each of `ids` (comma separated), in one query"""
+    user_id = int(get_jwt_identity())
+
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({"message": "ids must be comma separated integers"}), 400
+    if len(ids) > MAX_STATUS_IDS:
+        return jsonify({"message": f"At most {MAX_STATUS_IDS} ids per request"}), 400
+
+    status = connection_status(user_id, ids)
+    return jsonify({"status": {str(i): s for i, s in status.items()}}), 200
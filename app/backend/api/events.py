@@ -0,0 +1,41 @@
+import queue
+
+from flask import Blueprint, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.events import format_sse, get_broker
+
+events_bp = Blueprint('events', __name__)
+
+@events_bp.route('/api/events', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_events():
+    """Server-Sent Events stream of the current user's messages, likes and new posts"""
+    # EventSource cannot set headers, so browsers pass the JWT as ?token=
+    user_id = int(get_jwt_identity())
+    broker = get_broker()
+    heartbeat = current_app.config['EVENTS_HEARTBEAT_SECONDS']
+    
+    # Subscribe before returning so nothing published after this request is missed
+    subscription = broker.subscribe(user_id)
+    
+    # Deliberately not stream_with_context: the request (and its database
+    # session) is torn down as soon as streaming starts, and the stream may
+    # stay open for hours
+    def stream():
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while True:
+                try:
+                    message = subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comment frame keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(message)
+        finally:
+            broker.unsubscribe(user_id, subscription)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
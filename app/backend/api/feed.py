@@ -1,5 +1,28 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.post import Post
+from services.feed import timeline_post_ids
+from utils.pagination import CursorPage, InvalidCursor
+from api.posts import serialize_posts
 
 feed_bp = Blueprint('feed', __name__)
- 
-# Routes will be implemented here 
\ No newline at end of file
+
+@feed_bp.route('/api/feed', methods=['GET'])
+@jwt_required()
+def get_feed():
+    """Get one page of the current user's home timeline"""
+    user_id = int(get_jwt_identity())
+    
+    try:
+        page = CursorPage.from_args(request.args) or CursorPage()
+        post_ids = timeline_post_ids(user_id, page)
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
+    
+    posts = Post.query.filter(Post.id.in_(post_ids)).order_by(Post.created_at.desc(), Post.id.desc())
+    posts_data, next_cursor = page.finish(
+        serialize_posts(posts, user_id),
+        key=lambda post: (post["created_at"], post["id"])
+    )
+    
+    return jsonify({"posts": posts_data, "next_cursor": next_cursor}), 200
@@ -1,5 +1,81 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from models.job import Job, job_search_index
+from models.user import db
+from services.sqlite import serialized_write
+from utils.fulltext import search_terms
+from utils.pagination import CursorPage, InvalidCursor
+from utils.serializers import Serializer
 
 jobs_bp = Blueprint('jobs', __name__)
- 
-# Routes will be implemented here 
\ No newline at end of file
+
+serialize_job = Serializer(
+    id='id',
+    title='title',
+    company='company',
+    description='description',
+    location='location',
+    salary='salary',
+    requirements='requirements',
+    created_at='created_at',
+)
+
+@jobs_bp.route('/api/jobs', methods=['GET'])
+@jwt_required()
+def get_jobs():
+    """List jobs newest first, or rank them by relevance to `q`; filter by `company`/`location`"""
+    jobs = Job.query
+    if request.args.get('company'):
+        jobs = jobs.filter(Job.company == request.args['company'])
+    if request.args.get('location'):
+        jobs = jobs.filter(Job.location == request.args['location'])
+    terms = search_terms(request.args.get('q'))
+    
+    try:
+        page = CursorPage.from_args(request.args) or CursorPage()
+        if terms:
+            jobs, score = job_search_index.search(jobs, db.session.get_bind().dialect.name, terms)
+            rows = page.apply(jobs.add_columns(score), score, Job.id).all()
+            rows, next_cursor = page.finish(rows, key=lambda row: (row[1], row[0].id))
+            jobs_data = serialize_job.many(job for job, _ in rows)
+        else:
+            rows = page.apply(jobs, Job.created_at, Job.id).all()
+            rows, next_cursor = page.finish(rows, key=lambda job: (job.created_at, job.id))
+            jobs_data = serialize_job.many(rows)
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
+    
+    return jsonify({"jobs": jobs_data, "next_cursor": next_cursor}), 200
+
+@jobs_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Get a single job"""
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({"message": "Job not found"}), 404
+    return jsonify({"job": serialize_job(job)}), 200
+
+@jobs_bp.route('/api/jobs', methods=['POST'])
+@jwt_required()
+@serialized_write
+def create_job():
+    """Post a job; the search index is updated by the database in the same transaction"""
+    data = request.get_json(silent=True) or {}
+    
+    missing = [field for field in ('title', 'company', 'description') if not (data.get(field) or '').strip()]
+    if missing:
+        return jsonify({"message": f"Missing required fields: {', '.join(missing)}"}), 400
+    
+    job = Job(
+        title=data['title'].strip(),
+        company=data['company'].strip(),
+        description=data['description'],
+        location=data.get('location'),
+        salary=data.get('salary'),
+        requirements=data.get('requirements')
+    )
+    db.session.add(job)
+    db.session.commit()
+    
+    return jsonify({"message": "Job created successfully", "job": serialize_job(job)}), 201
@@ -1,5 +1,120 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.message import Message
+from models.user import User, db
+from services.messaging import history_query, inbox_query, is_member, mark_read, send_message
+from services.events import publish
+from services.sqlite import serialized_write
+from utils.pagination import CursorPage, InvalidCursor
+from utils.serializers import Field, Serializer
 
 messaging_bp = Blueprint('messaging', __name__)
- 
-# Routes will be implemented here 
\ No newline at end of file
+
+serialize_message = Serializer(
+    id='id',
+    conversation_id='conversation_id',
+    sender_id='sender_id',
+    receiver_id='receiver_id',
+    content='content',
+    timestamp='timestamp',
+    is_read=Field('is_read', bool),
+)
+
+@messaging_bp.route('/api/messages', methods=['GET'])
+@jwt_required()
+def get_inbox():
+    """Get one page of the current user's conversations, most recently active first"""
+    user_id = int(get_jwt_identity())
+    
+    try:
+        page = CursorPage.from_args(request.args) or CursorPage()
+        query, order_columns = inbox_query(user_id)
+        rows = page.apply(query, *order_columns).all()
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
+    
+    rows, next_cursor = page.finish(rows, key=lambda row: (row[0].last_message_at, row[0].conversation_id))
+    unread_total = db.session.query(User.unread_messages_count).filter(User.id == user_id).scalar()
+    
+    return jsonify({
+        "conversations": [{
+            "id": conversation.id,
+            "user": {"id": other.id, "username": other.username},
+            "unread_count": member.unread_count,
+            "last_message": serialize_message(last) if last else None,
+            "last_message_at": member.last_message_at
+        } for member, conversation, last, other in rows],
+        "unread_count": unread_total or 0,
+        "next_cursor": next_cursor
+    }), 200
+
+@messaging_bp.route('/api/messages', methods=['POST'])
+@jwt_required()
+@serialized_write
+def create_message():
+    """Send a message to another user"""
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+    
+    content = (data.get('content') or '').strip()
+    if not content:
+        return jsonify({"message": "Content is required"}), 400
+    try:
+        receiver_id = int(data.get('receiver_id'))
+    except (TypeError, ValueError):
+        return jsonify({"message": "receiver_id is required"}), 400
+    if receiver_id == user_id:
+        return jsonify({"message": "You cannot message yourself"}), 400
+    if not db.session.get(User, receiver_id):
+        return jsonify({"message": "User not found"}), 404
+    
+    message = send_message(user_id, receiver_id, content)
+    db.session.commit()
+    
+    message_data = serialize_message(message)
+    publish([receiver_id, user_id], 'message', message_data)
+    
+    return jsonify({"message": "Message sent", "data": message_data}), 201
+
+@messaging_bp.route('/api/messages/unread', methods=['GET'])
+@jwt_required()
+def get_unread_count():
+    """Get the current user's total unread message count"""
+    user_id = int(get_jwt_identity())
+    unread_total = db.session.query(User.unread_messages_count).filter(User.id == user_id).scalar()
+    return jsonify({"unread_count": unread_total or 0}), 200
+
+@messaging_bp.route('/api/messages/conversations/<int:conversation_id>', methods=['GET'])
+@jwt_required()
+def get_conversation(conversation_id):
+    """Get one page of a conversation's history, newest first"""
+    user_id = int(get_jwt_identity())
+    
+    if not is_member(conversation_id, user_id):
+        return jsonify({"message": "Conversation not found"}), 404
+    
+    try:
+        page = CursorPage.from_args(request.args) or CursorPage()
+        messages = page.apply(history_query(conversation_id), Message.timestamp, Message.id).all()
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
+    
+    messages, next_cursor = page.finish(messages, key=lambda m: (m.timestamp, m.id))
+    return jsonify({
+        "messages": serialize_message.many(messages),
+        "next_cursor": next_cursor
+    }), 200
+
+@messaging_bp.route('/api/messages/conversations/<int:conversation_id>/read', methods=['POST'])
+@jwt_required()
+@serialized_write
+def read_conversation(conversation_id):
+    """Mark a conversation as read for the current user"""
+    user_id = int(get_jwt_identity())
+    
+    if not mark_read(conversation_id, user_id):
+        return jsonify({"message": "Conversation not found"}), 404
+    db.session.commit()
+    
+    unread_total = db.session.query(User.unread_messages_count).filter(User.id == user_id).scalar()
+    return jsonify({"message": "Conversation marked as read", "unread_count": unread_total or 0}), 200
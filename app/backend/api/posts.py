@@ -2,6 +2,21 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User, db
 from models.post import Post, PostLike
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from services.cache import ANY_POST_TAG, cached_response, invalidate_tags, post_tag, tag_stamp, user_tag
+from services.conditional import conditional
+from services.events import publish
+from services.feed import fanout_audience, remove_post
+from services.search import index_post, unindex_post
+from services.tags import tag_post, untag_post
+from services.images import is_issued_url, schedule_derivatives, srcset_for
+from services.sqlite import serialized_write
+from services.tasks import enqueue
+from services.uploads import UploadRejected, receive_image_upload
+from utils.pagination import CursorPage, InvalidCursor
+from utils.serializers import Nested, Serializer
 import os
 import uuid
 from werkzeug.utils import secure_filename
@@ -11,17 +26,42 @@ posts_bp = Blueprint('posts', __name__)
 
 # Configure upload settings
 UPLOAD_FOLDER = 'uploads/post_photos'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 # Create upload directory if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+serialize_post = Serializer(
+    id='id',
+    content='content',
+    image_url='image_url',
+    image_srcset=lambda post: srcset_for(post.image_url, post.image_variants),
+    created_at='created_at',
+    user=Nested('author', Serializer(id='id', username='username')),
+    likes_count='likes_count',
+)
+
+def serialize_posts(posts_query, viewer_id):
+    """Serialize posts with their authors, like counts and the viewer's likes in two queries"""
+    posts = posts_query.options(joinedload(Post.author)).all()
+    
+    post_ids = [post.id for post in posts]
+    liked_ids = set()
+    if post_ids:
+        liked_ids = {
+            post_id for (post_id,) in db.session.query(PostLike.post_id).filter(
+                PostLike.user_id == viewer_id,
+                PostLike.post_id.in_(post_ids)
+            )
+        }
+    
+    posts_data = serialize_post.many(posts)
+    for post, data in zip(posts, posts_data):
+        data["liked_by_user"] = post.id in liked_ids
+    return posts_data
 
 @posts_bp.route('/api/posts', methods=['POST'])
 @jwt_required()
+@serialized_write
 def create_post():
     """Create a new post"""
     try:
@@ -30,20 +70,8 @@ def create_post():
         
         if not data or 'content' not in data:
             return jsonify({"message": "Content is required"}), 400
-        
-        # Ensure Post and PostLike tables exist
-        try:
-            inspector = db.inspect(db.engine)
-            if 'post' not in inspector.get_table_names():
-                print("🔧 Post table missing, creating it...")
-                Post.__table__.create(db.engine, checkfirst=True)
-                print("✅ Post table created!")
-            if 'post_like' not in inspector.get_table_names():
-                print("🔧 PostLike table missing, creating it...")
-                PostLike.__table__.create(db.engine, checkfirst=True)
-                print("✅ PostLike table created!")
-        except Exception as e:
-            print(f"⚠️  Error checking/creating Post tables: {e}")
+        if data.get('image_url') and not is_issued_url(data['image_url']):
+            return jsonify({"message": "image_url must be a photo uploaded through /api/posts/photo"}), 400
         
         user = User.query.get(user_id)
         if not user:
@@ -51,26 +79,32 @@ def create_post():
         
         post = Post(
             user_id=user_id,
+            author=user,
             content=data['content'],
             image_url=data.get('image_url')
         )
         db.session.add(post)
+        db.session.flush()
+        index_post(post)
+        tag_post(post)
+        audience = fanout_audience(user)
         db.session.commit()
+        invalidate_tags('posts', user_tag(user_id))
+        # Record the photo's variants on the post once the worker has them
+        schedule_derivatives(post.image_url, post_id=post.id)
+        # Timelines are written by the task worker; until then feeds merge the
+        # post in on read, and the worker's feed.sweep requeues a lost task
+        try:
+            enqueue('feed.fan_out', {'post_id': post.id}, key=f'fan-out:{post.id}')
+        except Exception as e:
+            print(f"⚠️ Could not queue fan-out of post {post.id}, leaving it to the sweep: {e}")
+        
+        post_data = {**serialize_post(post), "liked_by_user": False}
+        publish(audience, 'post', post_data)
         
         return jsonify({
             "message": "Post created successfully",
-            "post": {
-                "id": post.id,
-                "content": post.content,
-                "image_url": post.image_url,
-                "created_at": post.created_at.isoformat(),
-                "user": {
-                    "id": user.id,
-                    "username": user.username
-                },
-                "likes_count": 0,
-                "liked_by_user": False
-            }
+            "post": post_data
         }), 201
         
     except Exception as e:
@@ -83,66 +117,77 @@ def create_post():
             "error": str(e)
         }), 500
 
+def _post_tags(body):
+    return [post_tag(post["id"]) for post in body["posts"]]
+
+def _posts_version(posts_query, tags):
+    """Version of the rows a listing would return.
+
+    A page is stamped with its newest update, count and id sum (a delete can
+    keep the first two), over the LIMITed page only. A whole listing is
+    stamped with the cache tokens of `tags`, which every write to its posts
+    replaces, rather than aggregating the table on every request.
+    """
+    try:
+        page = CursorPage.from_args(request.args)
+        if page is None:
+            return (None, *tag_stamp(*tags, ANY_POST_TAG))
+        posts_query = page.apply(posts_query, Post.created_at, Post.id)
+    except InvalidCursor:
+        return None
+    rows = posts_query.with_entities(Post.id.label('id'), Post.updated_at.label('updated_at')).subquery()
+    newest, count, id_sum = db.session.execute(
+        select(func.max(rows.c.updated_at), func.count(rows.c.id), func.sum(rows.c.id))
+    ).one()
+    # No Last-Modified: a deleted post changes the listing without a newer updated_at
+    return None, newest, count, id_sum
+
 @posts_bp.route('/api/posts', methods=['GET'])
 @jwt_required()
+@conditional(lambda: _posts_version(Post.query.order_by(Post.created_at.desc()), ['posts']))
+@cached_response('POSTS_CACHE_TTL', tags=lambda: ['posts'], body_tags=_post_tags, overflow_tags=[ANY_POST_TAG])
 def get_posts():
-    """Get all posts"""
+    """Get all posts, or one page of them when `limit`/`cursor` is given"""
     user_id = int(get_jwt_identity())
     
-    posts = Post.query.order_by(Post.created_at.desc()).all()
-    
-    posts_data = []
-    for post in posts:
-        user = User.query.get(post.user_id)
-        likes_count = PostLike.query.filter_by(post_id=post.id).count()
-        liked_by_user = PostLike.query.filter_by(post_id=post.id, user_id=user_id).first() is not None
-        
-        posts_data.append({
-            "id": post.id,
-            "content": post.content,
-            "image_url": post.image_url,
-            "created_at": post.created_at.isoformat(),
-            "user": {
-                "id": user.id,
-                "username": user.username
-            },
-            "likes_count": likes_count,
-            "liked_by_user": liked_by_user
-        })
+    posts = Post.query.order_by(Post.created_at.desc())
     
-    return jsonify({"posts": posts_data}), 200
+    return _posts_response(posts, user_id)
 
 @posts_bp.route('/api/posts/user/<int:user_id>', methods=['GET'])
 @jwt_required()
+@conditional(lambda user_id: _posts_version(Post.query.filter_by(user_id=user_id).order_by(Post.created_at.desc()),
+                                            [user_tag(user_id)]))
+@cached_response('POSTS_CACHE_TTL', tags=lambda user_id: [user_tag(user_id)], body_tags=_post_tags,
+                 overflow_tags=[ANY_POST_TAG])
 def get_user_posts(user_id):
-    """Get posts by specific user"""
+    """Get posts by specific user, or one page of them when `limit`/`cursor` is given"""
     current_user_id = int(get_jwt_identity())
     
-    posts = Post.query.filter_by(user_id=user_id).order_by(Post.created_at.desc()).all()
+    posts = Post.query.filter_by(user_id=user_id).order_by(Post.created_at.desc())
     
-    posts_data = []
-    for post in posts:
-        user = User.query.get(post.user_id)
-        likes_count = PostLike.query.filter_by(post_id=post.id).count()
-        liked_by_user = PostLike.query.filter_by(post_id=post.id, user_id=current_user_id).first() is not None
+    return _posts_response(posts, current_user_id)
+
+def _posts_response(posts_query, viewer_id):
+    """Serialize a post listing, applying keyset pagination if requested"""
+    try:
+        page = CursorPage.from_args(request.args)
+        if page is None:
+            return jsonify({"posts": serialize_posts(posts_query, viewer_id)}), 200
         
-        posts_data.append({
-            "id": post.id,
-            "content": post.content,
-            "image_url": post.image_url,
-            "created_at": post.created_at.isoformat(),
-            "user": {
-                "id": user.id,
-                "username": user.username
-            },
-            "likes_count": likes_count,
-            "liked_by_user": liked_by_user
-        })
+        posts_query = page.apply(posts_query, Post.created_at, Post.id)
+        posts_data, next_cursor = page.finish(
+            serialize_posts(posts_query, viewer_id),
+            key=lambda post: (post["created_at"], post["id"])
+        )
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
     
-    return jsonify({"posts": posts_data}), 200
+    return jsonify({"posts": posts_data, "next_cursor": next_cursor}), 200
 
 @posts_bp.route('/api/posts/<int:post_id>/like', methods=['POST'])
 @jwt_required()
+@serialized_write
 def like_post(post_id):
     """Like or unlike a post"""
     user_id = int(get_jwt_identity())
@@ -150,22 +195,43 @@ def like_post(post_id):
     post = Post.query.get(post_id)
     if not post:
         return jsonify({"message": "Post not found"}), 404
+    author_id = post.user_id
     
-    existing_like = PostLike.query.filter_by(post_id=post_id, user_id=user_id).first()
+    # Try the unlike first so concurrent toggles can't double count: only the
+    # request whose DELETE removed the row decrements, and only the request
+    # whose INSERT won the unique constraint increments.
+    deleted = PostLike.query.filter_by(post_id=post_id, user_id=user_id).delete(synchronize_session=False)
     
-    if existing_like:
+    if deleted:
         # Unlike
-        db.session.delete(existing_like)
+        delta = -1
         action = "unliked"
     else:
         # Like
-        like = PostLike(post_id=post_id, user_id=user_id)
-        db.session.add(like)
+        try:
+            db.session.add(PostLike(post_id=post_id, user_id=user_id))
+            db.session.flush()
+            delta = 1
+        except IntegrityError:
+            # A concurrent request already liked it; nothing else is pending
+            db.session.rollback()
+            delta = 0
         action = "liked"
     
+    if delta:
+        db.session.execute(
+            update(Post).where(Post.id == post_id).values(likes_count=Post.likes_count + delta)
+        )
+    likes_count = db.session.execute(select(Post.likes_count).where(Post.id == post_id)).scalar()
     db.session.commit()
+    invalidate_tags(post_tag(post_id), ANY_POST_TAG)
     
-    likes_count = PostLike.query.filter_by(post_id=post_id).count()
+    publish([author_id, user_id], 'like', {
+        "post_id": post_id,
+        "user_id": user_id,
+        "liked": action == "liked",
+        "likes_count": likes_count
+    })
     
     return jsonify({
         "message": f"Post {action} successfully",
@@ -175,6 +241,7 @@ def like_post(post_id):
 
 @posts_bp.route('/api/posts/<int:post_id>', methods=['DELETE'])
 @jwt_required()
+@serialized_write
 def delete_post(post_id):
     """Delete a post"""
     user_id = int(get_jwt_identity())
@@ -183,12 +250,16 @@ def delete_post(post_id):
     if not post:
         return jsonify({"message": "Post not found or unauthorized"}), 404
     
-    # Delete associated likes first
+    # Delete associated likes and timeline entries first
     PostLike.query.filter_by(post_id=post_id).delete()
+    remove_post(post_id)
+    unindex_post(post_id)
+    untag_post(post)
     
     # Delete the post
     db.session.delete(post)
     db.session.commit()
+    invalidate_tags(post_tag(post_id), ANY_POST_TAG)
     
     return jsonify({"message": "Post deleted successfully"}), 200
 
@@ -206,53 +277,42 @@ def post_photo_options():
 def upload_post_photo():
     """Upload photo for a post"""
     try:
-        print(f"🔍 Post photo upload request - Method: {request.method}")
-        print(f"🔍 Request headers: {dict(request.headers)}")
-        print(f"🔍 Request files: {list(request.files.keys()) if request.files else 'No files'}")
+        # Don't touch request.files here: it would buffer the whole body
+        print(f"🔍 Post photo upload request - Content-Type: {request.content_type}, Content-Length: {request.content_length}")
         
         user_id = int(get_jwt_identity())
         print(f"🔍 User ID: {user_id}")
         
-        # Ensure upload directory exists
-        upload_folder = 'uploads/post_photos'
-        os.makedirs(upload_folder, exist_ok=True)
-
-        if 'photo' not in request.files:
+        # Stream the file into the upload folder, capped and sniffed
+        try:
+            upload = receive_image_upload('photo', UPLOAD_FOLDER)
+        except UploadRejected as e:
+            return jsonify({"message": e.message}), e.status
+        
+        if upload is None:
             return jsonify({"message": "No photo provided"}), 400
         
-        file = request.files['photo']
-        if file.filename == '':
-            return jsonify({"message": "No file selected"}), 400
+        # Generate unique filename, with the extension the content really has
+        stem = os.path.splitext(secure_filename(upload.filename))[0] or 'photo'
+        unique_filename = f"{user_id}_{uuid.uuid4().hex}_{stem}.{upload.extension}"
+        upload.save_as(os.path.join(UPLOAD_FOLDER, unique_filename))
         
-        # Validate file size (5MB limit)
-        max_size = 5 * 1024 * 1024  # 5MB
-        if file.content_length and file.content_length > max_size:
-            return jsonify({"message": "File too large. Maximum size is 5MB"}), 400
+        # Return the URL that can be accessed
+        photo_url = f"/uploads/post_photos/{unique_filename}"
         
-        if file and allowed_file(file.filename):
-            # Generate unique filename
-            filename = secure_filename(file.filename)
-            unique_filename = f"{user_id}_{uuid.uuid4().hex}_{filename}"
-            file_path = os.path.join(upload_folder, unique_filename)
-            
-            # Save the file
-            file.save(file_path)
-            
-            # Return the URL that can be accessed
-            photo_url = f"/uploads/post_photos/{unique_filename}"
-            
-            return jsonify({
-                "message": "Photo uploaded successfully",
-                "photo_url": photo_url
-            }), 201
-        else:
-            return jsonify({"message": "Invalid file type. Allowed: png, jpg, jpeg, gif"}), 400
+        # Thumbnails and WebP variants are built by the task worker
+        schedule_derivatives(photo_url)
+        
+        return jsonify({
+            "message": "Photo uploaded successfully",
+            "photo_url": photo_url
+        }), 201
             
     except Exception as e:
         import traceback
         print(f"🔴 Post photo upload error: {e}")
         print(f"🔴 Full traceback: {traceback.format_exc()}")
-        print(f"🔴 Request context: method={request.method}, headers={dict(request.headers)}, files={list(request.files.keys()) if request.files else 'No files'}")
+        print(f"🔴 Request context: method={request.method}, content_type={request.content_type}")
         return jsonify({
             "message": "Error uploading photo",
             "error": str(e)
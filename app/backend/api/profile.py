@@ -1,93 +1,33 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User, db
-from models.profile import Profile, Experience, Education, Achievement, ProfilePhoto
+from models.profile import Profile, Experience, Achievement, ProfilePhoto
+from services.blob_store import get_blob_store
+from services.images import schedule_derivatives, srcset_for
+from services.conditional import conditional
+from services.profiles import cached_profile, invalidate_profile, profile_version, touch_profile
+from services.search import index_person
+from services.sqlite import serialized_write
+from services.uploads import UploadRejected, receive_image_upload
 
 profile_bp = Blueprint('profile', __name__)
 
 @profile_bp.route('/api/profile', methods=['GET'])
 @jwt_required()
+@conditional(lambda: profile_version(int(get_jwt_identity())))
 def get_profile():
     """Get user profile"""
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
     
-    if not user:
-        return jsonify({"message": "User not found"}), 404
+    profile = cached_profile(user_id)
+    if profile is None:
+        return jsonify({"message": "Profile not found"}), 404
     
-    # Get or create profile
-    profile = Profile.query.filter_by(user_id=user_id).first()
-    if not profile:
-        profile = Profile(user_id=user_id, full_name=user.username)
-        db.session.add(profile)
-        db.session.commit()
-    
-    # Get related data (with error handling for missing tables)
-    try:
-        experiences = Experience.query.filter_by(profile_id=profile.id).all()
-    except Exception as e:
-        print(f"⚠️  Error loading experiences: {e}")
-        experiences = []
-    
-    try:
-        education = Education.query.filter_by(profile_id=profile.id).all()
-    except Exception as e:
-        print(f"⚠️  Error loading education: {e}")
-        education = []
-    
-    try:
-        achievements = Achievement.query.filter_by(profile_id=profile.id).all()
-    except Exception as e:
-        print(f"⚠️  Error loading achievements: {e}")
-        achievements = []
-    
-    try:
-        photos = ProfilePhoto.query.filter_by(profile_id=profile.id).all()
-    except Exception as e:
-        print(f"⚠️  Error loading photos: {e}")
-        photos = []
-    
-    return jsonify({
-        "profile": {
-            "id": profile.id,
-            "full_name": profile.full_name,
-            "bio": profile.bio,
-            "location": profile.location,
-
-            "experience": [{
-                "id": e.id,
-                "title": e.title,
-                "company": e.company,
-                "start_date": str(e.start_date) if e.start_date else None,
-                "end_date": str(e.end_date) if e.end_date else None,
-                "description": e.description
-            } for e in experiences],
-            "education": [{
-                "id": ed.id,
-                "school": ed.school,
-                "degree": ed.degree,
-                "field": ed.field_of_study,
-                "start_year": ed.start_year,
-                "end_year": ed.end_year
-            } for ed in education],
-            "achievements": [{
-                "id": a.id,
-                "title": a.title,
-                "description": a.description,
-                "date": a.date,
-                "image_url": a.image_url
-            } for a in achievements],
-            "photos": [{"id": p.id, "url": p.url} for p in photos]
-        },
-        "user": {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email
-        }
-    }), 200
+    return jsonify(profile), 200
 
 @profile_bp.route('/api/profile', methods=['PUT'])
 @jwt_required()
+@serialized_write
 def update_profile():
     """Update user profile"""
     user_id = int(get_jwt_identity())
@@ -105,8 +45,11 @@ def update_profile():
         profile.location = data['location']
     if 'full_name' in data:
         profile.full_name = data['full_name']
+    index_person(user_id)
+    touch_profile(user_id)
     
     db.session.commit()
+    invalidate_profile(user_id)
     
     return jsonify({"message": "Profile updated successfully"}), 200
 
@@ -114,6 +57,7 @@ def update_profile():
 
 @profile_bp.route('/api/profile/experience', methods=['POST'])
 @jwt_required()
+@serialized_write
 def add_experience():
     """Add experience to user profile"""
     user_id = int(get_jwt_identity())
@@ -135,7 +79,10 @@ def add_experience():
         description=data.get('description', '')
     )
     db.session.add(experience)
+    index_person(user_id)
+    touch_profile(user_id)
     db.session.commit()
+    invalidate_profile(user_id)
     
     return jsonify({
         "message": "Experience added successfully",
@@ -151,6 +98,7 @@ def add_experience():
 
 @profile_bp.route('/api/profile/experience/<int:exp_id>', methods=['DELETE'])
 @jwt_required()
+@serialized_write
 def remove_experience(exp_id):
     """Remove experience from user profile"""
     user_id = int(get_jwt_identity())
@@ -160,12 +108,16 @@ def remove_experience(exp_id):
         return jsonify({"message": "Experience not found"}), 404
     
     db.session.delete(experience)
+    index_person(user_id)
+    touch_profile(user_id)
     db.session.commit()
+    invalidate_profile(user_id)
     
     return jsonify({"message": "Experience removed successfully"}), 200
 
 @profile_bp.route('/api/profile/achievements', methods=['POST'])
 @jwt_required()
+@serialized_write
 def add_achievement():
     """Add achievement to user profile"""
     user_id = int(get_jwt_identity())
@@ -186,7 +138,9 @@ def add_achievement():
         image_url=data.get('image_url')
     )
     db.session.add(achievement)
+    touch_profile(user_id)
     db.session.commit()
+    invalidate_profile(user_id)
     
     return jsonify({
         "message": "Achievement added successfully",
@@ -201,6 +155,7 @@ def add_achievement():
 
 @profile_bp.route('/api/profile/achievements/<int:achievement_id>', methods=['DELETE'])
 @jwt_required()
+@serialized_write
 def remove_achievement(achievement_id):
     """Remove achievement from user profile"""
     user_id = int(get_jwt_identity())
@@ -210,7 +165,9 @@ def remove_achievement(achievement_id):
         return jsonify({"message": "Achievement not found"}), 404
     
     db.session.delete(achievement)
+    touch_profile(user_id)
     db.session.commit()
+    invalidate_profile(user_id)
     
     return jsonify({"message": "Achievement removed successfully"}), 200
 
@@ -228,42 +185,24 @@ def profile_photo_options():
 def upload_profile_photo():
     """Upload profile photo - supports both base64 data URLs and file uploads"""
     try:
-        print(f"🔍 Profile photo upload request - Method: {request.method}")
-        print(f"🔍 Request headers: {dict(request.headers)}")
-        print(f"🔍 Request files: {list(request.files.keys()) if request.files else 'No files'}")
-        print(f"🔍 Request JSON: {request.is_json}")
+        # Don't touch request.files here: it would buffer the whole body
+        print(f"🔍 Profile photo upload request - Content-Type: {request.content_type}, Content-Length: {request.content_length}")
         
         user_id = int(get_jwt_identity())
         print(f"🔍 User ID: {user_id}")
         
-        # Ensure upload directory exists
-        upload_folder = 'uploads/profile_photos'
-        import os
-        os.makedirs(upload_folder, exist_ok=True)
-        
         # Check if it's a file upload or base64 data URL
-        if 'photo' in request.files:
-            # Handle file upload
-            file = request.files['photo']
-            if file.filename == '':
-                return jsonify({"message": "No file selected"}), 400
-            
-            # Validate file type
-            allowed_extensions = {'png', 'jpg', 'jpeg', 'gif'}
-            if not ('.' in file.filename and 
-                   file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
-                return jsonify({"message": "Invalid file type. Allowed: png, jpg, jpeg, gif"}), 400
+        if request.mimetype == 'multipart/form-data':
+            # Handle file upload: stream it, capped and sniffed, into the blob store
+            store = get_blob_store()
+            try:
+                upload = receive_image_upload('photo', store.root)
+            except UploadRejected as e:
+                return jsonify({"message": e.message}), e.status
+            if upload is None:
+                return jsonify({"message": "No photo provided. Send either a file or photo_url in JSON"}), 400
             
-            # Generate unique filename and save
-            import uuid
-            from werkzeug.utils import secure_filename
-            
-            filename = secure_filename(file.filename)
-            unique_filename = f"{user_id}_{uuid.uuid4().hex}_{filename}"
-            file_path = os.path.join(upload_folder, unique_filename)
-            
-            file.save(file_path)
-            photo_url = f"/uploads/profile_photos/{unique_filename}"
+            photo_url = store.put_staged(upload)
             
         elif request.is_json:
             # Handle base64 data URL
@@ -271,11 +210,15 @@ def upload_profile_photo():
             if not data or 'photo_url' not in data:
                 return jsonify({"message": "photo_url is required"}), 400
             
-            photo_url = data['photo_url']
-            
             # Validate base64 data URL format
-            if not photo_url.startswith('data:image/'):
+            if not data['photo_url'].startswith('data:image/'):
                 return jsonify({"message": "Invalid photo format. Expected base64 data URL"}), 400
+            
+            # Decode into the content-addressed store; only the short URL goes in the row
+            try:
+                photo_url = get_blob_store().put_data_url(data['photo_url'])
+            except ValueError as e:
+                return jsonify({"message": str(e)}), 400
         else:
             return jsonify({"message": "No photo provided. Send either a file or photo_url in JSON"}), 400
         
@@ -289,17 +232,6 @@ def upload_profile_photo():
             db.session.add(profile)
             db.session.commit()
         
-        # Ensure ProfilePhoto table exists
-        try:
-            # Check if table exists, if not create it
-            inspector = db.inspect(db.engine)
-            if 'profile_photo' not in inspector.get_table_names():
-                print("🔧 ProfilePhoto table missing, creating it...")
-                ProfilePhoto.__table__.create(db.engine, checkfirst=True)
-                print("✅ ProfilePhoto table created!")
-        except Exception as e:
-            print(f"⚠️  Error checking/creating ProfilePhoto table: {e}")
-        
         # Remove existing photos
         try:
             existing_photos = ProfilePhoto.query.filter_by(profile_id=profile.id).all()
@@ -315,13 +247,18 @@ def upload_profile_photo():
             url=photo_url
         )
         db.session.add(photo)
+        touch_profile(user_id)
         db.session.commit()
+        invalidate_profile(user_id)
+        # Avatar-sized variants are built by the task worker, which records them on the photo
+        schedule_derivatives(photo.url, user_id=user_id)
         
         return jsonify({
             "message": "Profile photo uploaded successfully",
             "photo": {
                 "id": photo.id,
-                "url": photo.url
+                "url": photo.url,
+                "srcset": srcset_for(photo.url, photo.variants)
             }
         }), 201
         
@@ -329,7 +266,7 @@ def upload_profile_photo():
         import traceback
         print(f"🔴 Profile photo upload error: {e}")
         print(f"🔴 Full traceback: {traceback.format_exc()}")
-        print(f"🔴 Request context: method={request.method}, headers={dict(request.headers)}, files={list(request.files.keys()) if request.files else 'No files'}, is_json={request.is_json}")
+        print(f"🔴 Request context: method={request.method}, content_type={request.content_type}")
         db.session.rollback()
         return jsonify({
             "message": "Error uploading profile photo",
@@ -338,6 +275,7 @@ def upload_profile_photo():
 
 @profile_bp.route('/api/profile/photo', methods=['DELETE'])
 @jwt_required()
+@serialized_write
 def remove_profile_photo():
     """Remove profile photo"""
     try:
@@ -352,10 +290,12 @@ def remove_profile_photo():
             photos = ProfilePhoto.query.filter_by(profile_id=profile.id).all()
             for photo in photos:
                 db.session.delete(photo)
+            touch_profile(user_id)
             db.session.commit()
         except Exception as e:
             print(f"⚠️  Error removing photos: {e}")
             # Continue anyway
+        invalidate_profile(user_id)
         
         return jsonify({"message": "Profile photo removed successfully"}), 200
         
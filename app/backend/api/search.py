@@ -0,0 +1,99 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.post import Post
+from models.profile import Profile
+from models.search import SearchDocument
+from models.user import User, db
+from services.search import KINDS, facet_counts, ranked, typeahead
+from utils.fulltext import search_terms
+from utils.pagination import CursorPage, InvalidCursor
+from api.posts import serialize_posts
+
+search_bp = Blueprint('search', __name__)
+
+MAX_SUGGESTIONS = 10
+
+def _search_args():
+    """(terms, kind, error) from the query string; error is a response to return, or None"""
+    terms = search_terms(request.args.get('q'))
+    if not terms:
+        return None, None, (jsonify({"message": "q is required"}), 400)
+    kind = request.args.get('type') or None
+    if kind and kind not in KINDS:
+        return None, None, (jsonify({"message": f"type must be one of: {', '.join(KINDS)}"}), 400)
+    return terms, kind, None
+
+def _people(user_ids):
+    """Public person summaries by user id, in one query"""
+    if not user_ids:
+        return {}
+    people = {}
+    rows = db.session.query(User, Profile).outerjoin(Profile, Profile.user_id == User.id).filter(User.id.in_(user_ids))
+    for user, profile in rows:
+        people.setdefault(user.id, {
+            "id": user.id,
+            "username": user.username,
+            "full_name": profile.full_name if profile else None,
+            "bio": profile.bio if profile else None,
+            "location": profile.location if profile else None
+        })
+    return people
+
+@search_bp.route('/api/search', methods=['GET'])
+@jwt_required()
+def search():
+    """Rank posts and people by relevance to `q`, optionally of one `type`; the first page carries facet counts"""
+    user_id = int(get_jwt_identity())
+    terms, kind, error = _search_args()
+    if error:
+        return error
+
+    try:
+        page = CursorPage.from_args(request.args) or CursorPage()
+        documents, score = ranked(terms, kind)
+        rows = page.apply(documents.add_columns(score), score, SearchDocument.id).all()
+        rows, next_cursor = page.finish(rows, key=lambda row: (row[1], row[0].id))
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
+
+    post_ids = [document.ref_id for document, _ in rows if document.kind == 'post']
+    posts = {}
+    if post_ids:
+        posts = {post["id"]: post for post in serialize_posts(Post.query.filter(Post.id.in_(post_ids)), user_id)}
+    people = _people([document.ref_id for document, _ in rows if document.kind == 'person'])
+
+    results = []
+    for document, document_score in rows:
+        item = (posts if document.kind == 'post' else people).get(document.ref_id)
+        if item is not None:
+            results.append({"type": document.kind, "score": document_score, document.kind: item})
+
+    body = {"results": results, "next_cursor": next_cursor}
+    if not request.args.get('cursor'):
+        body["facets"] = facet_counts(terms)
+    return jsonify(body), 200
+
+@search_bp.route('/api/search/typeahead', methods=['GET'])
+@jwt_required()
+def search_typeahead():
+    """Suggestions while typing: every word of `q` is matched as a prefix"""
+    terms, kind, error = _search_args()
+    if error:
+        return error
+    limit = min(request.args.get('limit', 8, type=int), MAX_SUGGESTIONS)
+
+    matches = typeahead(terms, kind, max(limit, 1))
+    people = _people([document.ref_id for document, _ in matches if document.kind == 'person'])
+
+    suggestions = []
+    for document, score in matches:
+        if document.kind == 'person':
+            person = people.get(document.ref_id)
+            if person is None:
+                continue
+            suggestion = {"label": person["full_name"] or person["username"], "username": person["username"]}
+        else:
+            suggestion = {"label": document.body[:80]}
+        suggestions.append({"type": document.kind, "id": document.ref_id, "score": score, **suggestion})
+
+    return jsonify({"suggestions": suggestions}), 200
@@ -0,0 +1,41 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.post import Post
+from models.tag import PostTag
+from services.tags import normalize_tag, tagged_posts_query, trending
+from utils.pagination import CursorPage, InvalidCursor
+from api.posts import serialize_posts
+
+tags_bp = Blueprint('tags', __name__)
+
+MAX_TRENDING = 50
+
+@tags_bp.route('/api/tags/<tag>/posts', methods=['GET'])
+@jwt_required()
+def get_tag_posts(tag):
+    """Get one page of the posts using a hashtag, newest first"""
+    user_id = int(get_jwt_identity())
+    
+    try:
+        page = CursorPage.from_args(request.args) or CursorPage()
+        rows = page.apply(tagged_posts_query(tag), PostTag.created_at, PostTag.post_id).all()
+        rows, next_cursor = page.finish(rows, key=lambda row: (row.created_at, row.post_id))
+    except InvalidCursor as e:
+        return jsonify({"message": str(e)}), 400
+    
+    post_ids = [row.post_id for row in rows]
+    posts = Post.query.filter(Post.id.in_(post_ids)).order_by(Post.created_at.desc(), Post.id.desc())
+    posts_data = serialize_posts(posts, user_id) if post_ids else []
+    
+    return jsonify({"tag": normalize_tag(tag), "posts": posts_data, "next_cursor": next_cursor}), 200
+
+@tags_bp.route('/api/tags/trending', methods=['GET'])
+@jwt_required()
+def get_trending_tags():
+    """Get the most used hashtags of the trending window"""
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_TRENDING))
+    
+    return jsonify({
+        "tags": [{"tag": tag, "count": count} for tag, count in trending(limit)],
+        "window_hours": current_app.config['TRENDING_WINDOW_HOURS']
+    }), 200
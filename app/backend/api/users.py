@@ -0,0 +1,30 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from services.conditional import conditional
+from services.profiles import MAX_CARD_IDS, cached_cards, profile_version, public_profile
+
+users_bp = Blueprint('users', __name__)
+
+@users_bp.route('/api/users/<int:user_id>/profile', methods=['GET'])
+@jwt_required()
+@conditional(profile_version)
+def get_user_profile(user_id):
+    """Get another user's public profile"""
+    profile = public_profile(user_id)
+    if profile is None:
+        return jsonify({"message": "Profile not found"}), 404
+    return jsonify(profile), 200
+
+@users_bp.route('/api/users/cards', methods=['GET'])
+@jwt_required()
+def get_user_cards():
+    """Name, headline and avatar of each of `ids` (comma separated); unknown ids are left out"""
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({"message": "ids must be comma separated integers"}), 400
+    if len(ids) > MAX_CARD_IDS:
+        return jsonify({"message": f"At most {MAX_CARD_IDS} ids per request"}), 400
+
+    cards = cached_cards(ids)
+    return jsonify({"cards": {str(i): cards[i] for i in ids if i in cards}}), 200
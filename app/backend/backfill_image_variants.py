@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Queue image derivatives for posts and profile photos uploaded before they existed
+
+The image_variants migration only recorded derivatives already on disk, so
+older uploads were left with no variants and no derivatives task. This
+queues one for each of them; worker.py then writes the files and records
+the variants, and their srcsets pick them up.
+"""
+
+import sys
+from sqlalchemy import or_, select
+
+def backfill_image_variants(batch_size=500):
+    """Schedule derivatives for every /uploads image with no recorded variants, in id-ordered batches"""
+
+    from main import app
+    from models.user import db
+    from models.post import Post
+    from models.profile import Profile, ProfilePhoto
+    from services.images import Image, schedule_derivatives
+
+    if Image is None:
+        print("❌ Pillow is not installed, so no derivatives can be generated")
+        return False
+
+    print("🖼️ Queueing derivatives for images without variants...")
+
+    with app.app_context():
+        sources = [
+            ('posts', Post.id, select(Post.id, Post.image_url, Post.id).where(
+                Post.image_url.like('/uploads/%'),
+                or_(Post.image_variants.is_(None), Post.image_variants == '')
+            ), 'post_id'),
+            ('profile photos', ProfilePhoto.id, select(ProfilePhoto.id, ProfilePhoto.url, Profile.user_id).join(
+                Profile, Profile.id == ProfilePhoto.profile_id
+            ).where(
+                ProfilePhoto.url.like('/uploads/%'),
+                or_(ProfilePhoto.variants.is_(None), ProfilePhoto.variants == '')
+            ), 'user_id'),
+        ]
+
+        queued = 0
+        for label, id_column, query, owner in sources:
+            last_id = 0
+            while True:
+                batch = db.session.execute(
+                    query.where(id_column > last_id).order_by(id_column).limit(batch_size)
+                ).all()
+                if not batch:
+                    break
+                # Keys dedupe against tasks already queued for the same row
+                for _, url, owner_id in batch:
+                    queued += schedule_derivatives(url, **{owner: owner_id})
+                last_id = batch[-1][0]
+            print(f"🖼️ {label.capitalize()} checked")
+
+        print(f"✅ Queued derivatives for {queued} images")
+        return True
+
+if __name__ == "__main__":
+    batch = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    success = backfill_image_variants(batch)
+    if success:
+        print("✅ Image variant backfill queued; run worker.py to process it")
+    else:
+        print("❌ Image variant backfill failed!")
+        exit(1)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark bytes on the wire and CPU per request for typical feed pages
+
+Seeds `posts` posts from 50 authors, then fetches /api/posts pages of 20 and
+100 with no Accept-Encoding, gzip and br. "cold" drops the compressed
+variant LRU before every request, so each one pays for compressing; "warm"
+keeps it, as a page polled by many clients would. CPU is process time per
+request, which is what a worker spends, whatever the wall clock does.
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from common import load_app, make_user
+
+
+def seed(app, posts):
+    from models.post import Post
+    from models.user import User, db
+
+    rng = random.Random(7)
+    words = ('team shipped launch customers platform reliable mentor roadmap quality data services cloud mobile '
+             'growth learned today proud thanks everyone build hiring remote design').split()
+    with app.app_context():
+        users = [User(username=f'author{i}', email=f'author{i}@example.com', password_hash='x') for i in range(50)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.execute(Post.__table__.insert(), [{
+            'user_id': rng.choice(users).id,
+            'content': ' '.join(rng.choice(words) for _ in range(rng.randint(10, 60))) + ' #webdev',
+            'image_url': f'https://cdn.example.com/{i}.jpg' if i % 4 == 0 else None,
+            'likes_count': rng.randint(0, 300),
+        } for i in range(posts)])
+        db.session.commit()
+
+
+def measure(app, client, url, headers, accept, warm, samples):
+    request_headers = dict(headers, **({'Accept-Encoding': accept} if accept else {}))
+    sizes, cpu = [], []
+    for _ in range(samples):
+        if not warm:
+            app.extensions.pop('compression_cache', None)
+        start = time.process_time()
+        response = client.get(url, headers=request_headers)
+        cpu.append((time.process_time() - start) * 1000)
+        sizes.append(len(response.data))
+    return statistics.mean(sizes), statistics.mean(cpu)
+
+
+def bench_compression(posts=2000, samples=200):
+    app = load_app()
+    seed(app, posts)
+    _, headers = make_user(app, 'bench')
+    client = app.test_client()
+
+    for limit in (20, 100):
+        url = f'/api/posts?limit={limit}'
+        client.get(url, headers=headers)
+        identity_bytes, identity_cpu = measure(app, client, url, headers, None, True, samples)
+        print(f"📊 page of {limit}, uncompressed: {identity_bytes:,.0f} bytes, {identity_cpu:.3f}ms CPU")
+        for accept in ('gzip', 'br'):
+            for warm in (False, True):
+                size, cpu = measure(app, client, url, headers, accept, warm, samples)
+                print(f"📊 page of {limit}, {accept:<4} {'warm' if warm else 'cold'}: {size:,.0f} bytes "
+                      f"({size / identity_bytes:.0%}), {cpu:.3f}ms CPU ({cpu - identity_cpu:+.3f}ms)")
+
+
+if __name__ == "__main__":
+    bench_compression(*(int(arg) for arg in sys.argv[1:3]))
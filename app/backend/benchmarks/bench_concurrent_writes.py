@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent like/post writes from several processes on one SQLite file
+
+Each process stands in for a gunicorn worker: it loads the app on a shared
+database file and alternates POST /api/posts with like toggles on a shared
+post. The "before" run turns the SQLite profile off (rollback journal, no
+pragmas, no write lock); the "after" run uses the defaults from config.py.
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from common import report
+
+def _setup(queue, workers):
+    from common import load_app, make_user
+    from models.post import Post
+    from models.user import db
+
+    app = load_app()
+    users = [make_user(app, f'writer{i}') for i in range(workers)]
+    with app.app_context():
+        post = Post(content='Shared post', user_id=users[0][0])
+        db.session.add(post)
+        db.session.commit()
+        queue.put(([headers for _, headers in users], post.id))
+
+def _worker(headers, post_id, count, barrier, queue):
+    from common import load_app
+
+    client = load_app().test_client()
+    samples, failures = [], 0
+    barrier.wait()
+    for i in range(count):
+        start = time.perf_counter()
+        if i % 2:
+            response = client.post('/api/posts', headers=headers, json={'content': f'Concurrent post {i}'})
+        else:
+            response = client.post(f'/api/posts/{post_id}/like', headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        failures += response.status_code >= 500
+    queue.put((samples, failures))
+
+def run(label, workers, count, env):
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(env, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        queue = ctx.Queue()
+        setup = ctx.Process(target=_setup, args=(queue, workers))
+        setup.start()
+        all_headers, post_id = queue.get()
+        setup.join()
+
+        barrier = ctx.Barrier(workers)
+        procs = [ctx.Process(target=_worker, args=(h, post_id, count, barrier, queue)) for h in all_headers]
+        start = time.perf_counter()
+        for proc in procs:
+            proc.start()
+        results = [queue.get() for _ in procs]
+        elapsed = time.perf_counter() - start
+        for proc in procs:
+            proc.join()
+
+    samples = [s for worker_samples, _ in results for s in worker_samples]
+    failures = sum(f for _, f in results)
+    report(label, samples)
+    print(f"   {len(samples) / elapsed:.0f} writes/s, {failures} failed writes")
+
+def bench_concurrent_writes(workers=4, count=200):
+    run("before: default SQLite", workers, count, {'SQLITE_TUNING': '0', 'SQLITE_SERIALIZE_WRITES': '0'})
+    run("after: WAL + pragmas + serialized writes", workers, count, {'SQLITE_TUNING': '1', 'SQLITE_SERIALIZE_WRITES': '1'})
+
+if __name__ == "__main__":
+    bench_concurrent_writes(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /api/jobs search and listing over a large job board
+
+Seeds `count` synthetic jobs (100k by default) through the ORM table, so
+the full-text index is filled by the same triggers production uses, then
+times ranked keyword searches, filtered searches and listing pages against
+p95 targets.
+"""
+
+import random
+import sys
+import time
+
+from common import load_app, make_user, percentile, report, time_calls
+
+P95_TARGET_MS = {
+    'rare keyword': 20,
+    'two keywords': 50,
+    'keyword + location': 50,
+    'common keyword': 150,
+    'listing page': 10,
+    'company listing page 2': 10,
+}
+
+ROLES = ['Engineer', 'Developer', 'Designer', 'Analyst', 'Manager', 'Scientist', 'Architect', 'Consultant']
+SKILLS = ['Python', 'Go', 'Rust', 'React', 'SQL', 'Kubernetes', 'Spark', 'Flask', 'Django', 'TypeScript',
+          'Terraform', 'Figma', 'Excel', 'Tableau', 'Kafka', 'Swift', 'Kotlin', 'Elixir', 'Haskell', 'Scala']
+LEVELS = ['Junior', 'Senior', 'Staff', 'Principal', 'Lead']
+CITIES = ['Berlin', 'London', 'Austin', 'Remote', 'Lagos', 'Toronto', 'Sydney', 'Bangalore', 'Paris', 'Tokyo']
+FILLER = ('team product customers platform scale reliable ownership mentor roadmap quality data '
+          'services cloud mobile growth startup remote hybrid collaborate deliver design build').split()
+
+def seed_jobs(app, count):
+    from models.job import Job
+    from models.user import db
+
+    rng = random.Random(42)
+    companies = [f'Company {i}' for i in range(500)]
+    start = time.perf_counter()
+    with app.app_context():
+        batch = []
+        for i in range(count):
+            skill = rng.choice(SKILLS)
+            batch.append({
+                'title': f'{rng.choice(LEVELS)} {skill} {rng.choice(ROLES)}',
+                'company': rng.choice(companies),
+                'description': ' '.join(rng.choice(FILLER) for _ in range(40)) + f' {skill}',
+                'location': rng.choice(CITIES),
+                'requirements': ', '.join(rng.sample(SKILLS, 3)),
+            })
+            if len(batch) == 5000:
+                db.session.execute(Job.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(Job.__table__.insert(), batch)
+        # One job with a word nothing else uses, for the selective case
+        db.session.execute(Job.__table__.insert(), [{
+            'title': 'Quantum Cryptographer', 'company': 'Company 1', 'description': 'Zebrafish lab',
+            'location': 'Remote', 'requirements': 'Physics'
+        }])
+        db.session.commit()
+    print(f"🔧 Seeded {count} jobs in {time.perf_counter() - start:.1f}s")
+
+def bench_job_search(count=100_000, samples=200):
+    app = load_app()
+    seed_jobs(app, count)
+    _, headers = make_user(app, 'bench')
+    client = app.test_client()
+
+    page_two = client.get('/api/jobs?company=Company%207&limit=20', headers=headers).get_json()['next_cursor']
+    cases = {
+        'rare keyword': '/api/jobs?q=zebrafish&limit=20',
+        'two keywords': '/api/jobs?q=rust+kafka&limit=20',
+        'keyword + location': '/api/jobs?q=haskell&location=Tokyo&limit=20',
+        'common keyword': '/api/jobs?q=python&limit=20',
+        'listing page': '/api/jobs?limit=20',
+        'company listing page 2': f'/api/jobs?company=Company%207&limit=20&cursor={page_two}',
+    }
+
+    failed = []
+    for label, url in cases.items():
+        assert client.get(url, headers=headers).status_code == 200
+        durations = time_calls(lambda i: client.get(url, headers=headers), samples)
+        report(label, durations)
+        p95 = percentile(durations, 95)
+        target = P95_TARGET_MS[label]
+        print(f"   {'✅' if p95 <= target else '❌'} p95 {p95:.1f}ms (target {target}ms)")
+        if p95 > target:
+            failed.append(label)
+
+    return not failed
+
+if __name__ == "__main__":
+    ok = bench_job_search(*(int(arg) for arg in sys.argv[1:3]))
+    sys.exit(0 if ok else 1)
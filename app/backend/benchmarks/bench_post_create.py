@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /api/posts with and without per-request schema inspection
+
+The "before" run re-adds what create_post() used to do on every request
+(two get_table_names() catalog reads) in a before_request hook, so both
+runs go through the same handler otherwise.
+"""
+
+import sys
+
+from common import load_app, make_user, report, time_calls
+
+def bench_post_create(count=2000):
+    app = load_app()
+    from flask import request
+    from models.user import db
+    
+    state = {'inspect': False}
+    
+    @app.before_request
+    def per_request_inspection():
+        if state['inspect'] and request.endpoint == 'posts.create_post':
+            inspector = db.inspect(db.engine)
+            'post' in inspector.get_table_names()
+            'post_like' in inspector.get_table_names()
+    
+    _, headers = make_user(app, 'bench')
+    client = app.test_client()
+    
+    def create(i):
+        client.post('/api/posts', headers=headers, json={'content': f'Benchmark post {i}'})
+    
+    # Warm up connections and code paths
+    time_calls(create, 50)
+    
+    state['inspect'] = True
+    before = time_calls(create, count)
+    state['inspect'] = False
+    after = time_calls(create, count)
+    
+    report("create_post with per-request inspection", before)
+    report("create_post with boot-time verification", after)
+    saved = (sum(before) - sum(after)) / count
+    print(f"✅ Saved {saved:.3f}ms per post creation")
+
+if __name__ == "__main__":
+    bench_post_create(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /api/search/typeahead and /api/search over a million documents
+
+Seeds `people` users and `posts` posts (200k and 800k by default) together
+with their search documents, through the same builders and FTS triggers the
+write paths use, then times typeahead prefixes and ranked searches against
+p95 targets. Typeahead has to stay under 20ms however much a prefix matches.
+"""
+
+import random
+import sys
+import time
+
+from common import load_app, make_user, percentile, report, time_calls
+
+P95_TARGET_MS = {
+    'typeahead common prefix': 20,
+    'typeahead name prefix': 20,
+    'typeahead name + initial': 20,
+    'typeahead skill prefix, people only': 20,
+    'typeahead rare prefix': 20,
+    'typeahead people only, prefix mostly in posts': 20,
+    'search hashtag': 100,
+    'search name': 60,
+    'search rare word': 20,
+    'search common word, page 2': 100,
+}
+
+FIRST = ['James', 'Mary', 'Jane', 'John', 'Ada', 'Grace', 'Linus', 'Amara', 'Wei', 'Priya', 'Diego', 'Fatima',
+         'Olga', 'Kenji', 'Chidi', 'Sofia', 'Liam', 'Noor', 'Mateo', 'Yuki']
+LAST = ['Smith', 'Doe', 'Okafor', 'Chen', 'Patel', 'Garcia', 'Kowalski', 'Haddad', 'Tanaka', 'Novak', 'Silva',
+        'Jensen', 'Mensah', 'Kim', 'Rossi', 'Ivanova', 'Nguyen', 'Adeyemi', 'Lopez', 'Schmidt']
+SKILLS = ['Python', 'Go', 'Rust', 'React', 'SQL', 'Kubernetes', 'Spark', 'Flask', 'Django', 'TypeScript',
+          'Terraform', 'Figma', 'Excel', 'Tableau', 'Kafka', 'Swift', 'Kotlin', 'Elixir', 'Haskell', 'Scala']
+TAGS = ['webdev', 'python', 'hiring', 'opentowork', 'design', 'startup', 'ai', 'devops', 'career', 'remote']
+FILLER = ('team product customers platform scale reliable ownership mentor roadmap quality data services '
+          'cloud mobile growth shipped launch learned today week proud thanks everyone build').split()
+
+
+def seed(app, people, posts):
+    from models.post import Post
+    from models.search import SearchDocument
+    from models.user import User, db
+    from services.search import person_document, post_document
+
+    rng = random.Random(42)
+    companies = [f'Company{i}' for i in range(500)]
+    start = time.perf_counter()
+    with app.app_context():
+        first_user = db.session.query(db.func.coalesce(db.func.max(User.id), 0)).scalar() + 1
+        next_user, next_post = first_user, 1
+        # Sign-ups and posts interleave over time, as they do in production
+        rounds = max(people, posts) // 1000 + 1
+        for _ in range(rounds):
+            users, rows, documents = [], [], []
+            for user_id in range(next_user, min(next_user + people // rounds + 1, first_user + people)):
+                full_name = f'{rng.choice(FIRST)} {rng.choice(LAST)}'
+                username = f'user{user_id}'
+                users.append({'id': user_id, 'username': username, 'email': f'{username}@example.com',
+                              'password_hash': 'x'})
+                documents.append({'kind': 'person', 'ref_id': user_id, **person_document(
+                    username, full_name, 'Working on ' + ' '.join(rng.choice(FILLER) for _ in range(8)),
+                    rng.sample(SKILLS, 3), [rng.choice(companies)])})
+            next_user += len(users)
+            for post_id in range(next_post, min(next_post + posts // rounds + 1, posts + 1)):
+                content = ' '.join(rng.choice(FILLER) for _ in range(20)) + f' #{rng.choice(TAGS)}'
+                rows.append({'id': post_id, 'user_id': rng.randrange(first_user, next_user), 'content': content,
+                             'likes_count': 0, 'fanned_out': True})
+                documents.append({'kind': 'post', 'ref_id': post_id, **post_document(content)})
+            next_post += len(rows)
+            if users:
+                db.session.execute(User.__table__.insert(), users)
+            if rows:
+                db.session.execute(Post.__table__.insert(), rows)
+            rng.shuffle(documents)
+            db.session.execute(SearchDocument.__table__.insert(), documents)
+
+        # One post with a word nothing else uses, for the selective case
+        db.session.execute(Post.__table__.insert(), [{'id': next_post, 'user_id': first_user,
+                                                      'content': 'Zebrafish genome', 'likes_count': 0}])
+        db.session.execute(SearchDocument.__table__.insert(), [{'kind': 'post', 'ref_id': next_post,
+                                                                **post_document('Zebrafish genome')}])
+        db.session.commit()
+    print(f"🔧 Seeded {next_user - first_user} people and {next_post - 1} posts in {time.perf_counter() - start:.1f}s")
+
+
+def bench_search(people=200_000, posts=800_000, samples=200):
+    app = load_app()
+    seed(app, people, posts)
+    _, headers = make_user(app, 'bench')
+    client = app.test_client()
+
+    page_two = client.get('/api/search?q=team&limit=20', headers=headers).get_json()['next_cursor']
+    cases = {
+        'typeahead common prefix': '/api/search/typeahead?q=te',
+        'typeahead name prefix': '/api/search/typeahead?q=ja',
+        'typeahead name + initial': '/api/search/typeahead?q=grace+ok',
+        'typeahead skill prefix, people only': '/api/search/typeahead?q=kube&type=person',
+        'typeahead rare prefix': '/api/search/typeahead?q=zebra',
+        'typeahead people only, prefix mostly in posts': '/api/search/typeahead?q=te&type=person',
+        'search hashtag': '/api/search?q=%23opentowork&type=post&limit=20',
+        'search name': '/api/search?q=amara+haddad&type=person&limit=20',
+        'search rare word': '/api/search?q=zebrafish&limit=20',
+        'search common word, page 2': f'/api/search?q=team&limit=20&cursor={page_two}',
+    }
+
+    failed = []
+    for label, url in cases.items():
+        assert client.get(url, headers=headers).status_code == 200
+        durations = time_calls(lambda i: client.get(url, headers=headers), samples)
+        report(label, durations)
+        p95 = percentile(durations, 95)
+        target = P95_TARGET_MS[label]
+        print(f"   {'✅' if p95 <= target else '❌'} p95 {p95:.1f}ms (target {target}ms)")
+        if p95 > target:
+            failed.append(label)
+
+    return not failed
+
+
+if __name__ == "__main__":
+    ok = bench_search(*(int(arg) for arg in sys.argv[1:4]))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark serializing 10k posts: hand-built dicts + stdlib JSON vs compiled serializers + orjson
+
+The "before" run is what serialize_posts() and jsonify used to do: a dict
+literal per post with .isoformat() for the timestamp, encoded by Flask's
+stdlib provider (sorted keys). The "after" run is serialize_post.many()
+encoded by the app's JSON provider. Both start from the same loaded rows, so
+only serialization is timed.
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from common import load_app, report, time_calls
+
+
+def bench_serialization(count=10_000, runs=30):
+    app = load_app()
+    from flask.json.provider import DefaultJSONProvider
+    from models.post import Post
+    from models.user import User
+    from api.posts import serialize_post
+    from services.images import srcset_for
+
+    authors = [User(id=i, username=f'user{i}') for i in range(100)]
+    start = datetime(2026, 1, 1)
+    posts = [Post(id=i, content=f'Post number {i} about #webdev and shipping things', author=authors[i % 100],
+                  image_url=f'https://cdn.example.com/{i}.jpg' if i % 3 == 0 else None,
+                  created_at=start + timedelta(seconds=i), likes_count=i % 50) for i in range(count)]
+    liked_ids = set(range(0, count, 7))
+    stdlib = DefaultJSONProvider(app)
+
+    def before(_):
+        stdlib.dumps({"posts": [{
+            "id": post.id,
+            "content": post.content,
+            "image_url": post.image_url,
+            "image_srcset": srcset_for(post.image_url),
+            "created_at": post.created_at.isoformat(),
+            "user": {
+                "id": post.author.id,
+                "username": post.author.username
+            },
+            "likes_count": post.likes_count,
+            "liked_by_user": post.id in liked_ids
+        } for post in posts]})
+
+    def after(_):
+        posts_data = serialize_post.many(posts)
+        for post, data in zip(posts, posts_data):
+            data["liked_by_user"] = post.id in liked_ids
+        app.json.dumps({"posts": posts_data})
+
+    with app.app_context():
+        before_ms = time_calls(before, runs)
+        after_ms = time_calls(after, runs)
+        assert app.json.loads(app.json.dumps({"posts": serialize_post.many(posts[:1])}))["posts"][0]["created_at"] \
+            == posts[0].created_at.isoformat()
+
+    report(f"{count} posts, dict literals + stdlib json", before_ms)
+    report(f"{count} posts, serializer + {type(app.json).__name__}", after_ms)
+    speedup = sum(before_ms) / sum(after_ms)
+    print(f"{'✅' if speedup > 1 else '❌'} {speedup:.1f}x faster")
+    return speedup > 1
+
+
+if __name__ == "__main__":
+    ok = bench_serialization(*(int(arg) for arg in sys.argv[1:3]))
+    sys.exit(0 if ok else 1)
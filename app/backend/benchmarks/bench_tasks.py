@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark the background task queue: jobs per second in and out
+
+Enqueues `count` no-op tasks (with and without idempotency keys), then
+drains them with one worker at several batch sizes and with several worker
+threads sharing the queue file, which is the claim contention several
+worker processes see. Last, times POST /api/posts for an author with
+`followers` followers, now that fan-out is queued, against the worker's
+time to run that fan-out.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from common import load_app, make_user, percentile, report, time_calls
+
+# A scratch queue, so the benchmark never touches instance/tasks.db
+os.environ['TASK_QUEUE_PATH'] = os.path.join(tempfile.mkdtemp(), 'tasks.db')
+
+
+def drain(app, threads, batch_size):
+    from services.tasks import Worker
+
+    app.config['TASK_BATCH_SIZE'] = batch_size
+    counts = []
+
+    def work():
+        counts.append(Worker(app).run_until_idle())
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts), time.perf_counter() - start
+
+
+def bench_queue(app, count):
+    from services.tasks import HANDLERS, enqueue
+
+    HANDLERS['bench.noop'] = lambda **payload: None
+    with app.app_context():
+        for label, key in (('enqueue', None), ('enqueue with idempotency key', 'bench:{}')):
+            start = time.perf_counter()
+            for i in range(count):
+                enqueue('bench.noop', {'n': i}, key=key and key.format(i))
+            elapsed = time.perf_counter() - start
+            print(f"📊 {label}: {count / elapsed:,.0f} jobs/s")
+            ran, elapsed = drain(app, 1, 100)
+            assert ran == count
+
+        for threads, batch_size in ((1, 1), (1, 20), (1, 100), (2, 20), (4, 20)):
+            for i in range(count):
+                enqueue('bench.noop', {'n': i})
+            ran, elapsed = drain(app, threads, batch_size)
+            assert ran == count
+            print(f"📊 run, {threads} worker thread(s), batches of {batch_size}: {ran / elapsed:,.0f} jobs/s")
+
+
+def bench_fan_out(app, followers, samples):
+    from models.connection import Connection
+    from models.user import User, db
+    from services.tasks import Worker
+
+    author_id, headers = make_user(app, 'author')
+    with app.app_context():
+        users = [User(username=f'follower{i}', email=f'follower{i}@example.com', password_hash='x')
+                 for i in range(followers)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all(Connection(follower_id=user.id, followed_id=author_id) for user in users)
+        db.session.get(User, author_id).followers_count = followers
+        db.session.commit()
+
+    client = app.test_client()
+    app.config['TASK_BATCH_SIZE'] = 1
+    worker = Worker(app)
+    create = time_calls(lambda i: client.post('/api/posts', headers=headers, json={'content': f'Post {i}'}),
+                        samples)
+    fan_out = time_calls(lambda i: worker.run_once(), samples)
+    report(f"create_post, {followers} followers, fan-out queued", create)
+    report(f"worker fan-out to {followers + 1} timelines", fan_out)
+    print(f"✅ {percentile(fan_out, 50):.1f}ms of p50 work per post moved off the request path")
+
+
+def bench_tasks(count=5000, followers=1000, samples=100):
+    app = load_app()
+    bench_queue(app, count)
+    bench_fan_out(app, followers, samples)
+
+
+if __name__ == "__main__":
+    bench_tasks(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,65 @@
+"""
+Shared setup for the backend benchmarks: the Flask app on a scratch database
+"""
+
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+
+# In-memory SQLite unless the caller points the benchmark somewhere else
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+
+def load_app():
+    """Import the app with rate limiting off and the schema created"""
+    from main import app, limiter
+    from models.user import db
+    
+    limiter.enabled = False
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def make_user(app, username):
+    """Create a user and return (user_id, auth headers)"""
+    from flask_jwt_extended import create_access_token
+    from models.user import User, db
+    
+    with app.app_context():
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+        return user.id, {'Authorization': f'Bearer {token}'}
+
+
+def time_calls(fn, count):
+    """Call fn `count` times and return per-call durations in milliseconds"""
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, samples):
+    """Print mean/p50/p95/p99 for a list of millisecond samples"""
+    print(f"📊 {label}: n={len(samples)} "
+          f"mean={statistics.mean(samples):.3f}ms "
+          f"p50={percentile(samples, 50):.3f}ms "
+          f"p95={percentile(samples, 95):.3f}ms "
+          f"p99={percentile(samples, 99):.3f}ms")
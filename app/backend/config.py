@@ -5,34 +5,152 @@ class Config:
     # Flask
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev')
     
-    # Database - Production configuration for Render
-    # Use SQLite for now to avoid PostgreSQL compatibility issues
+    # Database - SQLite by default, PostgreSQL when DATABASE_URL points at one
     database_url = os.environ.get('DATABASE_URL', 'sqlite:///instance/app.db')
     
-    # Force SQLite for now to avoid psycopg compatibility issues
-    if database_url.startswith('postgres://') or database_url.startswith('postgresql://'):
-        print("⚠️ PostgreSQL detected, but using SQLite for compatibility")
-        database_url = 'sqlite:///instance/app.db'
+    # Render/Heroku hand out postgres:// URLs; pin the psycopg (v3) driver
+    if database_url.startswith('postgres://'):
+        database_url = 'postgresql://' + database_url[len('postgres://'):]
+    if database_url.startswith('postgresql://'):
+        database_url = 'postgresql+psycopg://' + database_url[len('postgresql://'):]
     
     # Ensure instance directory exists
-    import os
     instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
     if not os.path.exists(instance_path):
         os.makedirs(instance_path, exist_ok=True)
         print(f"✅ Created instance directory: {instance_path}")
     
-    # Use absolute path for SQLite database
-    if database_url.startswith('sqlite:///'):
-        db_path = os.path.join(instance_path, 'app.db')
+    # Resolve relative SQLite paths against the backend directory, not the cwd
+    if database_url.startswith('sqlite:///') and not database_url.startswith('sqlite:////'):
+        db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), database_url[len('sqlite:///'):])
         database_url = f'sqlite:///{db_path}'
         print(f"🔧 Using absolute database path: {db_path}")
     
     SQLALCHEMY_DATABASE_URI = database_url
+    
+    # Connection pool for server databases, sized from what one gunicorn
+    # worker runs at once: GUNICORN_THREADS requests for sync and gthread
+    # workers, up to GUNICORN_WORKER_CONNECTIONS greenlets for gevent ones.
+    # Each worker gets at most DB_MAX_CONNECTIONS // WEB_CONCURRENCY
+    # connections so a deploy never exhausts the server. A gevent worker
+    # keeps that whole share open, and greenlets beyond it wait up to
+    # DB_POOL_TIMEOUT seconds for a connection; idle /api/events streams
+    # hold none. Only one worker by default while the 'local' events broker,
+    # which reaches the streams of its own process alone, is in use.
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1 if os.environ.get('EVENTS_BACKEND', 'local') == 'local' else 2))
+    GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+    GUNICORN_WORKER_CONNECTIONS = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 2000))
+    GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 1))
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 20))
+    # Kept below the gunicorn worker timeout so a runaway query fails cleanly
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 25000))
+    
+    if database_url.startswith('postgresql'):
+        _per_worker = max(1, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)
+        if GUNICORN_WORKER_CLASS == 'gevent':
+            _pool_size = min(GUNICORN_WORKER_CONNECTIONS, _per_worker)
+        else:
+            _pool_size = min(GUNICORN_THREADS + 1, _per_worker)
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', _pool_size)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', _per_worker - _pool_size)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'pool_pre_ping': True,
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            'connect_args': {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'},
+        }
+    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # SQLite production profile (services.sqlite): pragmas on every connection
+    # and a cross-process lock that queues writers instead of letting them fail
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') != '0'
+    SQLITE_SERIALIZE_WRITES = os.environ.get('SQLITE_SERIALIZE_WRITES', '1') != '0'
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # negative means KiB: 64MB per connection
+        'temp_store': 'MEMORY',
+    }
+    
+    # Uploads: whole-request cap enforced by Flask, per-photo cap by services.uploads
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 8 * 1024 * 1024))
+    MAX_PHOTO_BYTES = int(os.environ.get('MAX_PHOTO_BYTES', 5 * 1024 * 1024))
+    
+    # Who streams /uploads bytes: unset (gunicorn worker), 'x-sendfile' or 'x-accel'
+    UPLOADS_SENDFILE_MODE = os.environ.get('UPLOADS_SENDFILE_MODE') or None
+    USE_X_SENDFILE = UPLOADS_SENDFILE_MODE == 'x-sendfile'
+    # For 'x-accel': nginx internal locations aliased to the uploads directory
+    # and, when BLOB_STORE_ROOT moves it elsewhere, to the blob store
+    UPLOADS_ACCEL_PREFIX = os.environ.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads')
+    BLOBS_ACCEL_PREFIX = os.environ.get('BLOBS_ACCEL_PREFIX', '/protected-blobs')
+    UPLOADS_ACCEL_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+    
+    # Home feed: authors with a bigger audience skip fan-out-on-write; posts
+    # younger than FEED_PENDING_SECONDS are merged on read until the worker
+    # has fanned them out, and every FEED_SWEEP_SECONDS the worker requeues
+    # fan-out for posts older than that whose task was lost
+    FEED_FANOUT_LIMIT = int(os.environ.get('FEED_FANOUT_LIMIT', 1000))
+    FEED_PENDING_SECONDS = int(os.environ.get('FEED_PENDING_SECONDS', 600))
+    FEED_SWEEP_SECONDS = int(os.environ.get('FEED_SWEEP_SECONDS', 60))
+    
+    # Trending hashtags (services.tags): window summed from hourly counters,
+    # and how long counters are kept before they are pruned
+    TRENDING_WINDOW_HOURS = int(os.environ.get('TRENDING_WINDOW_HOURS', 24))
+    TRENDING_RETENTION_HOURS = int(os.environ.get('TRENDING_RETENTION_HOURS', 7 * 24))
+
+    # Payload cache (services.cache): the LRU tier in each process, the tier
+    # shared by workers ('sqlite', 'redis' or empty for none) and entry TTLs.
+    # Writes invalidate by tag, so TTLs only bound how long unused entries live
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    CACHE_SHARED_BACKEND = os.environ.get('CACHE_SHARED_BACKEND', 'sqlite')
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH', os.path.join(instance_path, 'cache.db'))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 300))
+    POSTS_CACHE_TTL = int(os.environ.get('POSTS_CACHE_TTL', 60))
+
+    # Response compression (services.compression): smallest body worth
+    # compressing, gzip level (1-9), brotli quality (0-11), and the LRU of
+    # compressed responses kept per body digest
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+    COMPRESS_CACHE_ENTRIES = int(os.environ.get('COMPRESS_CACHE_ENTRIES', 1000))
+    COMPRESS_CACHE_TTL = int(os.environ.get('COMPRESS_CACHE_TTL', 300))
+
+    # Background tasks (services.tasks, run by worker.py): queue backend and
+    # file, how many tasks a worker leases at once and for how long, retry
+    # budget and backoff, idle polling, and how long finished tasks (and so
+    # their idempotency keys) are kept
+    TASK_QUEUE_BACKEND = os.environ.get('TASK_QUEUE_BACKEND', 'sqlite')
+    TASK_QUEUE_PATH = os.environ.get('TASK_QUEUE_PATH', os.path.join(instance_path, 'tasks.db'))
+    TASK_BATCH_SIZE = int(os.environ.get('TASK_BATCH_SIZE', 20))
+    TASK_VISIBILITY_TIMEOUT = int(os.environ.get('TASK_VISIBILITY_TIMEOUT', 300))
+    TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', 5))
+    TASK_RETRY_BASE_DELAY = float(os.environ.get('TASK_RETRY_BASE_DELAY', 2))
+    TASK_RETRY_MAX_DELAY = float(os.environ.get('TASK_RETRY_MAX_DELAY', 600))
+    TASK_POLL_SECONDS = float(os.environ.get('TASK_POLL_SECONDS', 0.5))
+    TASK_RETENTION_SECONDS = int(os.environ.get('TASK_RETENTION_SECONDS', 24 * 3600))
+
+    # Real-time events (services.events): broker backend ('local' for a single
+    # worker, 'redis' across workers) and SSE keepalive interval
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'local')
+    EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL', os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    EVENTS_HEARTBEAT_SECONDS = int(os.environ.get('EVENTS_HEARTBEAT_SECONDS', 25))
+    # EventSource reconnects on its own after every dropped stream, so
+    # /api/events gets a per-minute limit instead of the hourly default
+    EVENTS_RATE_LIMIT = os.environ.get('EVENTS_RATE_LIMIT', '30 per minute')
+    # Search typeahead fires on every keystroke
+    TYPEAHEAD_RATE_LIMIT = os.environ.get('TYPEAHEAD_RATE_LIMIT', '120 per minute')
+    
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    # Only endpoints that opt in (the SSE stream) read ?token=
+    JWT_QUERY_STRING_NAME = 'token'
     
     # CORS Configuration - Production only
     CORS_HEADERS = 'Content-Type'
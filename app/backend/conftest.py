@@ -0,0 +1,105 @@
+"""
+Shared pytest fixtures for the Peer backend API tests
+"""
+
+import os
+from contextlib import contextmanager
+
+import pytest
+
+# Point the app at a throwaway database before config is imported: in-memory
+# SQLite unless TEST_DATABASE_URL names another server (see test_matrix.sh)
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from main import app as flask_app, limiter
+from models.user import User, db
+from services.profiles import create_profile
+from services.tasks import Worker
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Flask app with a fresh schema, an empty cache and an empty task queue for every test"""
+    flask_app.config['TESTING'] = True
+    flask_app.config['CACHE_SQLITE_PATH'] = str(tmp_path / 'cache.db')
+    flask_app.config['TASK_QUEUE_PATH'] = str(tmp_path / 'tasks.db')
+    limiter.enabled = False
+    flask_app.extensions.pop('cache', None)
+    flask_app.extensions.pop('compression_cache', None)
+    flask_app.extensions.pop('task_queue', None)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create a user with their profile, as signup does, and return it together with its auth headers"""
+    def _make_user(username):
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.flush()
+        create_profile(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+        return user, {'Authorization': f'Bearer {token}'}
+    return _make_user
+
+
+@pytest.fixture
+def run_tasks(app):
+    """Run every due background task in this process, as worker.py would, and return how many ran"""
+    return lambda: Worker(app).run_until_idle()
+
+
+@pytest.fixture
+def rate_limits(app):
+    """Turn the rate limiter on, with empty counters, for one test"""
+    limiter.reset()
+    limiter.enabled = True
+    yield limiter
+    limiter.enabled = False
+    limiter.reset()
+
+
+@pytest.fixture
+def sqlite_only(app):
+    """Skip tests that assert on SQLite-specific behaviour such as EXPLAIN QUERY PLAN"""
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip('SQLite-specific assertion')
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager that records every (statement, parameters) sent to the engine"""
+    @contextmanager
+    def _count_queries():
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', _record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _record)
+    return _count_queries
+
+
+@pytest.fixture(autouse=True)
+def isolated_uploads(tmp_path, monkeypatch):
+    """Keep files written by upload endpoints out of the source tree"""
+    flask_app.config['BLOB_STORE_ROOT'] = str(tmp_path / 'blobs')
+    monkeypatch.chdir(tmp_path)
@@ -1,11 +1,48 @@
 # Gunicorn configuration for Render deployment
+import os
+
 bind = "0.0.0.0:10000"
-workers = 2
-worker_class = "sync"
-worker_connections = 1000
+# Shared with config.Config, which sizes the database pool from the same values.
+# The 'local' events broker only reaches /api/events streams served by the
+# publishing process, so it gets one worker; EVENTS_BACKEND=redis relays
+# events between any number of them.
+events_backend = os.environ.get('EVENTS_BACKEND', 'local')
+workers = int(os.environ.get('WEB_CONCURRENCY', 1 if events_backend == 'local' else 2))
+if workers > 1 and events_backend == 'local':
+    print(f"⚠️ {workers} workers with EVENTS_BACKEND=local: streams only get events published by their own worker")
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+# gevent workers hold the long-lived /api/events streams: an idle stream is a
+# greenlet, not a whole worker. Patch before the app is preloaded so its
+# locks, queues and sockets are cooperative.
+# config.Config sizes each worker's database pool from these too.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 2000))
+if worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
 timeout = 30
 keepalive = 2
-max_requests = 1000
-max_requests_jitter = 100
+if worker_class != 'gevent':
+    # Recycling a gevent worker would cut every /api/events stream it holds,
+    # so only the other classes restart after a number of requests
+    max_requests = 1000
+    max_requests_jitter = 100
 preload_app = True
-reload = False 
\ No newline at end of file
+reload = False 
+
+def on_starting(server):
+    """Migrate and verify the database once in the master, before workers fork"""
+    from main import app
+    from models.user import db
+    from startup import prepare_database
+    prepare_database(app)
+    # Workers must not share the master's pooled connections
+    with app.app_context():
+        db.engine.dispose()
+
+def post_fork(server, worker):
+    """Drop pooled connections inherited from the master without closing them under its feet"""
+    from main import app
+    from models.user import db
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -3,36 +3,22 @@
 Database initialization script for Peer backend
 """
 
-import os
-from pathlib import Path
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from config import Config
-
 def init_database():
-    """Initialize the database and create tables using SQLAlchemy"""
-    
-    # Create Flask app for database initialization
-    app = Flask(__name__)
-    app.config.from_object(Config)
+    """Run the boot-time database phase: migrate, then verify the schema"""
     
-    # Initialize SQLAlchemy
-    db = SQLAlchemy(app)
+    from main import app
+    from models.user import db
+    from startup import SchemaError, prepare_database
     
-    # Import models to register them
-    from models.user import User
-    from models.post import Post
-    from models.job import Job
-    from models.message import Message
-    from models.profile import Profile, Skill, Experience, Education, Achievement, ProfilePhoto
+    print("🗄️ Initializing database...")
     
-    print("🗄️ Initializing database using SQLAlchemy...")
+    try:
+        prepare_database(app)
+    except SchemaError as e:
+        print(f"❌ Schema verification failed: {e}")
+        return False
     
     with app.app_context():
-        # Create all tables
-        db.create_all()
-        print("✅ Database tables created successfully!")
-    
         # Check database connection
         try:
             # Test database connection
@@ -51,4 +37,4 @@ if __name__ == "__main__":
         print("✅ Database initialization completed successfully!")
     else:
         print("❌ Database initialization failed!")
-        exit(1) 
\ No newline at end of file
+        exit(1)
@@ -1,9 +1,18 @@
-from flask import Flask, send_from_directory, request
+from flask import Flask, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from config import Config
+from startup import prepare_database
+from services.blob_store import DEFAULT_ROOT as BLOB_STORE_DEFAULT_ROOT
+from services.cache import cache_metrics
+from services.compression import init_compression
+from services.sqlite import configure_sqlite
+from services.tasks import get_task_queue
+from services.uploads import send_upload
+from utils.serializers import AppJSONProvider
 from dotenv import load_dotenv
 import os
 
@@ -14,13 +23,20 @@ load_dotenv()
 from models.user import User, db
 from models.profile import Profile, Skill, Experience, Education, Achievement, ProfilePhoto
 from models.post import Post, PostLike
+from models.timeline import TimelineEntry
+from models.connection import Connection
+from models.message import Conversation, ConversationMember, Message
+from models.job import Job
+from models.search import SearchDocument
+from models.tag import PostTag, TagCount
 
 # Import blueprints
-from api import auth_bp, profile_bp, posts_bp, feed_bp, jobs_bp, messaging_bp
+from api import auth_bp, profile_bp, posts_bp, feed_bp, jobs_bp, messaging_bp, connections_bp, events_bp, search_bp, tags_bp, users_bp
 
 # Create Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
+app.json = AppJSONProvider(app)
 
 # Initialize extensions
 # Initialize CORS with configuration from config
@@ -39,6 +55,11 @@ CORS(app,
      max_age=3600,
      automatic_options=True)
 db.init_app(app)
+with app.app_context():
+    configure_sqlite(app, db.engine)
+# render_as_batch lets Alembic ALTER tables on SQLite by copy-and-move
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'),
+                  render_as_batch=True)
 jwt = JWTManager(app)
 limiter = Limiter(
     app=app,
@@ -53,12 +74,27 @@ app.register_blueprint(posts_bp)
 app.register_blueprint(feed_bp)
 app.register_blueprint(jobs_bp)
 app.register_blueprint(messaging_bp)
+app.register_blueprint(connections_bp)
+app.register_blueprint(events_bp)
+app.register_blueprint(search_bp)
+app.register_blueprint(tags_bp)
+app.register_blueprint(users_bp)
+
+# Endpoints whose clients call far more often than the defaults allow; the
+# limiter lives here, so their views are wrapped after registration
+for endpoint, rate_limit in (('events.stream_events', app.config['EVENTS_RATE_LIMIT']),
+                             ('search.search_typeahead', app.config['TYPEAHEAD_RATE_LIMIT'])):
+    app.view_functions[endpoint] = limiter.limit(rate_limit)(app.view_functions[endpoint])
+
+# gzip / brotli for clients that accept it
+init_compression(app)
 
 # Health check endpoint
 @app.route('/')
 def health_check():
     """Health check endpoint"""
-    return {'status': 'healthy', 'message': 'Peer backend is running!'}
+    return {'status': 'healthy', 'message': 'Peer backend is running!', 'cache': cache_metrics(),
+            'tasks': get_task_queue().stats()}
 
 # CORS preflight handler for all routes
 @app.route('/api/<path:path>', methods=['OPTIONS'])
@@ -77,23 +113,35 @@ def handle_options(path):
     
     return response
 
+# Reject oversized bodies with JSON like the rest of the API
+@app.errorhandler(413)
+def request_entity_too_large(error):
+    max_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return {'message': f'Request too large. Maximum size is {max_mb}MB'}, 413
+
 # Route to serve uploaded images
 @app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     """Serve uploaded files"""
-    return send_from_directory('uploads', filename)
+    return send_upload('uploads', filename)
 
 # Route to serve profile photos
 @app.route('/uploads/profile_photos/<path:filename>')
 def profile_photo(filename):
     """Serve profile photos"""
-    return send_from_directory('uploads/profile_photos', filename)
+    return send_upload('uploads/profile_photos', filename)
 
 # Route to serve post photos
 @app.route('/uploads/post_photos/<path:filename>')
 def post_photo(filename):
     """Serve post photos"""
-    return send_from_directory('uploads/post_photos', filename)
+    return send_upload('uploads/post_photos', filename)
+
+# Route to serve content-addressed blobs
+@app.route('/uploads/blobs/<path:filename>')
+def blob_file(filename):
+    """Serve blob store files"""
+    return send_upload(app.config.get('BLOB_STORE_ROOT', BLOB_STORE_DEFAULT_ROOT), filename)
 
 # Ensure CORS headers are properly set for production
 @app.after_request
@@ -110,8 +158,9 @@ def after_request(response):
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
     response.headers['Access-Control-Allow-Credentials'] = 'false'
     
-    # Add additional headers for file uploads
-    if request.method == 'POST' and 'photo' in request.files:
+    # Add additional headers for file uploads (checked by path: reading
+    # request.files here would re-parse a body the upload already streamed)
+    if request.method == 'POST' and request.path.endswith('/photo'):
         response.headers['Access-Control-Expose-Headers'] = 'Content-Length, Content-Range'
     
     return response
@@ -119,71 +168,30 @@ def after_request(response):
 
 def setup_database():
     """Setup database tables"""
-    try:
-        print("🔧 Setting up database...")
-        
-        # Ensure instance directory exists
-        instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
-        if not os.path.exists(instance_path):
-            os.makedirs(instance_path, exist_ok=True)
-            print(f"✅ Created instance directory: {instance_path}")
-        
-        # Import all models to ensure they're registered
-        from models.user import User
-        from models.post import Post, PostLike
-        from models.job import Job
-        from models.message import Message
-        from models.profile import Profile, Skill, Experience, Education, Achievement, ProfilePhoto
-        
-        print("🔧 Models imported successfully")
-        
-        # Create tables using SQLAlchemy
-        with app.app_context():
-            print("🔧 Creating database tables...")
-            db.create_all()
-            print("✅ Database tables created successfully!")
-            
-            # Verify specific tables exist
-            inspector = db.inspect(db.engine)
-            tables = inspector.get_table_names()
-            print(f"🔧 Available tables: {tables}")
-            
-            # Check for critical tables
-            critical_tables = ['user', 'profile', 'profile_photo', 'post', 'post_like', 'job', 'message']
-            missing_tables = [table for table in critical_tables if table not in tables]
+    print("🔧 Setting up database...")
+    
+    # Migrations and schema verification run once here, never per request.
+    # A failure stops the boot instead of surfacing later inside handlers.
+    prepare_database(app)
+    
+    # Create test user if in production
+    if os.environ.get('RENDER'):
+        print("🚀 Production mode - creating test user...")
+        try:
+            print("🔧 Running create_test_user.py...")
+            import subprocess
+            import sys
+            result = subprocess.run([sys.executable, 'create_test_user.py'], 
+                                  capture_output=True, text=True, cwd=os.path.dirname(__file__))
+            print(f"🔧 create_test_user.py stdout: {result.stdout}")
+            print(f"🔧 create_test_user.py stderr: {result.stderr}")
             
-            if missing_tables:
-                print(f"⚠️  Missing tables: {missing_tables}")
-                print("🔧 Attempting to create missing tables...")
-                db.create_all()
-                print("✅ Missing tables created!")
+            if result.returncode == 0:
+                print("✅ Test user created successfully")
             else:
-                print("✅ All critical tables exist!")
-        
-        # Create test user if in production
-        if os.environ.get('RENDER'):
-            print("🚀 Production mode - creating test user...")
-            try:
-                print("🔧 Running create_test_user.py...")
-                import subprocess
-                import sys
-                result = subprocess.run([sys.executable, 'create_test_user.py'], 
-                                      capture_output=True, text=True, cwd=os.path.dirname(__file__))
-                print(f"🔧 create_test_user.py stdout: {result.stdout}")
-                print(f"🔧 create_test_user.py stderr: {result.stderr}")
-                
-                if result.returncode == 0:
-                    print("✅ Test user created successfully")
-                else:
-                    print("⚠️  Test user creation failed, but continuing...")
-            except Exception as e:
-                print(f"⚠️  Test user creation error: {e}")
-                
-    except Exception as e:
-        print(f"🔴 Database setup error: {e}")
-        import traceback
-        print(f"🔴 Full traceback: {traceback.format_exc()}")
-        print("✅ Continuing anyway - database might already exist")
+                print("⚠️  Test user creation failed, but continuing...")
+        except Exception as e:
+            print(f"⚠️  Test user creation error: {e}")
 
 # Create a function to initialize the app
 def create_app():
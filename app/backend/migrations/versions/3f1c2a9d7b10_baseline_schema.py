@@ -0,0 +1,155 @@
+"""Baseline schema
+
+Adopts databases created earlier with db.create_all(): each table is only
+created when it is missing, so existing deployments can simply upgrade.
+
+Revision ID: 3f1c2a9d7b10
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'user' not in existing:
+        op.create_table('user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password_hash', sa.Text(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('email'),
+            sa.UniqueConstraint('username')
+        )
+    if 'profile' not in existing:
+        op.create_table('profile',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('full_name', sa.String(length=120), nullable=True),
+            sa.Column('bio', sa.Text(), nullable=True),
+            sa.Column('location', sa.String(length=120), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'skill' not in existing:
+        op.create_table('skill',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('profile_id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=80), nullable=False),
+            sa.ForeignKeyConstraint(['profile_id'], ['profile.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'experience' not in existing:
+        op.create_table('experience',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('profile_id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=120), nullable=False),
+            sa.Column('company', sa.String(length=120), nullable=False),
+            sa.Column('start_date', sa.String(length=50), nullable=True),
+            sa.Column('end_date', sa.String(length=50), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['profile_id'], ['profile.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'education' not in existing:
+        op.create_table('education',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('profile_id', sa.Integer(), nullable=False),
+            sa.Column('school', sa.String(length=120), nullable=False),
+            sa.Column('degree', sa.String(length=120), nullable=True),
+            sa.Column('field_of_study', sa.String(length=120), nullable=True),
+            sa.Column('start_year', sa.Integer(), nullable=True),
+            sa.Column('end_year', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['profile_id'], ['profile.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'achievement' not in existing:
+        op.create_table('achievement',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('profile_id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=120), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('date', sa.String(length=50), nullable=True),
+            sa.Column('image_url', sa.String(length=255), nullable=True),
+            sa.ForeignKeyConstraint(['profile_id'], ['profile.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'profile_photo' not in existing:
+        op.create_table('profile_photo',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('profile_id', sa.Integer(), nullable=False),
+            sa.Column('url', sa.Text(), nullable=False),
+            sa.Column('uploaded_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['profile_id'], ['profile.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'post' not in existing:
+        op.create_table('post',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('image_url', sa.String(length=255), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'post_like' not in existing:
+        op.create_table('post_like',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('post_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['post_id'], ['post.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('post_id', 'user_id', name='unique_post_like')
+        )
+    if 'job' not in existing:
+        op.create_table('job',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=200), nullable=False),
+            sa.Column('company', sa.String(length=200), nullable=False),
+            sa.Column('description', sa.Text(), nullable=False),
+            sa.Column('location', sa.String(length=200), nullable=True),
+            sa.Column('salary', sa.String(length=100), nullable=True),
+            sa.Column('requirements', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'message' not in existing:
+        op.create_table('message',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('sender_id', sa.Integer(), nullable=False),
+            sa.Column('receiver_id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('is_read', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['receiver_id'], ['user.id']),
+            sa.ForeignKeyConstraint(['sender_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('message')
+    op.drop_table('job')
+    op.drop_table('post_like')
+    op.drop_table('post')
+    op.drop_table('profile_photo')
+    op.drop_table('achievement')
+    op.drop_table('education')
+    op.drop_table('experience')
+    op.drop_table('skill')
+    op.drop_table('profile')
+    op.drop_table('user')
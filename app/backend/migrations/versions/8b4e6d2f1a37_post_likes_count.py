@@ -0,0 +1,34 @@
+"""Denormalized like counter on post
+
+Revision ID: 8b4e6d2f1a37
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e6d2f1a37'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('post')}
+    if 'likes_count' not in columns:
+        with op.batch_alter_table('post', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('likes_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from post_like in one statement
+    op.execute(
+        'UPDATE post SET likes_count = '
+        '(SELECT count(post_like.id) FROM post_like WHERE post_like.post_id = post.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('likes_count')
@@ -0,0 +1,51 @@
+"""Follow graph: connection table and cached counts on user
+
+Revision ID: a4c6e8f0b2d3
+Revises: f3b5c7d9e1a2
+Create Date: 2026-10-18 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c6e8f0b2d3'
+down_revision = 'f3b5c7d9e1a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    columns = {c['name'] for c in inspector.get_columns('user')}
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        for name in ('followers_count', 'following_count'):
+            if name not in columns:
+                batch_op.add_column(sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+
+    if 'connection' not in inspector.get_table_names():
+        op.create_table('connection',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('follower_id', sa.Integer(), nullable=False),
+            sa.Column('followed_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['followed_id'], ['user.id']),
+            sa.ForeignKeyConstraint(['follower_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('follower_id', 'followed_id', name='unique_connection')
+        )
+        op.create_index('ix_connection_follower_id_created_at_id', 'connection',
+                        ['follower_id', 'created_at', 'id'], unique=False)
+        op.create_index('ix_connection_followed_id_created_at_id', 'connection',
+                        ['followed_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_connection_followed_id_created_at_id', table_name='connection')
+    op.drop_index('ix_connection_follower_id_created_at_id', table_name='connection')
+    op.drop_table('connection')
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('following_count')
+        batch_op.drop_column('followers_count')
@@ -0,0 +1,96 @@
+"""Hashtags: post_tag rows and hourly tag_count buckets for trending
+
+Existing posts get their hashtags extracted, and their counts are added to
+the hour each post was created in.
+
+Revision ID: a6c8e0b2d4f7
+Revises: d0f2a4c6e8b1
+Create Date: 2026-10-18 13:30:00.000000
+
+"""
+from collections import Counter
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from services.tags import bucket_start, post_tags
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c8e0b2d4f7'
+down_revision = 'd0f2a4c6e8b1'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'post_tag' not in tables:
+        op.create_table('post_tag',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('post_id', sa.Integer(), nullable=False),
+            sa.Column('tag', sa.String(length=64), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['post_id'], ['post.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('post_id', 'tag', name='unique_post_tag')
+        )
+        op.create_index('ix_post_tag_tag_created_at_post_id', 'post_tag', ['tag', 'created_at', 'post_id'],
+                        unique=False)
+    if 'tag_count' not in tables:
+        op.create_table('tag_count',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('tag', sa.String(length=64), nullable=False),
+            sa.Column('bucket', sa.DateTime(), nullable=False),
+            sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('tag', 'bucket', name='unique_tag_count')
+        )
+        op.create_index('ix_tag_count_bucket_tag', 'tag_count', ['bucket', 'tag'], unique=False)
+        _backfill_tags()
+
+
+def _backfill_tags():
+    bind = op.get_bind()
+    post = sa.table('post', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                    sa.column('created_at', sa.DateTime))
+    post_tag = sa.table('post_tag', sa.column('post_id', sa.Integer), sa.column('tag', sa.String),
+                        sa.column('created_at', sa.DateTime))
+    tag_count = sa.table('tag_count', sa.column('tag', sa.String), sa.column('bucket', sa.DateTime),
+                         sa.column('count', sa.Integer))
+
+    counts = Counter()
+    last = 0
+    while True:
+        rows = bind.execute(
+            sa.select(post.c.id, post.c.content, post.c.created_at)
+            .where(post.c.id > last).order_by(post.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        values = []
+        for post_id, content, created_at in rows:
+            created_at = created_at or datetime.utcnow()
+            for tag in post_tags(content):
+                values.append({'post_id': post_id, 'tag': tag, 'created_at': created_at})
+                counts[tag, bucket_start(created_at)] += 1
+        if values:
+            bind.execute(post_tag.insert(), values)
+        last = rows[-1][0]
+
+    if counts:
+        bind.execute(tag_count.insert(), [
+            {'tag': tag, 'bucket': bucket, 'count': count} for (tag, bucket), count in counts.items()
+        ])
+        print(f"✅ Extracted {sum(counts.values())} hashtags from existing posts")
+
+
+def downgrade():
+    op.drop_index('ix_tag_count_bucket_tag', table_name='tag_count')
+    op.drop_table('tag_count')
+    op.drop_index('ix_post_tag_tag_created_at_post_id', table_name='post_tag')
+    op.drop_table('post_tag')
@@ -0,0 +1,129 @@
+"""Conversations: threads, members with unread counters, message.conversation_id
+
+Existing messages are grouped into one conversation per sender/receiver
+pair, and the denormalized last-message and unread state is rebuilt from
+them.
+
+Revision ID: b6d8f0a2c4e5
+Revises: a4c6e8f0b2d3
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d8f0a2c4e5'
+down_revision = 'a4c6e8f0b2d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'conversation' not in tables:
+        op.create_table('conversation',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('pair_key', sa.String(length=50), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('last_message_id', sa.Integer(), nullable=True),
+            sa.Column('last_message_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('pair_key')
+        )
+    if 'conversation_member' not in tables:
+        op.create_table('conversation_member',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('conversation_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('last_message_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['conversation_id'], ['conversation.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('conversation_id', 'user_id', name='unique_conversation_member')
+        )
+        op.create_index('ix_conversation_member_user_id_last_message_at', 'conversation_member',
+                        ['user_id', 'last_message_at', 'conversation_id'], unique=False)
+
+    if 'conversation_id' not in {c['name'] for c in inspector.get_columns('message')}:
+        with op.batch_alter_table('message', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('conversation_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_message_conversation_id', 'conversation', ['conversation_id'], ['id'])
+    if 'ix_message_conversation_id_timestamp_id' not in {i['name'] for i in inspector.get_indexes('message')}:
+        op.create_index('ix_message_conversation_id_timestamp_id', 'message',
+                        ['conversation_id', 'timestamp', 'id'], unique=False)
+
+    if 'unread_messages_count' not in {c['name'] for c in inspector.get_columns('user')}:
+        with op.batch_alter_table('user', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('unread_messages_count', sa.Integer(), server_default='0', nullable=False))
+
+    _backfill_conversations()
+
+
+def _backfill_conversations():
+    bind = op.get_bind()
+    message = sa.table('message', sa.column('id', sa.Integer), sa.column('conversation_id', sa.Integer),
+                       sa.column('sender_id', sa.Integer), sa.column('receiver_id', sa.Integer),
+                       sa.column('timestamp', sa.DateTime), sa.column('is_read', sa.Boolean))
+    conversation = sa.table('conversation', sa.column('id', sa.Integer), sa.column('pair_key', sa.String),
+                            sa.column('created_at', sa.DateTime), sa.column('last_message_id', sa.Integer),
+                            sa.column('last_message_at', sa.DateTime))
+    member = sa.table('conversation_member', sa.column('conversation_id', sa.Integer),
+                      sa.column('user_id', sa.Integer), sa.column('unread_count', sa.Integer),
+                      sa.column('last_message_at', sa.DateTime))
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('unread_messages_count', sa.Integer))
+
+    pairs = {
+        tuple(sorted(pair)) for pair in bind.execute(
+            sa.select(message.c.sender_id, message.c.receiver_id).where(message.c.conversation_id.is_(None)).distinct()
+        )
+    }
+    for low, high in sorted(pairs):
+        between = sa.or_(
+            sa.and_(message.c.sender_id == low, message.c.receiver_id == high),
+            sa.and_(message.c.sender_id == high, message.c.receiver_id == low),
+        )
+        last_id, last_at = bind.execute(
+            sa.select(message.c.id, message.c.timestamp).where(between)
+            .order_by(message.c.timestamp.desc(), message.c.id.desc()).limit(1)
+        ).one()
+        conversation_id = bind.execute(
+            conversation.insert().values(pair_key=f'{low}:{high}', created_at=datetime.utcnow(),
+                                         last_message_id=last_id, last_message_at=last_at)
+            .returning(conversation.c.id)
+        ).scalar()
+        bind.execute(message.update().where(between).values(conversation_id=conversation_id))
+        for user_id in {low, high}:
+            unread = bind.execute(
+                sa.select(sa.func.count(message.c.id)).where(
+                    message.c.conversation_id == conversation_id,
+                    message.c.receiver_id == user_id,
+                    sa.or_(message.c.is_read.is_(None), message.c.is_read == sa.false())
+                )
+            ).scalar()
+            bind.execute(member.insert().values(conversation_id=conversation_id, user_id=user_id,
+                                                unread_count=unread, last_message_at=last_at))
+
+    if pairs:
+        bind.execute(user.update().values(unread_messages_count=sa.select(
+            sa.func.coalesce(sa.func.sum(member.c.unread_count), 0)
+        ).where(member.c.user_id == user.c.id).scalar_subquery()))
+        print(f"✅ Grouped existing messages into {len(pairs)} conversations")
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('unread_messages_count')
+    op.drop_index('ix_message_conversation_id_timestamp_id', table_name='message')
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_message_conversation_id', type_='foreignkey')
+        batch_op.drop_column('conversation_id')
+    op.drop_index('ix_conversation_member_user_id_last_message_at', table_name='conversation_member')
+    op.drop_table('conversation_member')
+    op.drop_table('conversation')
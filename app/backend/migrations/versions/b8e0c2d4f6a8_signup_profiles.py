@@ -0,0 +1,38 @@
+"""Profiles at signup: give every existing user without a profile an empty one
+
+GET /api/profile no longer creates a missing profile on read; signup does.
+
+Revision ID: b8e0c2d4f6a8
+Revises: a6c8e0b2d4f7
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e0c2d4f6a8'
+down_revision = 'a6c8e0b2d4f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('username', sa.String))
+    profile = sa.table('profile', sa.column('user_id', sa.Integer), sa.column('full_name', sa.String))
+
+    created = bind.execute(profile.insert().from_select(
+        ['user_id', 'full_name'],
+        sa.select(user.c.id, user.c.username).where(
+            ~sa.exists().where(profile.c.user_id == user.c.id)
+        )
+    )).rowcount
+    if created:
+        print(f"✅ Created {created} missing profiles")
+
+
+def downgrade():
+    # The profiles are indistinguishable from ones users created; keep them
+    pass
@@ -0,0 +1,33 @@
+"""Profile versions: updated_at, for ETag and Last-Modified on profile responses
+
+Revision ID: c0e2a4b6d8f1
+Revises: b8e0c2d4f6a8
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c0e2a4b6d8f1'
+down_revision = 'b8e0c2d4f6a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('profile')}
+    if 'updated_at' not in columns:
+        with op.batch_alter_table('profile', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing profiles count as modified now, so their responses carry Last-Modified at once
+    profile = sa.table('profile', sa.column('updated_at', sa.DateTime))
+    op.get_bind().execute(profile.update().where(profile.c.updated_at.is_(None))
+                          .values(updated_at=sa.func.current_timestamp()))
+
+
+def downgrade():
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,45 @@
+"""Secondary indexes for hot query paths
+
+Revision ID: c7d9a0e2b514
+Revises: 8b4e6d2f1a37
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d9a0e2b514'
+down_revision = '8b4e6d2f1a37'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_post_created_at_id', 'post', ['created_at', 'id']),
+    ('ix_post_user_id_created_at_id', 'post', ['user_id', 'created_at', 'id']),
+    ('ix_post_like_user_id_post_id', 'post_like', ['user_id', 'post_id']),
+    ('ix_profile_user_id', 'profile', ['user_id']),
+    ('ix_skill_profile_id', 'skill', ['profile_id']),
+    ('ix_experience_profile_id', 'experience', ['profile_id']),
+    ('ix_education_profile_id', 'education', ['profile_id']),
+    ('ix_achievement_profile_id', 'achievement', ['profile_id']),
+    ('ix_profile_photo_profile_id', 'profile_photo', ['profile_id']),
+    ('ix_message_sender_receiver_timestamp', 'message', ['sender_id', 'receiver_id', 'timestamp']),
+    ('ix_message_receiver_timestamp', 'message', ['receiver_id', 'timestamp']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        # Databases bootstrapped with db.create_all() may already have some
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
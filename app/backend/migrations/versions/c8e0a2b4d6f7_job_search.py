@@ -0,0 +1,51 @@
+"""Job search: listing indexes and the full-text index
+
+SQLite gets the job_fts FTS5 table and its sync triggers, rebuilt from the
+existing rows; PostgreSQL gets a generated search_vector column with a GIN
+index. See utils.fulltext.
+
+Revision ID: c8e0a2b4d6f7
+Revises: b6d8f0a2c4e5
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from models.job import job_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e0a2b4d6f7'
+down_revision = 'b6d8f0a2c4e5'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_job_created_at_id', ['created_at', 'id']),
+    ('ix_job_company_created_at_id', ['company', 'created_at', 'id']),
+    ('ix_job_location_created_at_id', ['location', 'created_at', 'id']),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    existing = {index['name'] for index in sa.inspect(bind).get_indexes('job')}
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, 'job', columns, unique=False)
+
+    for statement in job_search_index.create_statements(bind.dialect.name):
+        op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {job_search_index.name}_{trigger}')
+    for statement in job_search_index.drop_statements(bind.dialect.name):
+        op.execute(statement)
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='job')
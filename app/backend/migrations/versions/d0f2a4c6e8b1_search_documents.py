@@ -0,0 +1,129 @@
+"""Unified search: search_document rows for posts and people, full-text indexed
+
+Every existing post and user gets its document, built the same way the
+write paths build them (services.search). SQLite indexes the documents in
+the search_document_fts FTS5 table, PostgreSQL in a generated search_vector
+column with a GIN index.
+
+Revision ID: d0f2a4c6e8b1
+Revises: c8e0a2b4d6f7
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from models.search import search_index
+from services.search import person_document, post_document
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0f2a4c6e8b1'
+down_revision = 'c8e0a2b4d6f7'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    bind = op.get_bind()
+    if 'search_document' not in sa.inspect(bind).get_table_names():
+        op.create_table('search_document',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=16), nullable=False),
+            sa.Column('ref_id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.Text(), nullable=False),
+            sa.Column('tags', sa.Text(), nullable=False),
+            sa.Column('body', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('kind', 'ref_id', name='unique_search_document')
+        )
+
+    # Triggers (SQLite) or the generated column (PostgreSQL) index the backfill
+    for statement in search_index.create_statements(bind.dialect.name):
+        op.execute(statement)
+
+    _backfill_documents()
+
+
+def _batches(bind, select, key):
+    last = 0
+    while True:
+        rows = bind.execute(select.where(key > last).order_by(key).limit(BATCH_SIZE)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def _backfill_documents():
+    bind = op.get_bind()
+    document = sa.table('search_document', sa.column('kind', sa.String), sa.column('ref_id', sa.Integer),
+                        sa.column('title', sa.Text), sa.column('tags', sa.Text), sa.column('body', sa.Text),
+                        sa.column('created_at', sa.DateTime))
+    post = sa.table('post', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                    sa.column('created_at', sa.DateTime))
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('username', sa.String))
+    profile = sa.table('profile', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+                       sa.column('full_name', sa.String), sa.column('bio', sa.Text))
+    skill = sa.table('skill', sa.column('profile_id', sa.Integer), sa.column('name', sa.String))
+    experience = sa.table('experience', sa.column('profile_id', sa.Integer), sa.column('company', sa.String))
+
+    def missing(kind, ref):
+        return ~sa.exists().where(document.c.kind == kind, document.c.ref_id == ref)
+
+    posts = 0
+    for rows in _batches(bind, sa.select(post.c.id, post.c.content, post.c.created_at)
+                         .where(missing('post', post.c.id)), post.c.id):
+        bind.execute(document.insert(), [
+            dict(kind='post', ref_id=post_id, created_at=created_at or datetime.utcnow(), **post_document(content))
+            for post_id, content, created_at in rows
+        ])
+        posts += len(rows)
+
+    people = 0
+    for rows in _batches(bind, sa.select(user.c.id, user.c.username)
+                         .where(missing('person', user.c.id)), user.c.id):
+        user_ids = [row[0] for row in rows]
+        # The first profile of each user, as the profile API reads it
+        profiles = {}
+        for profile_id, user_id, full_name, bio in bind.execute(
+            sa.select(profile.c.id, profile.c.user_id, profile.c.full_name, profile.c.bio)
+            .where(profile.c.user_id.in_(user_ids)).order_by(profile.c.id)
+        ):
+            profiles.setdefault(user_id, (profile_id, full_name, bio))
+        profile_ids = [p[0] for p in profiles.values()]
+        skills, companies = {}, {}
+        if profile_ids:
+            for profile_id, name in bind.execute(sa.select(skill.c.profile_id, skill.c.name)
+                                                 .where(skill.c.profile_id.in_(profile_ids))):
+                skills.setdefault(profile_id, []).append(name)
+            for profile_id, company in bind.execute(sa.select(experience.c.profile_id, experience.c.company)
+                                                    .where(experience.c.profile_id.in_(profile_ids))):
+                companies.setdefault(profile_id, []).append(company)
+
+        values = []
+        for user_id, username in rows:
+            profile_id, full_name, bio = profiles.get(user_id, (None, None, None))
+            values.append(dict(kind='person', ref_id=user_id, created_at=datetime.utcnow(),
+                               **person_document(username, full_name, bio,
+                                                 skills.get(profile_id, []), companies.get(profile_id, []))))
+        bind.execute(document.insert(), values)
+        people += len(rows)
+
+    if posts or people:
+        print(f"✅ Indexed {posts} posts and {people} people for search")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {search_index.name}_{trigger}')
+    for statement in search_index.drop_statements(bind.dialect.name):
+        op.execute(statement)
+    op.drop_table('search_document')
@@ -0,0 +1,68 @@
+"""Image variants: post.image_variants and profile_photo.variants
+
+Serializers build srcsets from these columns instead of probing the disk
+for every derivative. Existing rows with an /uploads image are filled in,
+in id-ordered batches, from the derivatives already on disk.
+
+Revision ID: d4f6a8c0e2b3
+Revises: c0e2a4b6d8f1
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from services.images import existing_variants, local_path_for_url
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f6a8c0e2b3'
+down_revision = 'c0e2a4b6d8f1'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def _add_column(table, name):
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+    if name not in columns:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(name, sa.Text(), nullable=True))
+
+
+def _backfill(table, url_column, variants_column):
+    bind = op.get_bind()
+    rows = sa.table(table, sa.column('id', sa.Integer), sa.column(url_column, sa.Text),
+                    sa.column(variants_column, sa.Text))
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(rows.c.id, rows.c[url_column])
+            .where(rows.c.id > last_id, rows.c[url_column].like('/uploads/%'))
+            .order_by(rows.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+        for row_id, url in batch:
+            path = local_path_for_url(url)
+            if path is None:
+                continue
+            bind.execute(rows.update().where(rows.c.id == row_id)
+                         .values({variants_column: existing_variants(path)}))
+        last_id = batch[-1][0]
+
+
+def upgrade():
+    _add_column('post', 'image_variants')
+    _add_column('profile_photo', 'variants')
+    _backfill('post', 'image_url', 'image_variants')
+    _backfill('profile_photo', 'url', 'variants')
+
+
+def downgrade():
+    with op.batch_alter_table('profile_photo', schema=None) as batch_op:
+        batch_op.drop_column('variants')
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('image_variants')
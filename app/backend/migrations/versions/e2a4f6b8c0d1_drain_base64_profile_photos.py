@@ -0,0 +1,58 @@
+"""Move inline base64 profile photos into the blob store
+
+Rows whose url is a data: URL are decoded into the content-addressed store
+in id-ordered batches and rewritten to the short /uploads/blobs URL.
+
+Revision ID: e2a4f6b8c0d1
+Revises: c7d9a0e2b514
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+from services.blob_store import DEFAULT_ROOT, BlobStore
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a4f6b8c0d1'
+down_revision = 'c7d9a0e2b514'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 100
+
+
+def upgrade():
+    bind = op.get_bind()
+    store = BlobStore(current_app.config.get('BLOB_STORE_ROOT', DEFAULT_ROOT))
+    photos = sa.table('profile_photo', sa.column('id', sa.Integer), sa.column('url', sa.Text))
+
+    last_id = 0
+    moved = 0
+    while True:
+        # Seek by id so each batch only reads the next slice of inline rows
+        batch = bind.execute(
+            sa.select(photos.c.id, photos.c.url)
+            .where(photos.c.id > last_id, photos.c.url.like('data:%'))
+            .order_by(photos.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+        for photo_id, url in batch:
+            try:
+                short_url = store.put_data_url(url)
+            except ValueError as e:
+                print(f"⚠️  Leaving profile_photo {photo_id} inline: {e}")
+                continue
+            bind.execute(photos.update().where(photos.c.id == photo_id).values(url=short_url))
+            moved += 1
+        last_id = batch[-1][0]
+    print(f"✅ Moved {moved} inline profile photos into the blob store")
+
+
+def downgrade():
+    # Blob URLs stay valid; there is nothing to restore
+    pass
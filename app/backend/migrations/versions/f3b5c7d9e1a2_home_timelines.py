@@ -0,0 +1,56 @@
+"""Home timelines: timeline_entry table and post.fanned_out
+
+Existing posts keep fanned_out=False, so feeds pick them up with
+fan-out-on-read and nothing needs backfilling.
+
+Revision ID: f3b5c7d9e1a2
+Revises: e2a4f6b8c0d1
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b5c7d9e1a2'
+down_revision = 'e2a4f6b8c0d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    columns = {c['name'] for c in inspector.get_columns('post')}
+    if 'fanned_out' not in columns:
+        with op.batch_alter_table('post', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('fanned_out', sa.Boolean(), server_default=sa.false(), nullable=False))
+    if 'ix_post_fanned_out_created_at_id' not in {i['name'] for i in inspector.get_indexes('post')}:
+        op.create_index('ix_post_fanned_out_created_at_id', 'post', ['fanned_out', 'created_at', 'id'], unique=False)
+
+    if 'timeline_entry' not in inspector.get_table_names():
+        op.create_table('timeline_entry',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('post_id', sa.Integer(), nullable=False),
+            sa.Column('author_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['author_id'], ['user.id']),
+            sa.ForeignKeyConstraint(['post_id'], ['post.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'post_id', name='unique_timeline_entry')
+        )
+        op.create_index('ix_timeline_entry_user_id_created_at_post_id', 'timeline_entry',
+                        ['user_id', 'created_at', 'post_id'], unique=False)
+        op.create_index('ix_timeline_entry_post_id', 'timeline_entry', ['post_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_timeline_entry_post_id', table_name='timeline_entry')
+    op.drop_index('ix_timeline_entry_user_id_created_at_post_id', table_name='timeline_entry')
+    op.drop_table('timeline_entry')
+    op.drop_index('ix_post_fanned_out_created_at_id', table_name='post')
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('fanned_out')
@@ -2,12 +2,23 @@ from .user import User
 from .post import Post
 from .profile import Profile
 from .job import Job
-from .message import Message
+from .message import Conversation, ConversationMember, Message
+from .timeline import TimelineEntry
+from .connection import Connection
+from .search import SearchDocument
+from .tag import PostTag, TagCount
 
 __all__ = [
     'User',
     'Post', 
     'Profile',
     'Job',
-    'Message'
+    'Message',
+    'Conversation',
+    'ConversationMember',
+    'TimelineEntry',
+    'Connection',
+    'SearchDocument',
+    'PostTag',
+    'TagCount'
 ] 
\ No newline at end of file
@@ -0,0 +1,21 @@
+from models.user import db
+from datetime import datetime
+
+class Connection(db.Model):
+    """Directed follow edge: follower_id follows followed_id"""
+    id = db.Column(db.Integer, primary_key=True)
+    follower_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    followed_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Adjacency in both directions: the unique index answers "who does X
+    # follow", the second one "who follows X"; both end in created_at, id so
+    # listings page by keyset
+    __table_args__ = (
+        db.UniqueConstraint('follower_id', 'followed_id', name='unique_connection'),
+        db.Index('ix_connection_follower_id_created_at_id', 'follower_id', 'created_at', 'id'),
+        db.Index('ix_connection_followed_id_created_at_id', 'followed_id', 'created_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<Connection {self.follower_id} -> {self.followed_id}>'
@@ -1,6 +1,6 @@
-from flask_sqlalchemy import SQLAlchemy
-
-db = SQLAlchemy()
+from models.user import db
+from datetime import datetime
+from utils.fulltext import FullTextIndex
 
 class Job(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,7 +10,21 @@ class Job(db.Model):
     location = db.Column(db.String(200))
     salary = db.Column(db.String(100))
     requirements = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Listings page by (created_at, id), optionally within one company or location
+    __table_args__ = (
+        db.Index('ix_job_created_at_id', 'created_at', 'id'),
+        db.Index('ix_job_company_created_at_id', 'company', 'created_at', 'id'),
+        db.Index('ix_job_location_created_at_id', 'location', 'created_at', 'id'),
+    )
     
     def __repr__(self):
         return f'<Job {self.title} at {self.company}>'
+
+# Keyword search; title and company matches outrank description and requirements
+job_search_index = FullTextIndex(
+    Job.__table__,
+    columns=['title', 'company', 'description', 'requirements'],
+    weights=[10.0, 8.0, 1.0, 2.0]
+)
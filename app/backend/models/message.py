@@ -1,14 +1,50 @@
-from flask_sqlalchemy import SQLAlchemy
+from models.user import db
+from datetime import datetime
 
-db = SQLAlchemy()
+class Conversation(db.Model):
+    """A direct-message thread between two users"""
+    id = db.Column(db.Integer, primary_key=True)
+    # "<low user id>:<high user id>", so each pair has exactly one thread
+    pair_key = db.Column(db.String(50), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Denormalized newest message for inbox listings, set by services.messaging
+    last_message_id = db.Column(db.Integer)
+    last_message_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Conversation {self.pair_key}>'
+
+class ConversationMember(db.Model):
+    """A user's membership in a conversation, with their unread counter"""
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    unread_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Copy of conversation.last_message_at so the inbox sorts on this table's index
+    last_message_at = db.Column(db.DateTime)
+
+    # The inbox seeks on (user_id, last_message_at, conversation_id)
+    __table_args__ = (
+        db.UniqueConstraint('conversation_id', 'user_id', name='unique_conversation_member'),
+        db.Index('ix_conversation_member_user_id_last_message_at', 'user_id', 'last_message_at', 'conversation_id'),
+    )
 
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'))
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=db.func.current_timestamp())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
-    
+
+    # Thread history pages seek on (conversation_id, timestamp, id); the
+    # participant indexes serve lookups by pair and by receiver
+    __table_args__ = (
+        db.Index('ix_message_conversation_id_timestamp_id', 'conversation_id', 'timestamp', 'id'),
+        db.Index('ix_message_sender_receiver_timestamp', 'sender_id', 'receiver_id', 'timestamp'),
+        db.Index('ix_message_receiver_timestamp', 'receiver_id', 'timestamp'),
+    )
+
     def __repr__(self):
         return f'<Message {self.id} from {self.sender_id} to {self.receiver_id}>'
@@ -6,8 +6,25 @@ class Post(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.String(255))
+    # Derivatives of image_url recorded by services.images, e.g. '96w.webp 320w.webp'
+    image_variants = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Denormalized PostLike count, maintained by like_post() in the same transaction
+    likes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # True once services.feed has copied the post into its audience's
+    # timelines; posts left False are merged into feeds at read time
+    fanned_out = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    author = db.relationship('User')
+
+    # Keyset pagination seeks on (created_at, id), globally, per author and
+    # over the posts feeds read on demand
+    __table_args__ = (
+        db.Index('ix_post_created_at_id', 'created_at', 'id'),
+        db.Index('ix_post_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_post_fanned_out_created_at_id', 'fanned_out', 'created_at', 'id'),
+    )
 
 class PostLike(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -15,5 +32,9 @@ class PostLike(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Ensure a user can only like a post once
-    __table_args__ = (db.UniqueConstraint('post_id', 'user_id', name='unique_post_like'),)
+    # Ensure a user can only like a post once; the unique index also serves
+    # lookups by post, the second index serves "which of these did I like"
+    __table_args__ = (
+        db.UniqueConstraint('post_id', 'user_id', name='unique_post_like'),
+        db.Index('ix_post_like_user_id_post_id', 'user_id', 'post_id'),
+    )
@@ -1,21 +1,25 @@
+from datetime import datetime
+
 from models.user import db
 
 class Profile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
     full_name = db.Column(db.String(120), nullable=True)
     bio = db.Column(db.Text)
     location = db.Column(db.String(120))
+    # Bumped by every write to the profile or its lists; drives Last-Modified and the ETag
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     # Add relationships if needed
 
 class Skill(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False, index=True)
     name = db.Column(db.String(80), nullable=False)
 
 class Experience(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False, index=True)
     title = db.Column(db.String(120), nullable=False)
     company = db.Column(db.String(120), nullable=False)
     start_date = db.Column(db.String(50))  # Changed to string to handle various date formats
@@ -24,7 +28,7 @@ class Experience(db.Model):
 
 class Education(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False, index=True)
     school = db.Column(db.String(120), nullable=False)
     degree = db.Column(db.String(120))
     field_of_study = db.Column(db.String(120))
@@ -33,7 +37,7 @@ class Education(db.Model):
 
 class Achievement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False, index=True)
     title = db.Column(db.String(120), nullable=False)
     description = db.Column(db.Text)
     date = db.Column(db.String(50))  # Changed to string to handle various date formats
@@ -41,6 +45,7 @@ class Achievement(db.Model):
 
 class ProfilePhoto(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False)
-    url = db.Column(db.Text, nullable=False)  # Changed to TEXT to handle large base64 images
+    profile_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False, index=True)
+    url = db.Column(db.Text, nullable=False)  # Short /uploads URL; inline base64 is decoded into the blob store
+    variants = db.Column(db.Text)  # Derivatives of url recorded by services.images
     uploaded_at = db.Column(db.DateTime, server_default=db.func.now())
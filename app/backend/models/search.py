@@ -0,0 +1,32 @@
+from models.user import db
+from datetime import datetime
+from utils.fulltext import FullTextIndex
+
+class SearchDocument(db.Model):
+    """One searchable row per post or person, kept current by services.search"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(16), nullable=False)  # 'post' or 'person'
+    ref_id = db.Column(db.Integer, nullable=False)  # Post.id or User.id
+    # Person: full name and username. Post: empty
+    title = db.Column(db.Text, nullable=False, default='')
+    # Person: skills and companies. Post: hashtags
+    tags = db.Column(db.Text, nullable=False, default='')
+    # Person: bio. Post: content
+    body = db.Column(db.Text, nullable=False, default='')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'ref_id', name='unique_search_document'),
+    )
+
+# Unified index over posts and people. Names, skills and hashtags outrank
+# free text; no stemming so partly typed words and names prefix-match; kind
+# is a facet so per-type counts stay inside the index
+search_index = FullTextIndex(
+    SearchDocument.__table__,
+    columns=['title', 'tags', 'body'],
+    weights=[10.0, 5.0, 1.0],
+    stem=False,
+    prefix='2 3',
+    facets=['kind']
+)
@@ -0,0 +1,27 @@
+from models.user import db
+from datetime import datetime
+
+class PostTag(db.Model):
+    """A hashtag of a post, extracted when the post is created"""
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    tag = db.Column(db.String(64), nullable=False)  # lower-cased, without '#'
+    # Copied from the post so a tag's posts page by (created_at, post_id) on one index
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('post_id', 'tag', name='unique_post_tag'),
+        db.Index('ix_post_tag_tag_created_at_post_id', 'tag', 'created_at', 'post_id'),
+    )
+
+class TagCount(db.Model):
+    """Posts using a tag within one hour; trending sums the buckets of a sliding window"""
+    id = db.Column(db.Integer, primary_key=True)
+    tag = db.Column(db.String(64), nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)  # start of the hour
+    count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.UniqueConstraint('tag', 'bucket', name='unique_tag_count'),
+        db.Index('ix_tag_count_bucket_tag', 'bucket', 'tag'),
+    )
@@ -0,0 +1,18 @@
+from models.user import db
+
+class TimelineEntry(db.Model):
+    """One post materialized into one user's home timeline (fan-out-on-write)"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Copy of post.created_at so a timeline page never has to join to sort
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    # Timeline pages seek on (user_id, created_at, post_id); deleting a post
+    # removes its entries by post_id
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='unique_timeline_entry'),
+        db.Index('ix_timeline_entry_user_id_created_at_post_id', 'user_id', 'created_at', 'post_id'),
+        db.Index('ix_timeline_entry_post_id', 'post_id'),
+    )
@@ -8,6 +8,11 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.Text, nullable=False)  # Changed to TEXT to handle long scrypt hashes
+    # Denormalized Connection counts, maintained by services.connections
+    followers_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    following_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Sum of this user's ConversationMember.unread_count, maintained by services.messaging
+    unread_messages_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
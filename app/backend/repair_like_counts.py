@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Recompute the denormalized Post.likes_count column from post_like
+"""
+
+import sys
+from sqlalchemy import func, select, update
+
+def repair_like_counts(batch_size=1000):
+    """Rewrite likes_count for every post in id-range batches"""
+    
+    from main import app
+    from models.user import db
+    from models.post import Post, PostLike
+    
+    print("🔧 Recomputing post like counts...")
+    
+    with app.app_context():
+        max_id = db.session.query(func.max(Post.id)).scalar() or 0
+        counted = (
+            select(func.count(PostLike.id))
+            .where(PostLike.post_id == Post.id)
+            .scalar_subquery()
+        )
+        
+        repaired = 0
+        for start in range(0, max_id, batch_size):
+            # Only touch rows whose stored count has drifted
+            result = db.session.execute(
+                update(Post)
+                .where(Post.id > start, Post.id <= start + batch_size, Post.likes_count != counted)
+                .values(likes_count=counted)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            repaired += result.rowcount
+            print(f"🔧 Posts {start + 1}-{min(start + batch_size, max_id)} checked")
+        
+        print(f"✅ Repaired like counts on {repaired} posts")
+        return True
+
+if __name__ == "__main__":
+    batch = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    success = repair_like_counts(batch)
+    if success:
+        print("✅ Like count repair completed successfully!")
+    else:
+        print("❌ Like count repair failed!")
+        exit(1)
@@ -0,0 +1,6 @@
+from .blob_store import BlobStore, get_blob_store
+
+__all__ = [
+    'BlobStore',
+    'get_blob_store'
+]
@@ -0,0 +1,98 @@
+"""
+Content-addressed blob store for uploaded images.
+
+Blobs are named by the SHA-256 of their bytes and sharded two levels deep
+(`ab/cd/abcd...png`), so identical uploads share one file and a URL never
+changes meaning once handed out.
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+
+from flask import current_app
+
+from services.uploads import sniff_image_type
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads', 'blobs')
+
+# MIME types we accept in a data: URL
+IMAGE_MIME_TYPES = {'image/png', 'image/jpeg', 'image/jpg', 'image/gif'}
+
+DATA_URL = re.compile(r'^data:(?P<mime>[\w/+.-]+);base64,(?P<data>.*)$', re.DOTALL)
+
+
+def decode_data_url(data_url):
+    """Return (extension, bytes) for a base64 image data URL, or raise ValueError"""
+    match = DATA_URL.match(data_url)
+    if not match:
+        raise ValueError("Expected a base64 data URL")
+    if match.group('mime').lower() not in IMAGE_MIME_TYPES:
+        raise ValueError("Unsupported image type. Allowed: png, jpg, jpeg, gif")
+    try:
+        data = base64.b64decode(match.group('data'), validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid base64 image data")
+    # Trust the bytes, not the declared MIME type
+    extension = sniff_image_type(data)
+    if not extension:
+        raise ValueError("Invalid base64 image data")
+    return extension, data
+
+
+class BlobStore:
+    """Hash-named files under `root`, served from `url_prefix`"""
+
+    def __init__(self, root=DEFAULT_ROOT, url_prefix='/uploads/blobs'):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+
+    def relative_path(self, digest, extension):
+        return os.path.join(digest[:2], digest[2:4], f'{digest}.{extension}')
+
+    def path_for(self, digest, extension):
+        return os.path.join(self.root, self.relative_path(digest, extension))
+
+    def url_for(self, digest, extension):
+        return f"{self.url_prefix}/{self.relative_path(digest, extension).replace(os.sep, '/')}"
+
+    def put_bytes(self, data, extension):
+        """Store `data` unless an identical blob exists; return its URL"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, extension)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write beside the target and rename so readers never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as temp_file:
+                    temp_file.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+        return self.url_for(digest, extension)
+
+    def put_staged(self, staged):
+        """Move a StagedUpload into the store unless an identical blob exists; return its URL"""
+        path = self.path_for(staged.digest, staged.extension)
+        if os.path.exists(path):
+            staged.discard()
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            staged.save_as(path)
+        return self.url_for(staged.digest, staged.extension)
+
+    def put_data_url(self, data_url):
+        """Decode an inline data URL into the store and return the short URL"""
+        extension, data = decode_data_url(data_url)
+        return self.put_bytes(data, extension)
+
+
+def get_blob_store():
+    """The blob store configured for the current app"""
+    return BlobStore(current_app.config.get('BLOB_STORE_ROOT', DEFAULT_ROOT))
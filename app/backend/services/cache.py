@@ -0,0 +1,502 @@
+"""
+Read-through cache for assembled API payloads.
+
+Handlers ask for a key with a loader: a hit returns the stored payload, a
+miss runs the loader and stores what it returns for `ttl` seconds. GET views
+can be wrapped whole with cached_response(), keyed per endpoint, viewer and
+query string.
+
+Two tiers sit behind one interface:
+
+- The local tier is an LRU dict in each worker process, so a hit costs no
+  more than a dict lookup and a tag check.
+- The shared tier (CACHE_SHARED_BACKEND) is seen by every worker: 'sqlite'
+  keeps it in a file beside the database, 'redis' in any server speaking
+  the Redis protocol. Without one, each worker caches on its own.
+
+Entries are tagged with the entities they were built from ('post:12',
+'user:3'). Every tag has a version token, kept in the shared tier when there
+is one, and an entry records the tokens it was built with. Invalidating a
+tag replaces its token, so every entry built from the old one misses on its
+next read in every worker, without anyone finding or deleting it. Write
+paths invalidate their tags once their transaction commits.
+
+A miss is loaded once: concurrent readers of a key in one process wait for
+the first reader's result, and workers take turns through a short lock in
+the shared tier. An expired hot entry does not send every request in flight
+to the database at once.
+"""
+
+import math
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+from services.sqlite import SharedConnection
+from utils.serializers import dumps, loads
+
+try:
+    import redis
+except ImportError:  # only needed for CACHE_SHARED_BACKEND='redis'
+    redis = None
+
+MISSING = object()
+
+# Tag tokens outlive any entry, so an entry can't outlive the token it was built with
+TAG_TTL = 24 * 3600
+# How long a worker may keep the others waiting for it to load a key
+LOAD_LOCK_SECONDS = 5
+LOAD_POLL_SECONDS = 0.02
+# Most per-item tags a cached response records; every hit checks each one
+MAX_BODY_TAGS = 100
+
+
+class LocalCache:
+    """Process-local LRU with per-entry expiry"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            return self._live(key)
+
+    def get_many(self, keys):
+        """{key: value} for the keys present and unexpired"""
+        with self._lock:
+            found = {key: self._live(key) for key in keys}
+        return {key: value for key, value in found.items() if value is not MISSING}
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def set_many(self, values, ttl):
+        with self._lock:
+            for key, value in values.items():
+                self._store(key, value, ttl)
+
+    def add(self, key, value, ttl):
+        """Store only if the key is absent; True if this call stored it"""
+        with self._lock:
+            if self._live(key) is not MISSING:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Shared tier in a SQLite file, for workers on one host; values are stored as JSON"""
+
+    # Expired rows are swept every this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._db = SharedConnection(path, 'CREATE TABLE IF NOT EXISTS cache '
+                                          '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+        self._writes = 0
+
+    def get(self, key):
+        return self.get_many([key]).get(key, MISSING)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        with self._db as connection:
+            rows = connection.execute(
+                f"SELECT key, value FROM cache WHERE expires_at > ? AND key IN ({', '.join('?' * len(keys))})",
+                [time.time(), *keys]
+            ).fetchall()
+        return {key: loads(value) for key, value in rows}
+
+    def set(self, key, value, ttl):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, values, ttl):
+        expires_at = time.time() + ttl
+        rows = [(key, dumps(value), expires_at) for key, value in values.items()]
+        with self._db as connection:
+            connection.executemany('INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)', rows)
+            self._writes += len(values)
+            if self._writes >= self.PURGE_EVERY:
+                self._writes = 0
+                connection.execute('DELETE FROM cache WHERE expires_at <= ?', [time.time()])
+
+    def add(self, key, value, ttl):
+        now = time.time()
+        with self._db as connection:
+            cursor = connection.execute(
+                'INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at '
+                'WHERE cache.expires_at <= ?',
+                [key, dumps(value), now + ttl, now]
+            )
+            return cursor.rowcount == 1
+
+    def delete(self, *keys):
+        with self._db as connection:
+            connection.executemany('DELETE FROM cache WHERE key = ?', [(key,) for key in keys])
+
+    def clear(self):
+        with self._db as connection:
+            connection.execute('DELETE FROM cache')
+
+
+class RedisCache:
+    """Shared tier on a Redis-protocol server (Redis, Valkey, KeyDB...); values are stored as JSON"""
+
+    def __init__(self, url, prefix='peer:cache:'):
+        if redis is None:
+            raise RuntimeError("CACHE_SHARED_BACKEND='redis' needs the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.get_many([key]).get(key, MISSING)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {key: loads(value) for key, value in zip(keys, values) if value is not None}
+
+    def set(self, key, value, ttl):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, values, ttl):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.set(self.prefix + key, dumps(value), ex=max(1, math.ceil(ttl)))
+        pipeline.execute()
+
+    def add(self, key, value, ttl):
+        return bool(self.client.set(self.prefix + key, dumps(value), ex=max(1, math.ceil(ttl)), nx=True))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+class TieredCache:
+    """Local LRU in front of an optional shared tier, with tag versions, metrics and single-flight loads"""
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+        # Tag tokens have to agree across workers, so they live in the shared tier when there is one
+        self.tag_store = shared if shared is not None else LocalCache(local.max_entries)
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def tag_versions(self, tags):
+        """{tag: current token}, minting tokens for tags never seen (or evicted)"""
+        keys = {tag: f'tag:{tag}' for tag in dict.fromkeys(tags)}
+        found = self.tag_store.get_many(keys.values())
+        for key in keys.values():
+            if key not in found:
+                token = uuid.uuid4().hex
+                if not self.tag_store.add(key, token, TAG_TTL):
+                    token = self.tag_store.get(key)
+                found[key] = token
+        return {tag: found[key] for tag, key in keys.items()}
+
+    def invalidate_tags(self, *tags):
+        self.tag_store.set_many({f'tag:{tag}': uuid.uuid4().hex for tag in tags}, TAG_TTL)
+
+    def _fresh(self, entries):
+        """{key: value} of the entries whose tags still have the tokens they were built with"""
+        versions = self.tag_versions(tag for entry_versions, _, _ in entries.values() for tag in entry_versions)
+        return {key: value for key, (entry_versions, value, _) in entries.items()
+                if all(versions[tag] == token for tag, token in entry_versions.items())}
+
+    def _lookup(self, keys):
+        """{key: value} of the fresh entries among `keys`, from the local tier first"""
+        entries = self.local.get_many(keys)
+        found = self._fresh(entries)
+        self._count('local_hits', len(found))
+        stale = set(entries) - set(found)
+        missing = [key for key in keys if key not in found]
+        if missing and self.shared is not None:
+            entries = self.shared.get_many(missing)
+            fresh = self._fresh(entries)
+            self._count('shared_hits', len(fresh))
+            for key in fresh:
+                self.local.set(key, entries[key], entries[key][2] - time.time())
+            found.update(fresh)
+            stale |= set(entries)
+        self._count('stale', len(stale - set(found)))
+        return found
+
+    def _store(self, values, ttl, versions):
+        expires_at = time.time() + ttl
+        entries = {key: [versions[key], value, expires_at] for key, value in values.items()}
+        self.local.set_many(entries, ttl)
+        if self.shared is not None:
+            self.shared.set_many(entries, ttl)
+
+    def get_many(self, keys):
+        found = self._lookup(list(keys))
+        self._count('misses', len(keys) - len(found))
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key, MISSING)
+
+    def set(self, key, value, ttl, tags=()):
+        self._store({key: value}, ttl, {key: self.tag_versions(tags)})
+
+    def load_many(self, keys, ttl, load, tags=None):
+        """Load the values of `keys` (a {id: key} map) with load(ids) and store them; tags(id) lists an entry's tags"""
+        versions = {key: self.tag_versions(tags(i) if tags else ()) for i, key in keys.items()}
+        loaded = load(list(keys))
+        self._count('loads')
+        self._store({keys[i]: value for i, value in loaded.items() if value is not None}, ttl, versions)
+        return loaded
+
+    def _load(self, key, ttl, load, tags, value_tags):
+        # Tokens are read before loading: a write that lands mid-load leaves the entry already stale
+        versions = self.tag_versions(tags)
+        value = load()
+        self._count('loads')
+        if value is not None:
+            if value_tags is not None:
+                versions.update(self.tag_versions(value_tags(value)))
+            self._store({key: value}, ttl, {key: versions})
+        return value
+
+    def _wait_for(self, key):
+        """Poll for a value another worker is loading, until its lock would have expired"""
+        deadline = time.monotonic() + LOAD_LOCK_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(LOAD_POLL_SECONDS)
+            value = self._lookup([key]).get(key, MISSING)
+            if value is not MISSING:
+                return value
+        return MISSING
+
+    def fetch(self, key, ttl, load, tags=(), value_tags=None):
+        """The fresh value of `key`, or load() stored for `ttl` seconds; a miss is loaded once across callers"""
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = threading.Event()
+        if not leader:
+            flight.wait(LOAD_LOCK_SECONDS)
+            value = self._lookup([key]).get(key, MISSING)
+            if value is not MISSING:
+                self._count('coalesced')
+                return value
+            return self._load(key, ttl, load, tags, value_tags)
+
+        lock_key = f'lock:{key}'
+        locked = False
+        try:
+            if self.shared is not None:
+                locked = self.shared.add(lock_key, 1, LOAD_LOCK_SECONDS)
+                if not locked:
+                    value = self._wait_for(key)
+                    if value is not MISSING:
+                        self._count('coalesced')
+                        return value
+            return self._load(key, ttl, load, tags, value_tags)
+        finally:
+            if locked:
+                self.shared.delete(lock_key)
+            with self._lock:
+                del self._flights[key]
+            flight.set()
+
+    def delete(self, *keys):
+        """Drop entries by key; only this worker's local tier, so prefer tags for shared data"""
+        self.local.delete(*keys)
+        if self.shared is not None:
+            self.shared.delete(*keys)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+        if self.tag_store is not self.shared:
+            self.tag_store.clear()
+
+    def metrics(self):
+        with self._lock:
+            counts = dict(self.counts)
+        hits = counts.get('local_hits', 0) + counts.get('shared_hits', 0)
+        lookups = hits + counts.get('misses', 0)
+        return {
+            **{name: counts.get(name, 0) for name in
+               ('local_hits', 'shared_hits', 'misses', 'stale', 'loads', 'coalesced')},
+            'hit_rate': round(hits / lookups, 3) if lookups else None,
+            'local_entries': len(self.local),
+        }
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+# Invalidated with every post_tag(), for responses listing too many posts to tag each
+ANY_POST_TAG = 'post:*'
+
+
+def _shared_tier(config):
+    backend = config.get('CACHE_SHARED_BACKEND') or None
+    if backend == 'sqlite':
+        return SQLiteCache(config['CACHE_SQLITE_PATH'])
+    if backend == 'redis':
+        return RedisCache(config['CACHE_REDIS_URL'])
+    if backend is not None:
+        raise ValueError(f"Unknown CACHE_SHARED_BACKEND {backend!r}")
+    return None
+
+
+BACKENDS = {
+    'local': LocalCache,
+}
+
+
+def get_cache():
+    """The app's cache, created on first use from CACHE_BACKEND and CACHE_SHARED_BACKEND"""
+    cache = current_app.extensions.get('cache')
+    if cache is None:
+        config = current_app.config
+        local = BACKENDS[config.get('CACHE_BACKEND', 'local')](config.get('CACHE_MAX_ENTRIES', 10000))
+        cache = TieredCache(local, _shared_tier(config))
+        current_app.extensions['cache'] = cache
+    return cache
+
+
+def cached(key, ttl, load, tags=(), value_tags=None):
+    """The cached value for `key`, or load() stored for `ttl` seconds; None is never cached.
+
+    `tags` name the entities the value is built from; value_tags(value) adds
+    tags that are only known once it is loaded.
+    """
+    return get_cache().fetch(key, ttl, load, tags, value_tags)
+
+
+def cached_many(ids, key, ttl, load, tags=None):
+    """{id: value} for `ids`, where load(missing_ids) returns {id: value} for the cache misses only"""
+    cache = get_cache()
+    keys = {i: key(i) for i in dict.fromkeys(ids)}
+    hits = cache.get_many(keys.values())
+    values = {i: hits[k] for i, k in keys.items() if k in hits}
+    missing = {i: k for i, k in keys.items() if i not in values}
+    if missing:
+        values.update(cache.load_many(missing, ttl, load, tags))
+    return values
+
+
+def invalidate(*keys):
+    """Drop cached values by key; call after the write that made them stale commits"""
+    get_cache().delete(*keys)
+
+
+def invalidate_tags(*tags):
+    """Make every entry tagged with any of `tags` stale, in every worker; call after commit"""
+    get_cache().invalidate_tags(*tags)
+
+
+def tag_stamp(*tags):
+    """Current tokens of `tags`: a version of whatever they cover that costs no query"""
+    versions = get_cache().tag_versions(tags)
+    return tuple(versions[tag] for tag in tags)
+
+
+def cache_metrics():
+    return get_cache().metrics()
+
+
+def cached_response(ttl_setting, tags=None, body_tags=None, overflow_tags=()):
+    """Cache a JSON GET view's 200 responses per endpoint, viewer and query string.
+
+    The TTL is read from the `ttl_setting` config key. tags(**view_args) and
+    body_tags(body) name the entities a response was built from. A body with
+    more than MAX_BODY_TAGS item tags is tagged with `overflow_tags` instead,
+    so a hit never checks a version per row of a long listing. Goes below
+    @jwt_required().
+    """
+    def value_tags(body):
+        found = body_tags(body)
+        return found if len(found) <= MAX_BODY_TAGS else list(overflow_tags)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            query = urlencode(sorted(request.args.items(multi=True)))
+            key = f'view:{request.endpoint}:{get_jwt_identity()}:{request.path}?{query}'
+            uncached = []
+
+            def load():
+                response = current_app.make_response(view(**view_args))
+                if response.status_code != 200:
+                    uncached.append(response)
+                    return None
+                return response.get_json()
+
+            body = cached(key, current_app.config[ttl_setting], load,
+                          tags(**view_args) if tags else (), value_tags if body_tags else None)
+            if uncached:
+                return uncached[0]
+            return jsonify(body), 200
+        return wrapper
+    return decorator
@@ -0,0 +1,146 @@
+"""
+Negotiated gzip / brotli compression of API responses.
+
+init_compression(app) installs an after_request hook. A response is
+compressed when the client accepts gzip or br, its type is textual (JSON,
+text, SVG...), it is at least COMPRESS_MIN_SIZE bytes and nothing has
+encoded it already. Brotli wins when the brotli package is installed and
+the client's q-values don't prefer gzip. Images pass through untouched:
+they are compressed formats already, and send_upload streams them from disk.
+
+Buffered bodies are compressed in one call. Streamed bodies are compressed
+chunk by chunk as they are produced, with a sync flush after each chunk so
+the client never waits for the end of the stream. The SSE stream is left
+alone; its frames are tiny and some proxies hold back encoded event streams.
+
+Compressing costs CPU on every request, so the compressed bytes of
+responses with an ETag, the ones clients ask for again, are kept in a local
+LRU. They are keyed by a digest of the body and the encoding, not by the
+ETag: a weak ETag (services.conditional) promises an equivalent body, not
+the same bytes, so two bodies may share one. Hashing the body is far
+cheaper than compressing it, so a hot page that has not changed is still
+compressed once per worker.
+"""
+
+import hashlib
+import zlib
+
+from flask import request
+
+from services.cache import MISSING, LocalCache
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/javascript', 'application/xml', 'image/svg+xml'}
+SKIPPED_TYPES = {'text/event-stream'}
+# gzip framing for zlib (16 + the maximum window size)
+GZIP_WBITS = 31
+
+
+class GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def available_encodings():
+    """Encodings this process can produce, in order of preference"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(data, encoding, config):
+    """`data` compressed whole with `encoding` at the configured level"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    compressor = zlib.compressobj(config['COMPRESS_LEVEL'], zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, config):
+    """Compressed chunks of `chunks` with `encoding`, each flushed as it is produced"""
+    if encoding == 'br':
+        stream = BrotliStream(config['COMPRESS_BROTLI_QUALITY'])
+    else:
+        stream = GzipStream(config['COMPRESS_LEVEL'])
+    return _stream(chunks, stream)
+
+
+def _stream(chunks, stream):
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield stream.compress(chunk)
+        yield stream.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def is_compressible(response):
+    mimetype = response.mimetype or ''
+    if mimetype in SKIPPED_TYPES:
+        return False
+    return (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+            or mimetype.endswith('+json') or mimetype.endswith('+xml'))
+
+
+def compressed_variants(app):
+    """The app's LRU of compressed bodies, created on first use"""
+    variants = app.extensions.get('compression_cache')
+    if variants is None:
+        variants = app.extensions['compression_cache'] = LocalCache(app.config['COMPRESS_CACHE_ENTRIES'])
+    return variants
+
+
+def init_compression(app):
+    """Compress responses of `app` for clients that accept it"""
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or not is_compressible(response)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(available_encodings())
+        if encoding is None:
+            return response
+        config = app.config
+
+        if response.is_streamed:
+            response.response = compress_stream(response.iter_encoded(), encoding, config)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            variants = compressed_variants(app)
+            etag, _ = response.get_etag()
+            key = f'{hashlib.blake2b(data, digest_size=16).hexdigest()}:{encoding}' if etag else None
+            compressed = variants.get(key) if key else MISSING
+            if compressed is MISSING:
+                compressed = compress(data, encoding, config)
+                if key:
+                    variants.set(key, compressed, config['COMPRESS_CACHE_TTL'])
+            response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,84 @@
+"""
+Follow graph.
+
+Connection rows are directed edges with an index in each direction, and
+User.followers_count / following_count cache the degree of every user, so
+neither counts nor "who follows whom" checks ever aggregate the edge table.
+Following someone also keeps the follower's home timeline in step
+(services.feed).
+"""
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models.connection import Connection
+from models.user import User, db
+from services.feed import backfill_author, remove_author
+
+# Upper bound on ids per bulk status lookup, to keep the IN lists sane
+MAX_STATUS_IDS = 500
+
+
+def _bump_counts(follower_id, followed_id, delta):
+    db.session.execute(
+        update(User).where(User.id == follower_id).values(following_count=User.following_count + delta)
+    )
+    db.session.execute(
+        update(User).where(User.id == followed_id).values(followers_count=User.followers_count + delta)
+    )
+
+
+def follow(follower_id, followed_id):
+    """Add the edge and bump both counters; False if it already existed. The caller commits"""
+    try:
+        db.session.add(Connection(follower_id=follower_id, followed_id=followed_id))
+        db.session.flush()
+    except IntegrityError:
+        # Already following (possibly from a concurrent request); nothing else is pending
+        db.session.rollback()
+        return False
+    _bump_counts(follower_id, followed_id, 1)
+    backfill_author(follower_id, followed_id)
+    return True
+
+
+def unfollow(follower_id, followed_id):
+    """Remove the edge and drop both counters; False if there was none. The caller commits"""
+    deleted = Connection.query.filter_by(
+        follower_id=follower_id, followed_id=followed_id
+    ).delete(synchronize_session=False)
+    if not deleted:
+        return False
+    _bump_counts(follower_id, followed_id, -1)
+    remove_author(follower_id, followed_id)
+    return True
+
+
+def connection_status(viewer_id, user_ids):
+    """Map each user id to {'following', 'followed_by'} relative to the viewer in one query"""
+    user_ids = set(user_ids)
+    status = {user_id: {'following': False, 'followed_by': False} for user_id in user_ids}
+    if not user_ids:
+        return status
+
+    edges = db.session.execute(
+        select(Connection.follower_id, Connection.followed_id).where(or_(
+            and_(Connection.follower_id == viewer_id, Connection.followed_id.in_(user_ids)),
+            and_(Connection.followed_id == viewer_id, Connection.follower_id.in_(user_ids)),
+        ))
+    )
+    for follower_id, followed_id in edges:
+        if follower_id == viewer_id:
+            status[followed_id]['following'] = True
+        if followed_id == viewer_id:
+            status[follower_id]['followed_by'] = True
+    return status
+
+
+def connections_query(user_id, direction):
+    """(Connection, User) rows for the users `user_id` follows or is followed by"""
+    if direction == 'followers':
+        return db.session.query(Connection, User).join(User, User.id == Connection.follower_id) \
+            .filter(Connection.followed_id == user_id)
+    return db.session.query(Connection, User).join(User, User.id == Connection.followed_id) \
+        .filter(Connection.follower_id == user_id)
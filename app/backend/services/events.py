@@ -0,0 +1,158 @@
+"""
+Real-time events: a pub/sub broker feeding the /api/events SSE stream.
+
+Handlers publish once their transaction commits, for example a new message,
+a like or a new post. The broker hands each event to the queues of that
+user's open streams. Backends are pluggable through EVENTS_BACKEND:
+
+- 'local' keeps subscribers in this process, so it only reaches streams
+  served by the publishing worker. gunicorn_config runs a single worker
+  while it is selected. It is also the stand-in used by tests.
+- 'redis' relays every event through a Redis pub/sub channel
+  (EVENTS_REDIS_URL). Each worker listens on it and hands events to its own
+  streams, so any number of workers and hosts can serve /api/events.
+
+Queues come from the standard library. The gevent worker monkey-patches
+them, so thousands of idle streams cost a greenlet and a queue each, not a
+thread.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from utils.serializers import dumps, loads
+
+try:
+    import redis
+except ImportError:  # only needed for EVENTS_BACKEND='redis'
+    redis = None
+
+# Events a slow client may fall behind by before newer ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class LocalBackend:
+    """In-process fan-out from user ids to their subscribers' queues"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id):
+        subscription = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_ids, event, data):
+        message = {'id': next(self._ids), 'event': event, 'data': data}
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                print(f"⚠️ Dropping {event} event for a stream that is not keeping up")
+        return len(targets)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+
+class RedisBackend:
+    """Relays events between processes through Redis pub/sub; each process delivers to its own streams"""
+
+    def __init__(self, url, channel='events', client=None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("EVENTS_BACKEND='redis' needs the redis package")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.channel = channel
+        self.local = LocalBackend()
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    def _listen(self, pubsub):
+        while True:
+            try:
+                for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        event = loads(message['data'])
+                        self.local.publish(event['user_ids'], event['event'], event['data'])
+            except Exception as e:
+                print(f"⚠️ Lost the Redis events channel, resubscribing: {e}")
+                time.sleep(1)
+                pubsub = self._pubsub()
+
+    def _pubsub(self):
+        pubsub = self.client.pubsub()
+        pubsub.subscribe(self.channel)
+        return pubsub
+
+    def _ensure_listener(self):
+        # One listener per worker, started on its first stream: a thread
+        # started before gunicorn forks does not exist in the children
+        with self._lock:
+            if self._listener_pid != os.getpid():
+                # Subscribed before returning, so the caller misses nothing
+                pubsub = self._pubsub()
+                threading.Thread(target=self._listen, args=(pubsub,), name='events-relay', daemon=True).start()
+                self._listener_pid = os.getpid()
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return self.local.subscribe(user_id)
+
+    def unsubscribe(self, user_id, subscription):
+        self.local.unsubscribe(user_id, subscription)
+
+    def publish(self, user_ids, event, data):
+        """Returns how many processes are listening, not how many streams"""
+        message = {'user_ids': sorted(set(user_ids)), 'event': event, 'data': data}
+        return self.client.publish(self.channel, dumps(message))
+
+    def connection_count(self):
+        return self.local.connection_count()
+
+
+BACKENDS = {
+    'local': lambda config: LocalBackend(),
+    'redis': lambda config: RedisBackend(config['EVENTS_REDIS_URL']),
+}
+
+
+def get_broker():
+    """The app's event broker, created on first use from EVENTS_BACKEND"""
+    broker = current_app.extensions.get('events_broker')
+    if broker is None:
+        backend = current_app.config.get('EVENTS_BACKEND', 'local')
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown EVENTS_BACKEND {backend!r}")
+        broker = current_app.extensions['events_broker'] = BACKENDS[backend](current_app.config)
+    return broker
+
+
+def publish(user_ids, event, data):
+    """Deliver an event to every open stream of the given users; call after commit"""
+    return get_broker().publish(user_ids, event, data)
+
+
+def format_sse(message):
+    """Encode a broker message as a text/event-stream frame"""
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {dumps(message['data'])}\n\n"
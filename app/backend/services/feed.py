@@ -0,0 +1,204 @@
+"""
+Home timelines.
+
+A new post is copied into the timeline of its author and each of their
+followers (fan-out-on-write), so reading a feed page is one index seek on
+timeline_entry however many posts exist. Authors with more than
+FEED_FANOUT_LIMIT followers skip the copy: their posts keep fanned_out=False
+and are merged into their followers' feeds at read time (fan-out-on-read),
+so one post never turns into an unbounded burst of inserts.
+
+The copy runs in the task worker (the 'feed.fan_out' task), not in the
+request that creates the post. Until it runs, the post still has
+fanned_out=False, and posts younger than FEED_PENDING_SECONDS are merged
+into feeds on read too, so followers see it at once. The task is queued
+after the post commits. Every FEED_SWEEP_SECONDS the worker's 'feed.sweep'
+walks all posts still un-fanned (ix_post_fanned_out_created_at_id) and
+queues fan-out again for those of small-audience authors, however old, so
+a lost task delays a post but never drops it. When an author drops back to
+FEED_FANOUT_LIMIT followers, 'feed.fan_out_author' copies the posts they
+wrote while they were served on read without waiting for the sweep.
+
+Reading a page therefore costs one seek on timeline_entry, one per followed
+large-audience author and one over the posts still waiting for the worker,
+each limited to the page size; it never walks the backlog of every
+un-fanned post.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import false, insert, literal, or_, select, true, tuple_, union_all
+
+from models.connection import Connection
+from models.post import Post
+from models.timeline import TimelineEntry
+from models.user import User, db
+from services.sqlite import serialized_write
+from services.tasks import enqueue, periodic, task
+
+FANOUT_BATCH_SIZE = 500
+# Recent posts copied into a timeline when its owner follows someone new
+BACKFILL_POSTS = 50
+
+
+def audience_ids(author_id):
+    """Ids of the users whose timelines receive the author's posts"""
+    return db.session.scalars(select(Connection.follower_id).where(Connection.followed_id == author_id)).all()
+
+
+def fanout_audience(author):
+    """Sorted ids of the timelines the author's posts are copied into; empty for audiences served on read"""
+    if author.followers_count > current_app.config['FEED_FANOUT_LIMIT']:
+        return []
+    audience = set(audience_ids(author.id))
+    audience.add(author.id)
+    return sorted(audience)
+
+
+def fan_out_post(post):
+    """Copy a flushed post into its audience's timelines and return their ids; the caller commits"""
+    audience = fanout_audience(db.session.get(User, post.user_id))
+    if not audience:
+        print(f"🔵 Post {post.id} has a large audience, served by fan-out-on-read")
+        return []
+
+    rows = [
+        {'user_id': user_id, 'post_id': post.id, 'author_id': post.user_id, 'created_at': post.created_at}
+        for user_id in audience
+    ]
+    for start in range(0, len(rows), FANOUT_BATCH_SIZE):
+        db.session.execute(insert(TimelineEntry), rows[start:start + FANOUT_BATCH_SIZE])
+    post.fanned_out = True
+    return audience
+
+
+@task('feed.fan_out')
+@serialized_write
+def fan_out_task(post_id):
+    """Fan out a committed post; a no-op if it was deleted or already fanned out"""
+    post = db.session.get(Post, post_id)
+    if post is None or post.fanned_out:
+        return
+    fan_out_post(post)
+    db.session.commit()
+
+
+@task('feed.fan_out_author')
+def fan_out_author_task(author_id):
+    """Fan out the posts an author wrote while their audience was too large, oldest first"""
+    last_id = 0
+    while True:
+        author = db.session.get(User, author_id)
+        if author is None or author.followers_count > current_app.config['FEED_FANOUT_LIMIT']:
+            return
+        batch = db.session.scalars(
+            select(Post.id)
+            .where(Post.user_id == author_id, Post.fanned_out == false(), Post.id > last_id)
+            .order_by(Post.id)
+            .limit(FANOUT_BATCH_SIZE)
+        ).all()
+        if not batch:
+            return
+        for post_id in batch:
+            fan_out_task(post_id)
+        last_id = batch[-1]
+
+
+def schedule_author_fan_out(author_id):
+    """After an unfollow commits: queue the author's on-read posts if their audience just became small"""
+    author = db.session.get(User, author_id)
+    if author is None or author.followers_count != current_app.config['FEED_FANOUT_LIMIT']:
+        return
+    try:
+        enqueue('feed.fan_out_author', {'author_id': author_id})
+    except Exception as e:
+        print(f"⚠️ Could not queue fan-out of user {author_id}'s on-read posts: {e}")
+
+
+@periodic('feed.sweep', every='FEED_SWEEP_SECONDS')
+def sweep_pending_posts():
+    """Queue fan-out again for every un-fanned post of a small-audience author older than a sweep"""
+    config = current_app.config
+    before = datetime.utcnow() - timedelta(seconds=config['FEED_SWEEP_SECONDS'])
+    requeued, last = 0, None
+    while True:
+        query = select(Post.created_at, Post.id).join(User, User.id == Post.user_id).where(
+            Post.fanned_out == false(),
+            Post.created_at < before,
+            User.followers_count <= config['FEED_FANOUT_LIMIT']
+        )
+        if last is not None:
+            query = query.where(tuple_(Post.created_at, Post.id) > last)
+        batch = db.session.execute(query.order_by(Post.created_at, Post.id).limit(FANOUT_BATCH_SIZE)).all()
+        if not batch:
+            break
+        for _, post_id in batch:
+            # Its own key: the original task's key may be retained as done
+            requeued += enqueue('feed.fan_out', {'post_id': post_id}, key=f'fan-out-sweep:{post_id}')
+        last = tuple(batch[-1])
+    if requeued:
+        print(f"🔵 Requeued fan-out of {requeued} posts whose task went missing")
+
+
+def remove_post(post_id):
+    """Drop a post from every timeline it was copied into"""
+    TimelineEntry.query.filter_by(post_id=post_id).delete(synchronize_session=False)
+
+
+def backfill_author(user_id, author_id):
+    """Copy the author's recent fanned-out posts into a new follower's timeline"""
+    recent = (
+        select(literal(user_id), Post.id, Post.user_id, Post.created_at)
+        .where(Post.user_id == author_id, Post.fanned_out == true())
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(BACKFILL_POSTS)
+    )
+    db.session.execute(
+        insert(TimelineEntry).from_select(['user_id', 'post_id', 'author_id', 'created_at'], recent)
+    )
+
+
+def remove_author(user_id, author_id):
+    """Drop an unfollowed author's posts from a timeline"""
+    TimelineEntry.query.filter_by(user_id=user_id, author_id=author_id).delete(synchronize_session=False)
+
+
+def on_read_authors(viewer_id):
+    """Ids of the viewer and the authors they follow whose audience is too large for fan-out-on-write"""
+    followed = select(Connection.followed_id).where(Connection.follower_id == viewer_id)
+    return db.session.scalars(select(User.id).where(
+        User.followers_count > current_app.config['FEED_FANOUT_LIMIT'],
+        or_(User.id == viewer_id, User.id.in_(followed))
+    )).all()
+
+
+def timeline_post_ids(viewer_id, page):
+    """Ids of one feed page plus a look-ahead row, newest first, for CursorPage.finish"""
+    followed = select(Connection.followed_id).where(Connection.follower_id == viewer_id)
+    sources = [
+        page.apply(
+            select(TimelineEntry.created_at, TimelineEntry.post_id).filter(TimelineEntry.user_id == viewer_id),
+            TimelineEntry.created_at, TimelineEntry.post_id
+        ),
+        # Recent posts the worker has not fanned out yet
+        page.apply(
+            select(Post.created_at, Post.id).filter(
+                Post.fanned_out == false(),
+                Post.created_at >= datetime.utcnow() - timedelta(seconds=current_app.config['FEED_PENDING_SECONDS']),
+                or_(Post.user_id == viewer_id, Post.user_id.in_(followed))
+            ),
+            Post.created_at, Post.id
+        ),
+    ]
+    # Large-audience authors, one seek each on ix_post_user_id_created_at_id
+    for author_id in on_read_authors(viewer_id):
+        sources.append(page.apply(
+            select(Post.created_at, Post.id).filter(Post.user_id == author_id, Post.fanned_out == false()),
+            Post.created_at, Post.id
+        ))
+    # Each source is sorted and limited to the page, so this merges at most
+    # (page + 1) rows per source
+    rows = db.session.execute(union_all(*[select(source.subquery()) for source in sources])).all()
+    keys = sorted({tuple(row) for row in rows}, reverse=True)
+    return [post_id for _, post_id in keys[:page.limit + 1]]
@@ -0,0 +1,195 @@
+"""
+Resized image derivatives generated off the request path.
+
+Upload endpoints hand the saved original to schedule_derivatives(), which
+queues an 'images.derivatives' task for the task worker. The task writes
+downscaled WebP (and AVIF, when Pillow supports it) copies beside the
+original, named `<stem>.<width>w.<format>`. The original is never modified.
+Each original is queued once, keyed by its path, and a failed resize is
+retried with backoff like any other task.
+
+Once the files are written, the task records which variants exist on the
+row that shows the image (Post.image_variants, ProfilePhoto.variants) as
+space-separated '<width>w.<format>' names. Serializers pass that list to
+srcset_for(), so building a srcset never touches the filesystem and a feed
+render never waits for a resize. NULL means nothing is recorded yet, and
+the original is served until then.
+
+Only image URLs this server handed out (ISSUED_URL) are ever resized, and
+local_path_for_url() refuses any path that resolves outside the uploads
+directory or the blob store, so a client-supplied URL cannot point the
+worker at another file.
+"""
+
+import os
+import re
+import tempfile
+
+from flask import current_app
+
+from models.post import Post
+from models.profile import Profile, ProfilePhoto
+from models.user import db
+from services.cache import ANY_POST_TAG, invalidate_tags, post_tag, user_tag
+from services.sqlite import serialized_write
+from services.tasks import enqueue, task
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; without it only originals are served
+    Image = None
+
+# Target widths: avatar, thumbnail / 2x avatar, feed column
+WIDTHS = (96, 320, 680)
+
+# (format, Pillow save options) tuned for photos and screenshots
+FORMATS = [('webp', {'quality': 80, 'method': 6})]
+if Image is not None and features.check('avif'):
+    FORMATS.append(('avif', {'quality': 60, 'speed': 6}))
+
+
+# URLs of uploaded photos (uuid-named files) and blob store entries (sha256-named)
+ISSUED_URL = re.compile(
+    r'^/uploads/(?:(?:post|profile)_photos/[\w.-]+|blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64})\.(?:png|jpg|jpeg|gif)$'
+)
+
+
+def is_issued_url(url):
+    """True for image URLs in the shape the upload endpoints and the blob store hand out"""
+    return bool(url) and ISSUED_URL.match(url) is not None
+
+
+def local_path_for_url(url):
+    """Map an /uploads URL to the file it is served from; None if that would be outside its tree"""
+    blob_prefix = '/uploads/blobs/'
+    if url.startswith(blob_prefix):
+        from services.blob_store import DEFAULT_ROOT
+        root, relative = current_app.config.get('BLOB_STORE_ROOT', DEFAULT_ROOT), url[len(blob_prefix):]
+    elif url.startswith('/uploads/'):
+        root, relative = 'uploads', url[len('/uploads/'):]
+    else:
+        return None
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, relative))
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+
+def derivative_name(name, width, fmt):
+    return f"{os.path.splitext(name)[0]}.{width}w.{fmt}"
+
+
+def generate_derivatives(original_path):
+    """Write every missing derivative of `original_path`; safe to call repeatedly"""
+    if Image is None:
+        return
+    with Image.open(original_path) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        for width in WIDTHS:
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            resized = None
+            for fmt, options in FORMATS:
+                path = derivative_name(original_path, width, fmt)
+                if os.path.exists(path):
+                    continue
+                if resized is None:
+                    resized = image.resize((width, height), Image.LANCZOS)
+                # Write beside the target and rename so readers never see a partial file
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+                os.close(fd)
+                try:
+                    resized.save(temp_path, format=fmt.upper(), **options)
+                    os.replace(temp_path, path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+
+
+def existing_variants(path):
+    """The '<width>w.<format>' names of the derivatives written beside `path`, space-separated"""
+    return ' '.join(
+        f'{width}w.{fmt}'
+        for fmt, _ in FORMATS
+        for width in WIDTHS
+        if os.path.exists(derivative_name(path, width, fmt))
+    )
+
+
+@serialized_write
+def record_variants(url, variants, post_id=None, user_id=None):
+    """Store the variant list on the post or profile photo still showing `url`.
+
+    The srcset is part of the payload, so this moves the row's version on
+    like any other write: the post's updated_at (by onupdate) or the profile's.
+    """
+    from services.profiles import touch_profile  # services.profiles imports this module
+
+    if post_id is not None:
+        db.session.execute(
+            Post.__table__.update()
+            .where(Post.id == post_id, Post.image_url == url)
+            .values(image_variants=variants)
+        )
+    if user_id is not None:
+        profile_ids = db.session.query(Profile.id).filter(Profile.user_id == user_id).scalar_subquery()
+        recorded = db.session.execute(
+            ProfilePhoto.__table__.update()
+            .where(ProfilePhoto.profile_id.in_(profile_ids), ProfilePhoto.url == url)
+            .values(variants=variants)
+        ).rowcount
+        if recorded:
+            touch_profile(user_id)
+    db.session.commit()
+
+
+@task('images.derivatives')
+def derivatives_task(path, url=None, post_id=None, user_id=None):
+    """Worker side of schedule_derivatives(); a retry only writes what is still missing"""
+    generate_derivatives(path)
+    if post_id is None and user_id is None:
+        return
+    record_variants(url, existing_variants(path), post_id=post_id, user_id=user_id)
+    # Cached pages, profiles and cards were built with the original-only srcset
+    tags = []
+    if post_id is not None:
+        tags += [post_tag(post_id), ANY_POST_TAG]
+    if user_id is not None:
+        tags.append(user_tag(user_id))
+    invalidate_tags(*tags)
+
+
+def schedule_derivatives(url, post_id=None, user_id=None):
+    """Queue derivative generation for an uploaded image URL and return immediately.
+
+    With a post_id or user_id the task also records the variants on that
+    post or on that user's profile photo, once they are committed.
+    """
+    if Image is None or not is_issued_url(url):
+        return False
+    path = local_path_for_url(url)
+    if path is None:
+        return False
+    owner = f':post:{post_id}' if post_id is not None else f':user:{user_id}' if user_id is not None else ''
+    try:
+        return enqueue('images.derivatives', {'path': path, 'url': url, 'post_id': post_id, 'user_id': user_id},
+                       key=f'derivatives:{path}{owner}')
+    except Exception as e:
+        # Variants are an optimization: without them srcset_for() serves the original
+        print(f"⚠️  Could not queue derivatives for {url}: {e}")
+        return False
+
+
+def srcset_for(url, variants=None):
+    """srcset-style map of the recorded `variants` of `url`, plus the original"""
+    if not url:
+        return None
+    srcset = {'original': url}
+    for name in (variants or '').split():
+        width, fmt = name.split('.')
+        srcset.setdefault(fmt, {})[width] = derivative_name(url, int(width[:-1]), fmt)
+    return srcset
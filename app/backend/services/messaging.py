@@ -0,0 +1,129 @@
+"""
+Direct messaging.
+
+Each pair of users shares one Conversation. Sending a message updates the
+denormalized state in the same transaction: the conversation's last
+message, each member's sort key and the receiver's unread counters. The
+inbox and the unread badge then read only their own rows and never
+aggregate the message table.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import and_, false, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from models.message import Conversation, ConversationMember, Message
+from models.user import User, db
+
+
+def pair_key(user_a, user_b):
+    low, high = sorted((user_a, user_b))
+    return f'{low}:{high}'
+
+
+def get_or_create_conversation(user_a, user_b):
+    """The pair's conversation, created with both members on first use"""
+    key = pair_key(user_a, user_b)
+    conversation = Conversation.query.filter_by(pair_key=key).first()
+    if conversation:
+        return conversation
+    try:
+        conversation = Conversation(pair_key=key)
+        db.session.add(conversation)
+        db.session.flush()
+        db.session.add_all([
+            ConversationMember(conversation_id=conversation.id, user_id=user_a),
+            ConversationMember(conversation_id=conversation.id, user_id=user_b),
+        ])
+        db.session.flush()
+    except IntegrityError:
+        # A concurrent first message created it; nothing else is pending
+        db.session.rollback()
+        conversation = Conversation.query.filter_by(pair_key=key).one()
+    return conversation
+
+
+def send_message(sender_id, receiver_id, content):
+    """Store a message and update the denormalized inbox state; the caller commits"""
+    conversation = get_or_create_conversation(sender_id, receiver_id)
+    message = Message(
+        conversation_id=conversation.id,
+        sender_id=sender_id,
+        receiver_id=receiver_id,
+        content=content,
+        timestamp=datetime.utcnow(),
+        is_read=False
+    )
+    db.session.add(message)
+    db.session.flush()
+
+    conversation.last_message_id = message.id
+    conversation.last_message_at = message.timestamp
+    db.session.execute(
+        update(ConversationMember)
+        .where(ConversationMember.conversation_id == conversation.id)
+        .values(last_message_at=message.timestamp)
+    )
+    db.session.execute(
+        update(ConversationMember)
+        .where(ConversationMember.conversation_id == conversation.id, ConversationMember.user_id == receiver_id)
+        .values(unread_count=ConversationMember.unread_count + 1)
+    )
+    db.session.execute(
+        update(User).where(User.id == receiver_id)
+        .values(unread_messages_count=User.unread_messages_count + 1)
+    )
+    return message
+
+
+def mark_read(conversation_id, user_id):
+    """Clear a member's unread messages; False if they are not a member. The caller commits"""
+    member = ConversationMember.query.filter_by(
+        conversation_id=conversation_id, user_id=user_id
+    ).with_for_update().first()
+    if not member:
+        return False
+    if member.unread_count:
+        db.session.execute(
+            update(User).where(User.id == user_id)
+            .values(unread_messages_count=User.unread_messages_count - member.unread_count)
+        )
+        db.session.execute(
+            update(Message)
+            .where(Message.conversation_id == conversation_id, Message.receiver_id == user_id,
+                   Message.is_read == false())
+            .values(is_read=True)
+            .execution_options(synchronize_session=False)
+        )
+        member.unread_count = 0
+    return True
+
+
+def inbox_query(user_id):
+    """One row per conversation: (member, conversation, last message, other user)"""
+    me = aliased(ConversationMember)
+    other = aliased(ConversationMember)
+    query = (
+        db.session.query(me, Conversation, Message, User)
+        .join(Conversation, Conversation.id == me.conversation_id)
+        .join(other, and_(other.conversation_id == me.conversation_id, other.user_id != me.user_id))
+        .join(User, User.id == other.user_id)
+        .outerjoin(Message, Message.id == Conversation.last_message_id)
+        .filter(me.user_id == user_id)
+    )
+    return query, (me.last_message_at, me.conversation_id)
+
+
+def history_query(conversation_id):
+    """Messages of a conversation, for CursorPage on (timestamp, id)"""
+    return Message.query.filter(Message.conversation_id == conversation_id)
+
+
+def is_member(conversation_id, user_id):
+    return db.session.execute(
+        select(ConversationMember.id).where(
+            ConversationMember.conversation_id == conversation_id, ConversationMember.user_id == user_id
+        )
+    ).first() is not None
@@ -0,0 +1,190 @@
+"""
+Profiles: created with the user at signup, read as one aggregate.
+
+The GET /api/profile payload (profile, experience, education,
+achievements, photos and the account) is assembled from a single query:
+each list is a JSON aggregate subquery next to the profile row. The
+assembled payload is cached per user for PROFILE_CACHE_TTL seconds, tagged
+with the user, and every profile write invalidates the tag after committing. Other users see the
+same payload without the account's email.
+
+Cards are the compact name / headline / avatar summary that feeds and
+conversation lists show next to many users at once. They are cached per
+user too, and the cache misses of a batch are loaded with one IN query.
+"""
+
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select, update
+
+from models.profile import Achievement, Education, Experience, Profile, ProfilePhoto
+from models.user import User, db
+from services.cache import cached, cached_many, invalidate_tags, user_tag
+from services.images import WIDTHS, srcset_for
+from utils.json_agg import json_array_agg, load_json
+from utils.serializers import Field, Serializer
+
+
+def create_profile(user):
+    """The new user's empty profile; the caller commits"""
+    profile = Profile(user_id=user.id, full_name=user.username)
+    db.session.add(profile)
+    return profile
+
+
+# Upper bound on ids per card lookup, to keep the IN lists sane
+MAX_CARD_IDS = 200
+
+
+def touch_profile(user_id):
+    """Mark the user's profile as modified now; call in every profile write, the caller commits"""
+    db.session.execute(update(Profile).where(Profile.user_id == user_id).values(updated_at=datetime.utcnow()))
+
+
+def profile_version(user_id):
+    """(updated_at, experience, education, achievement and photo counts) of a profile, or None"""
+    def count(model):
+        return select(func.count(model.id)).where(model.profile_id == Profile.id).scalar_subquery()
+
+    row = db.session.execute(
+        select(Profile.updated_at, count(Experience), count(Education), count(Achievement), count(ProfilePhoto))
+        .where(Profile.user_id == user_id)
+        .order_by(Profile.id)
+        .limit(1)
+    ).first()
+    return tuple(row) if row else None
+
+
+def profile_cache_key(user_id):
+    return f'profile:{user_id}'
+
+
+def card_cache_key(user_id):
+    return f'card:{user_id}'
+
+
+def _children(dialect, model, fields, name):
+    return select(json_array_agg(dialect, {key: getattr(model, column) for key, column in fields.items()},
+                                 model.id)).where(model.profile_id == Profile.id).scalar_subquery().label(name)
+
+
+def _experience(value):
+    experience = load_json(value)
+    for e in experience:
+        e['start_date'] = str(e['start_date']) if e['start_date'] else None
+        e['end_date'] = str(e['end_date']) if e['end_date'] else None
+    return experience
+
+
+def _photos(value):
+    photos = load_json(value)
+    for p in photos:
+        p['srcset'] = srcset_for(p['url'], p.pop('variants'))
+    return photos
+
+
+serialize_profile = Serializer(
+    profile=Serializer(
+        id='Profile.id',
+        full_name='Profile.full_name',
+        bio='Profile.bio',
+        location='Profile.location',
+        experience=Field('experience', _experience),
+        education=Field('education', load_json),
+        achievements=Field('achievements', load_json),
+        photos=Field('photos', _photos),
+    ),
+    user=Serializer(id='Profile.user_id', username='username', email='email'),
+)
+
+
+def load_profile(user_id):
+    """The profile payload of a user, or None if they have no profile"""
+    dialect = db.session.get_bind().dialect.name
+    row = db.session.execute(
+        select(
+            Profile, User.username, User.email,
+            _children(dialect, Experience, {'id': 'id', 'title': 'title', 'company': 'company',
+                                            'start_date': 'start_date', 'end_date': 'end_date',
+                                            'description': 'description'}, 'experience'),
+            _children(dialect, Education, {'id': 'id', 'school': 'school', 'degree': 'degree',
+                                           'field': 'field_of_study', 'start_year': 'start_year',
+                                           'end_year': 'end_year'}, 'education'),
+            _children(dialect, Achievement, {'id': 'id', 'title': 'title', 'description': 'description',
+                                             'date': 'date', 'image_url': 'image_url'}, 'achievements'),
+            _children(dialect, ProfilePhoto, {'id': 'id', 'url': 'url', 'variants': 'variants'}, 'photos'),
+        )
+        .join(User, User.id == Profile.user_id)
+        .where(Profile.user_id == user_id)
+        .order_by(Profile.id)
+        .limit(1)
+    ).first()
+    return serialize_profile(row) if row is not None else None
+
+
+def cached_profile(user_id):
+    return cached(profile_cache_key(user_id), current_app.config['PROFILE_CACHE_TTL'],
+                  lambda: load_profile(user_id), tags=[user_tag(user_id)])
+
+
+def public_profile(user_id):
+    """The profile payload as other users see it"""
+    profile = cached_profile(user_id)
+    if profile is None:
+        return None
+    return {**profile, "user": {key: value for key, value in profile["user"].items() if key != "email"}}
+
+
+def thumbnail_for(url, variants=None):
+    """The smallest derivative of a photo, or the original until derivatives exist"""
+    srcset = srcset_for(url, variants)
+    if srcset is None:
+        return None
+    for fmt, variants in srcset.items():
+        if fmt != 'original' and f'{WIDTHS[0]}w' in variants:
+            return variants[f'{WIDTHS[0]}w']
+    return srcset['original']
+
+
+serialize_card = Serializer(
+    id='id',
+    username='username',
+    full_name='full_name',
+    headline='headline',
+    avatar=lambda row: thumbnail_for(row.avatar, row.avatar_variants),
+)
+
+
+def load_cards(user_ids):
+    """{user_id: card} for the users that exist, in one query"""
+    if not user_ids:
+        return {}
+    def newest_photo(column, name):
+        return (select(column).where(ProfilePhoto.profile_id == Profile.id)
+                .order_by(ProfilePhoto.id.desc()).limit(1).scalar_subquery().label(name))
+    avatar = newest_photo(ProfilePhoto.url, 'avatar')
+    avatar_variants = newest_photo(ProfilePhoto.variants, 'avatar_variants')
+    # The newest position doubles as the headline until profiles have one of their own
+    headline = (select(Experience.title + ' at ' + Experience.company).where(Experience.profile_id == Profile.id)
+                .order_by(Experience.id.desc()).limit(1).scalar_subquery().label('headline'))
+    rows = db.session.execute(
+        select(User.id, User.username, Profile.full_name, headline, avatar, avatar_variants)
+        .outerjoin(Profile, Profile.user_id == User.id)
+        .where(User.id.in_(user_ids))
+        .order_by(Profile.id)
+    )
+    cards = {}
+    for row in rows:
+        if row.id not in cards:
+            cards[row.id] = serialize_card(row)
+    return cards
+
+
+def cached_cards(user_ids):
+    return cached_many(user_ids, card_cache_key, current_app.config['PROFILE_CACHE_TTL'], load_cards,
+                       tags=lambda user_id: [user_tag(user_id)])
+
+
+def invalidate_profile(user_id):
+    invalidate_tags(user_tag(user_id))
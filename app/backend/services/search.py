@@ -0,0 +1,137 @@
+"""
+Unified search over posts and people.
+
+Every post and every user has one SearchDocument row, which the write paths
+refresh in the same transaction: posting, deleting a post, signing up,
+editing a profile or its experience. The document's full-text index
+(models.search) is updated by the database as the row changes, so a search
+is one index lookup across both types, ranked with bm25 or ts_rank_cd.
+
+Scoring costs time per matching document, and a common word or a short
+prefix matches a large share of a big index. So a search ranks only the
+newest SEARCH_CANDIDATES matches, which FTS5 reads straight off the index in
+rowid order. Typeahead treats every term as a prefix and scores the newest
+TYPEAHEAD_CANDIDATES in Python by the columns the prefixes hit: bm25 would
+first count every document a prefix like "te" matches. Facet counts come
+from the index alone.
+"""
+
+from sqlalchemy import select
+
+from models.profile import Experience, Profile, Skill
+from models.search import SearchDocument, search_index
+from models.user import User, db
+from utils.fulltext import WORD, hashtags
+
+KINDS = ('post', 'person')
+SEARCH_CANDIDATES = 1000
+TYPEAHEAD_CANDIDATES = 100
+# Shorter prefixes match too much of the index to be useful suggestions
+TYPEAHEAD_MIN_PREFIX = 2
+
+
+def post_document(content):
+    return {'title': '', 'tags': ' '.join(hashtags(content)), 'body': content or ''}
+
+
+def person_document(username, full_name, bio, skills, companies):
+    return {
+        'title': ' '.join(dict.fromkeys(filter(None, [full_name, username]))),
+        'tags': ' '.join(dict.fromkeys(filter(None, list(skills) + list(companies)))),
+        'body': bio or '',
+    }
+
+
+def _upsert(kind, ref_id, fields, created_at=None):
+    document = SearchDocument.query.filter_by(kind=kind, ref_id=ref_id).first()
+    if document is None:
+        document = SearchDocument(kind=kind, ref_id=ref_id, created_at=created_at)
+        db.session.add(document)
+    for name, value in fields.items():
+        setattr(document, name, value)
+
+
+def _remove(kind, ref_id):
+    SearchDocument.query.filter_by(kind=kind, ref_id=ref_id).delete()
+
+
+def index_post(post):
+    """Add or refresh a post's document; the caller commits"""
+    _upsert('post', post.id, post_document(post.content), post.created_at)
+
+
+def unindex_post(post_id):
+    _remove('post', post_id)
+
+
+def index_person(user_id):
+    """Rebuild a user's document from their profile, skills and experience; the caller commits"""
+    user = db.session.get(User, user_id)
+    if user is None:
+        return
+    profile = Profile.query.filter_by(user_id=user_id).first()
+    skills, companies = [], []
+    if profile:
+        skills = db.session.scalars(select(Skill.name).where(Skill.profile_id == profile.id)).all()
+        companies = db.session.scalars(select(Experience.company).where(Experience.profile_id == profile.id)).all()
+    _upsert('person', user_id, person_document(
+        user.username,
+        profile.full_name if profile else None,
+        profile.bio if profile else None,
+        skills,
+        companies,
+    ))
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def matching(terms, kind=None, prefix=False):
+    """Documents matching every term, optionally of one kind; returns (query, score)"""
+    documents = SearchDocument.query
+    if kind:
+        # Checked per row as matches stream in newest first; cheaper than
+        # intersecting with the kind's doclist, which covers most of the index
+        documents = documents.filter(SearchDocument.kind == kind)
+    return search_index.search(documents, _dialect(), terms, prefix=prefix)
+
+
+def ranked(terms, kind=None, prefix=False, candidates=SEARCH_CANDIDATES):
+    """(query, score) over the newest `candidates` matching documents, for ordering by score"""
+    documents, score = matching(terms, kind, prefix)
+    newest = (
+        documents.with_entities(SearchDocument.id.label('id'), score.label('score'))
+        .order_by(search_index.row_id(_dialect()).desc())
+        .limit(candidates)
+        .subquery()
+    )
+    return SearchDocument.query.join(newest, newest.c.id == SearchDocument.id), newest.c.score
+
+
+def facet_counts(terms):
+    """Number of documents of each kind matching every term"""
+    dialect = _dialect()
+    return {kind: db.session.scalar(search_index.count_statement(dialect, terms, kind=kind)) for kind in KINDS}
+
+
+def prefix_score(document, terms):
+    """Typeahead relevance: each term scores the weight of the best column it prefixes a word of"""
+    score = 0.0
+    for term in terms:
+        term = term.lower()
+        score += max((weight for name, weight in zip(search_index.columns, search_index.weights)
+                      if any(word.startswith(term) for word in WORD.findall(getattr(document, name).lower()))),
+                     default=0.0)
+    return score
+
+
+def typeahead(terms, kind=None, limit=8):
+    """Best (document, score) prefix matches among the newest candidates"""
+    terms = [t for t in terms if len(t) >= TYPEAHEAD_MIN_PREFIX]
+    if not terms:
+        return []
+    documents, _ = matching(terms, kind, prefix=True)
+    candidates = documents.order_by(search_index.row_id(_dialect()).desc()).limit(TYPEAHEAD_CANDIDATES).all()
+    scored = [(document, prefix_score(document, terms)) for document in candidates]
+    return sorted(scored, key=lambda pair: (pair[1], pair[0].id), reverse=True)[:limit]
@@ -0,0 +1,176 @@
+"""
+SQLite production profile: per-connection pragmas and a serialized write path.
+
+SQLite allows one writer at a time. With several gunicorn workers, writers
+that collide get "database is locked". WAL mode lets readers run next to the
+writer. serialized_write() makes writers wait their turn on a cross-process
+file lock, so they queue instead of colliding. If SQLite still reports busy,
+for example during a checkpoint or because another tool is writing, the
+whole write is retried with backoff.
+
+Side stores that live in their own SQLite file (the shared cache tier, the
+task queue) go through SharedConnection instead of SQLAlchemy.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from models.user import db
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to a process-local lock
+    fcntl = None
+
+WRITE_RETRIES = 5
+RETRY_BASE_DELAY = 0.02
+
+_thread_lock = threading.Lock()
+
+
+def is_locked_error(error):
+    """True for SQLite's transient 'database is locked' / 'busy' errors"""
+    error = getattr(error, 'orig', error)
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def apply_pragmas(engine, pragmas):
+    """Run `PRAGMA name=value` for every pragma on each new connection"""
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def configure_sqlite(app, engine):
+    """Install the SQLite engine profile; a no-op for other databases"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    if app.config.get('SQLITE_TUNING'):
+        apply_pragmas(engine, app.config['SQLITE_PRAGMAS'])
+
+    # Handlers often catch their own exceptions, so note lock errors on the
+    # request where serialized_write() can see them
+    @event.listens_for(engine, 'handle_error')
+    def _note_lock_error(context):
+        if has_request_context() and is_locked_error(context.original_exception):
+            g.sqlite_locked = True
+
+    database = engine.url.database
+    if app.config.get('SQLITE_SERIALIZE_WRITES') and database and database != ':memory:':
+        app.extensions['sqlite_write_lock'] = database + '.write-lock'
+        print(f"🔧 SQLite writes serialized through {database}.write-lock")
+
+
+class _WriteLock:
+    """Exclusive lock shared by every worker process writing the same database"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        if fcntl is None:
+            _thread_lock.acquire()
+            return self
+        # One descriptor per acquisition so threads in a worker exclude each other too
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        # Poll rather than block: a blocking flock would freeze every greenlet
+        # of a gevent worker, while time.sleep yields to them
+        delay = 0.001
+        while True:
+            try:
+                fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return self
+            except BlockingIOError:
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
+
+    def __exit__(self, *exc):
+        if fcntl is None:
+            _thread_lock.release()
+            return
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+
+
+def serialized_write(view):
+    """Run a write view under the write lock, retrying it if SQLite reports busy"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        lock_path = current_app.extensions.get('sqlite_write_lock')
+        if not lock_path:
+            return view(*args, **kwargs)
+
+        delay = RETRY_BASE_DELAY
+        for attempt in range(WRITE_RETRIES + 1):
+            last_attempt = attempt == WRITE_RETRIES
+            g.sqlite_locked = False
+            with _WriteLock(lock_path):
+                try:
+                    response = view(*args, **kwargs)
+                except OperationalError as e:
+                    if last_attempt or not is_locked_error(e):
+                        raise
+                    db.session.rollback()
+                else:
+                    if last_attempt or not g.sqlite_locked:
+                        return response
+                    db.session.rollback()
+            print(f"⚠️ SQLite busy, retrying {view.__name__} in {delay * 1000:.0f}ms")
+            time.sleep(delay + random.uniform(0, delay))
+            delay *= 2
+    return wrapper
+
+
+class SharedConnection:
+    """One sqlite3 connection per process to a side database, shared by its threads and greenlets.
+
+    `with shared as connection:` holds the connection for the statements in
+    the block. The pragmas and `schema` run once per process, on connect,
+    rather than for every thread or greenlet that touches the store.
+    """
+
+    def __init__(self, path, schema=''):
+        self.path = path
+        self.schema = schema
+        self._lock = threading.Lock()
+        self._connection = None
+        self._inherited = []
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The parent's connection must not be used, nor closed, in the child
+        self._lock = threading.Lock()
+        if self._connection is not None:
+            self._inherited.append(self._connection)
+            self._connection = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            if self._connection is None:
+                connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+                connection.executescript(self.schema)
+                self._connection = connection
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._connection
+
+    def __exit__(self, *exc):
+        self._lock.release()
@@ -0,0 +1,100 @@
+"""
+Hashtags and trending topics.
+
+A post's hashtags are stored as PostTag rows when it is created, which
+serves "posts tagged #x" with one index seek. The same write bumps an
+hourly TagCount bucket per tag. Trending sums the buckets of the last
+TRENDING_WINDOW_HOURS, so it reads at most one row per tag and hour in the
+window and never aggregates post history; the window slides forward as the
+hour changes without any recomputation.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.tag import PostTag, TagCount
+from models.user import db
+from utils.fulltext import hashtags
+
+MAX_TAG_LENGTH = 64
+MAX_TAGS_PER_POST = 20
+
+
+def normalize_tag(tag):
+    """'#WebDev' -> 'webdev'"""
+    return (tag or '').strip().lstrip('#').lower()
+
+
+def post_tags(content):
+    return [tag for tag in hashtags(content) if len(tag) <= MAX_TAG_LENGTH][:MAX_TAGS_PER_POST]
+
+
+def bucket_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _bump_counts(tags, bucket):
+    insert = pg_insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    statement = insert(TagCount).values([{'tag': tag, 'bucket': bucket, 'count': 1} for tag in tags])
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['tag', 'bucket'],
+        set_={'count': TagCount.count + statement.excluded.count}
+    ))
+
+
+def tag_post(post):
+    """Store the post's hashtags and count them in the current hour; the caller commits"""
+    tags = post_tags(post.content)
+    if not tags:
+        return []
+    db.session.execute(PostTag.__table__.insert(), [
+        {'post_id': post.id, 'tag': tag, 'created_at': post.created_at} for tag in tags
+    ])
+    _bump_counts(tags, bucket_start(post.created_at))
+    prune_counts()
+    return tags
+
+
+def untag_post(post):
+    """Remove the post's hashtags and take them back out of their hour's counts; the caller commits"""
+    tags = db.session.scalars(select(PostTag.tag).where(PostTag.post_id == post.id)).all()
+    if not tags:
+        return
+    db.session.execute(
+        update(TagCount)
+        .where(TagCount.tag.in_(tags), TagCount.bucket == bucket_start(post.created_at), TagCount.count > 0)
+        .values(count=TagCount.count - 1)
+    )
+    db.session.execute(delete(PostTag).where(PostTag.post_id == post.id))
+
+
+def prune_counts(now=None):
+    """Drop buckets that have left the retention period"""
+    hours = current_app.config['TRENDING_RETENTION_HOURS']
+    cutoff = bucket_start(now or datetime.utcnow()) - timedelta(hours=hours)
+    db.session.execute(delete(TagCount).where(TagCount.bucket < cutoff))
+
+
+def trending(limit=10, now=None):
+    """[(tag, posts in the window)] for the busiest tags of the last TRENDING_WINDOW_HOURS"""
+    hours = current_app.config['TRENDING_WINDOW_HOURS']
+    since = bucket_start(now or datetime.utcnow()) - timedelta(hours=hours - 1)
+    total = func.sum(TagCount.count).label('total')
+    rows = db.session.execute(
+        select(TagCount.tag, total)
+        .where(TagCount.bucket >= since)
+        .group_by(TagCount.tag)
+        .having(total > 0)
+        .order_by(total.desc(), TagCount.tag)
+        .limit(limit)
+    ).all()
+    return [(tag, int(count)) for tag, count in rows]
+
+
+def tagged_posts_query(tag):
+    """PostTag rows of a tag, for CursorPage on (created_at, post_id)"""
+    return PostTag.query.filter(PostTag.tag == normalize_tag(tag))
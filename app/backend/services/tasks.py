@@ -0,0 +1,304 @@
+"""
+Durable background tasks, run by worker.py outside the request.
+
+Handlers hand slow follow-up work (timeline fan-out, image derivatives...)
+to enqueue() once their transaction has committed, then return. A task is
+the name of a function registered with @task plus a JSON payload. It is
+kept in a queue that survives restarts. Backends are pluggable through
+TASK_QUEUE_BACKEND. 'sqlite' keeps the queue in its own file
+(TASK_QUEUE_PATH), so it works whichever database the app uses and every
+process on the host shares it.
+
+Delivery is at least once, so handlers must be safe to run twice:
+
+- A worker claims a batch by leasing it for TASK_VISIBILITY_TIMEOUT
+  seconds. If the worker dies mid-task, the lease runs out and another
+  worker claims the task again.
+- A task that raises is retried with exponential backoff and jitter, up to
+  TASK_MAX_ATTEMPTS attempts. After that it stays in the queue as 'failed'.
+- An idempotency key turns enqueueing the same work twice into a no-op
+  while the first task is queued, running or retained (TASK_RETENTION_SECONDS
+  after it is done). Enqueueing the key of a failed task re-arms it.
+
+Enqueueing happens after the commit, so a crash in between loses the task.
+Services whose work must not be lost also register a @periodic sweep, which
+the worker runs on a timer to find and queue what was missed.
+"""
+
+import random
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+
+from models.user import db
+from services.sqlite import SharedConnection
+from utils.serializers import dumps, loads
+
+# Handlers by task name, filled in by @task as service modules are imported
+HANDLERS = {}
+# Sweeps by name: (config key of their interval in seconds, function), filled in by @periodic
+PERIODIC = {}
+
+Task = namedtuple('Task', 'id name payload attempts max_attempts lease')
+
+
+def task(name):
+    """Register the decorated function as the handler of tasks called `name`; it gets the payload as kwargs"""
+    def register(handler):
+        HANDLERS[name] = handler
+        return handler
+    return register
+
+
+def periodic(name, every):
+    """Have workers call the decorated function every app.config[`every`] seconds, in an app context"""
+    def register(job):
+        PERIODIC[name] = (every, job)
+        return job
+    return register
+
+
+class SQLiteTaskQueue:
+    """Task queue in a SQLite file, for the web and worker processes of one host"""
+
+    # run_at is when a row next needs attention: when a queued task is due,
+    # or when a running task's lease runs out. Claiming is one seek on the
+    # partial index, however many finished rows are kept.
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS task ('
+        'id INTEGER PRIMARY KEY, name TEXT NOT NULL, payload TEXT NOT NULL, '
+        'idempotency_key TEXT UNIQUE, state TEXT NOT NULL, '
+        'attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, '
+        'run_at REAL NOT NULL, lease TEXT, last_error TEXT, '
+        'created_at REAL NOT NULL, finished_at REAL);'
+        "CREATE INDEX IF NOT EXISTS ix_task_due ON task (run_at) WHERE state IN ('queued', 'running');"
+        'CREATE INDEX IF NOT EXISTS ix_task_finished_at ON task (finished_at);'
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self._db = SharedConnection(path, self.SCHEMA)
+
+    def _execute(self, sql, values=()):
+        with self._db as connection:
+            return connection.execute(sql, values)
+
+    def enqueue(self, name, payload, key=None, delay=0, max_attempts=5):
+        """Queue a task; False when `key` is already queued, running or retained"""
+        now = time.time()
+        cursor = self._execute(
+            'INSERT INTO task (name, payload, idempotency_key, state, max_attempts, run_at, created_at) '
+            "VALUES (?, ?, ?, 'queued', ?, ?, ?) "
+            'ON CONFLICT (idempotency_key) DO UPDATE SET '
+            "name = excluded.name, payload = excluded.payload, state = 'queued', attempts = 0, "
+            'max_attempts = excluded.max_attempts, run_at = excluded.run_at, lease = NULL, finished_at = NULL '
+            "WHERE task.state = 'failed'",
+            [name, dumps(payload), key, max_attempts, now + delay, now]
+        )
+        return cursor.rowcount == 1
+
+    def claim(self, limit, visibility_timeout):
+        """Lease up to `limit` due tasks, oldest first, for `visibility_timeout` seconds"""
+        now = time.time()
+        lease = f'{threading.get_ident()}-{random.getrandbits(64):016x}'
+        # The lock keeps other greenlets off the connection until COMMIT
+        with self._db as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                rows = connection.execute(
+                    'SELECT id, name, payload, attempts, max_attempts FROM task '
+                    "WHERE state IN ('queued', 'running') AND run_at <= ? ORDER BY run_at LIMIT ?",
+                    [now, limit]
+                ).fetchall()
+                # A lease that ran out on the last attempt means the task keeps killing its worker
+                exhausted = [row[0] for row in rows if row[3] >= row[4]]
+                claimed = [row for row in rows if row[3] < row[4]]
+                if exhausted:
+                    connection.executemany(
+                        "UPDATE task SET state = 'failed', lease = NULL, finished_at = ?, "
+                        "last_error = 'Lease expired on the last attempt' WHERE id = ?",
+                        [(now, task_id) for task_id in exhausted]
+                    )
+                if claimed:
+                    connection.executemany(
+                        "UPDATE task SET state = 'running', lease = ?, run_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        [(lease, now + visibility_timeout, row[0]) for row in claimed]
+                    )
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return [Task(task_id, name, loads(payload), attempts + 1, max_attempts, lease)
+                for task_id, name, payload, attempts, max_attempts in claimed]
+
+    def complete(self, task):
+        """Mark a claimed task done; False if its lease ran out and another worker took it"""
+        cursor = self._execute(
+            "UPDATE task SET state = 'done', lease = NULL, finished_at = ? WHERE id = ? AND lease = ?",
+            [time.time(), task.id, task.lease]
+        )
+        return cursor.rowcount == 1
+
+    def retry(self, task, error, delay):
+        """Queue a claimed task again after `delay` seconds, or fail it on its last attempt"""
+        now = time.time()
+        if task.attempts >= task.max_attempts:
+            sql, values = ("UPDATE task SET state = 'failed', lease = NULL, last_error = ?, finished_at = ? "
+                           'WHERE id = ? AND lease = ?', [error, now, task.id, task.lease])
+        else:
+            sql, values = ("UPDATE task SET state = 'queued', lease = NULL, last_error = ?, run_at = ? "
+                           'WHERE id = ? AND lease = ?', [error, now + delay, task.id, task.lease])
+        return self._execute(sql, values).rowcount == 1
+
+    def release(self, task):
+        """Give a claimed task back unrun, without spending an attempt"""
+        cursor = self._execute(
+            "UPDATE task SET state = 'queued', lease = NULL, run_at = ?, attempts = attempts - 1 "
+            'WHERE id = ? AND lease = ?', [time.time(), task.id, task.lease]
+        )
+        return cursor.rowcount == 1
+
+    def prune(self, older_than):
+        """Forget tasks done more than `older_than` seconds ago, freeing their idempotency keys"""
+        cursor = self._execute(
+            "DELETE FROM task WHERE finished_at < ? AND state = 'done'", [time.time() - older_than]
+        )
+        return cursor.rowcount
+
+    def stats(self):
+        """Task counts by state"""
+        with self._db as connection:
+            rows = connection.execute('SELECT state, count(*) FROM task GROUP BY state').fetchall()
+        return {'queued': 0, 'running': 0, 'done': 0, 'failed': 0, **dict(rows)}
+
+    def failed(self, limit=50):
+        """The most recent failed tasks with their last error, for inspection"""
+        with self._db as connection:
+            rows = connection.execute(
+                "SELECT id, name, payload, attempts, last_error FROM task WHERE state = 'failed' "
+                'ORDER BY finished_at DESC LIMIT ?', [limit]
+            ).fetchall()
+        return [{'id': task_id, 'name': name, 'payload': loads(payload), 'attempts': attempts, 'error': error}
+                for task_id, name, payload, attempts, error in rows]
+
+
+BACKENDS = {
+    'sqlite': lambda config: SQLiteTaskQueue(config['TASK_QUEUE_PATH']),
+}
+
+
+def get_task_queue(app=None):
+    """The app's task queue, created on first use from TASK_QUEUE_BACKEND"""
+    app = app or current_app
+    queue = app.extensions.get('task_queue')
+    if queue is None:
+        backend = app.config.get('TASK_QUEUE_BACKEND', 'sqlite')
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown TASK_QUEUE_BACKEND {backend!r}")
+        queue = app.extensions['task_queue'] = BACKENDS[backend](app.config)
+    return queue
+
+
+def enqueue(name, payload=None, key=None, delay=0):
+    """Queue task `name` to run in a worker and return at once; call after commit.
+
+    Returns False when `key` names work that is already queued or done.
+    """
+    if name not in HANDLERS:
+        raise ValueError(f"Unknown task {name!r}")
+    return get_task_queue().enqueue(name, payload or {}, key, delay, current_app.config['TASK_MAX_ATTEMPTS'])
+
+
+def retry_delay(attempts, config):
+    """Exponential backoff with jitter before attempt `attempts` + 1"""
+    delay = min(config['TASK_RETRY_MAX_DELAY'], config['TASK_RETRY_BASE_DELAY'] * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class Worker:
+    """Claims due tasks and runs their handlers and the @periodic sweeps, each in its own app context"""
+
+    def __init__(self, app, queue=None):
+        self.app = app
+        self.queue = queue or get_task_queue(app)
+        self.config = app.config
+        self._stopping = threading.Event()
+        self._last_prune = 0
+        self._last_sweep = {}
+
+    def stop(self):
+        """Finish the task in hand, then leave run()"""
+        self._stopping.set()
+
+    def run(self):
+        """Run tasks until stop() is called, polling every TASK_POLL_SECONDS while idle"""
+        print(f"⚙️ Task worker running {len(HANDLERS)} task types from {self.config.get('TASK_QUEUE_BACKEND')}")
+        while not self._stopping.is_set():
+            self.run_periodic()
+            if not self.run_once():
+                self._stopping.wait(self.config['TASK_POLL_SECONDS'])
+            if time.time() - self._last_prune > self.config['TASK_RETENTION_SECONDS'] / 24:
+                self._last_prune = time.time()
+                self.queue.prune(self.config['TASK_RETENTION_SECONDS'])
+        print("⚙️ Task worker stopped")
+
+    def run_once(self):
+        """Claim one batch, run it and return how many tasks it had"""
+        tasks = self.queue.claim(self.config['TASK_BATCH_SIZE'], self.config['TASK_VISIBILITY_TIMEOUT'])
+        for claimed in tasks:
+            if self._stopping.is_set():
+                # Shutting down: hand the rest of the batch straight back
+                self.queue.release(claimed)
+                continue
+            self._run(claimed)
+        return len(tasks)
+
+    def run_periodic(self, force=False):
+        """Run the @periodic sweeps that are due (all of them with `force`); returns how many ran"""
+        ran = 0
+        for name, (every, job) in PERIODIC.items():
+            now = time.time()
+            if not force and now - self._last_sweep.get(name, 0) < self.config[every]:
+                continue
+            self._last_sweep[name] = now
+            ran += 1
+            with self.app.app_context():
+                try:
+                    job()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"⚠️ Sweep {name} failed: {type(e).__name__}: {e}")
+                finally:
+                    db.session.remove()
+        return ran
+
+    def run_until_idle(self):
+        """Run tasks until none is due; returns how many ran"""
+        total = 0
+        while batch := self.run_once():
+            total += batch
+        return total
+
+    def _run(self, claimed):
+        with self.app.app_context():
+            try:
+                handler = HANDLERS.get(claimed.name)
+                if handler is None:
+                    raise LookupError(f"No handler registered for task {claimed.name!r}")
+                handler(**claimed.payload)
+            except Exception as e:
+                db.session.rollback()
+                error = f'{type(e).__name__}: {e}'
+                delay = retry_delay(claimed.attempts, self.config)
+                self.queue.retry(claimed, error, delay)
+                if claimed.attempts >= claimed.max_attempts:
+                    print(f"🔴 Task {claimed.name} #{claimed.id} failed for good after {claimed.attempts} attempts: {error}")
+                else:
+                    print(f"⚠️ Task {claimed.name} #{claimed.id} failed ({error}), retrying in {delay:.1f}s")
+            else:
+                if not self.queue.complete(claimed):
+                    print(f"⚠️ Task {claimed.name} #{claimed.id} outlived its lease and may run again")
+            finally:
+                db.session.remove()
@@ -0,0 +1,205 @@
+"""
+Receiving and serving photo uploads.
+
+Receiving: streaming, size-capped handling of multipart photo uploads.
+
+The multipart body is parsed straight off the request stream. Each file
+part is written in chunks to a temp file in the destination directory and
+hashed on the way; the upload is aborted as soon as it crosses the cap.
+The image type comes from the file's magic bytes, not its name, and the
+temp file is renamed into place only once everything checks out.
+
+Serving: every upload URL embeds a uuid or a content hash, so a URL always
+names the same bytes. send_upload() marks responses immutable for a year
+with a strong ETag, answers conditional and Range requests, and can hand
+the byte streaming to the front web server (X-Sendfile/X-Accel-Redirect).
+"""
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from flask import Response, current_app, request, send_from_directory
+from werkzeug.exceptions import NotFound, RequestEntityTooLarge
+from werkzeug.formparser import FormDataParser
+from werkzeug.security import safe_join
+
+DEFAULT_MAX_PHOTO_BYTES = 5 * 1024 * 1024  # 5MB
+
+# Leading bytes of each accepted image format
+IMAGE_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+SNIFF_BYTES = 8
+
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+def sniff_image_type(head):
+    """Return the extension matching the magic bytes in `head`, or None"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+class UploadRejected(Exception):
+    """An upload the client has to fix; carries the message and HTTP status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class _CappedFile:
+    """Temp file that hashes what it is given and refuses to grow past the cap"""
+
+    def __init__(self, directory, max_bytes):
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b''
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise RequestEntityTooLarge()
+        if len(self.head) < SNIFF_BYTES:
+            self.head = (self.head + data)[:SNIFF_BYTES]
+        self.sha256.update(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class StagedUpload:
+    """A validated upload sitting in a temp file next to its destination"""
+
+    def __init__(self, capped_file, filename, extension):
+        self.path = capped_file.path
+        self.size = capped_file.size
+        self.digest = capped_file.sha256.hexdigest()
+        self.filename = filename
+        self.extension = extension
+
+    def save_as(self, destination):
+        """Atomically move the upload to `destination`"""
+        os.replace(self.path, destination)
+
+    def discard(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def receive_image_upload(field, directory, max_bytes=None):
+    """Stream the multipart `field` into `directory` and return a StagedUpload.
+
+    Returns None when the field is absent and raises UploadRejected for
+    empty, oversized or non-image files.
+    """
+    if max_bytes is None:
+        max_bytes = current_app.config.get('MAX_PHOTO_BYTES', DEFAULT_MAX_PHOTO_BYTES)
+    os.makedirs(directory, exist_ok=True)
+    too_large = UploadRejected(f"File too large. Maximum size is {max_bytes // (1024 * 1024)}MB", 413)
+
+    # Reject on the declared length before reading a single byte
+    if request.content_length and request.content_length > max_bytes + 64 * 1024:
+        raise too_large
+
+    parts = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        part = _CappedFile(directory, max_bytes)
+        parts.append(part)
+        return part
+
+    parser = FormDataParser(
+        stream_factory=stream_factory,
+        max_content_length=current_app.config.get('MAX_CONTENT_LENGTH'),
+    )
+    staged = None
+    try:
+        _, _, files = parser.parse(request.stream, request.mimetype, request.content_length,
+                                   request.mimetype_params)
+        upload = files.get(field)
+        if upload is not None:
+            if not upload.filename:
+                raise UploadRejected("No file selected")
+
+            capped_file = upload.stream
+            capped_file.flush()
+            extension = sniff_image_type(capped_file.head)
+            if not extension:
+                raise UploadRejected("Invalid file type. Allowed: png, jpg, jpeg, gif")
+            staged = StagedUpload(capped_file, upload.filename, extension)
+    except RequestEntityTooLarge:
+        raise too_large from None
+    finally:
+        # Every part but the one handed back is removed, whatever happened
+        for part in parts:
+            part.close()
+            if staged is None or part.path != staged.path:
+                os.unlink(part.path)
+    return staged
+
+
+def accel_location(path):
+    """nginx internal URI of `path`: its root's prefix plus the path below that root, or None.
+
+    Blob store files map under BLOBS_ACCEL_PREFIX when BLOB_STORE_ROOT is
+    configured, everything else under UPLOADS_ACCEL_PREFIX when it lies
+    inside UPLOADS_ACCEL_ROOT.
+    """
+    config = current_app.config
+    path = os.path.realpath(path)
+    for root, prefix in ((config.get('BLOB_STORE_ROOT'), config.get('BLOBS_ACCEL_PREFIX', '/protected-blobs')),
+                         (config.get('UPLOADS_ACCEL_ROOT'), config.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads'))):
+        if not root:
+            continue
+        root = os.path.realpath(root)
+        if os.path.commonpath([root, path]) == root:
+            return f"{prefix.rstrip('/')}/{os.path.relpath(path, root).replace(os.sep, '/')}"
+    return None
+
+
+def send_upload(directory, filename):
+    """Send an uploaded file with long-lived caching, validators and ranges.
+
+    UPLOADS_SENDFILE_MODE selects who streams the bytes: None (this worker),
+    'x-sendfile' (Apache/lighttpd) or 'x-accel' (nginx, using the internal
+    location that accel_location() maps the file to; files under no
+    configured root are sent by this worker).
+    """
+    if not os.path.isabs(directory):
+        directory = os.path.join(current_app.root_path, directory)
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+
+    # Names are unique per content (uuid or sha256), so the name is a strong validator
+    etag = os.path.basename(path)
+    mode = current_app.config.get('UPLOADS_SENDFILE_MODE')
+    location = accel_location(path) if mode == 'x-accel' else None
+
+    if location:
+        # nginx serves the file from an internal location and handles ranges itself
+        response = Response(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = location
+        response.set_etag(etag)
+        response.make_conditional(request)
+    else:
+        # Config sets USE_X_SENDFILE for the 'x-sendfile' mode, which send_file honours
+        response = send_from_directory(directory, filename, etag=etag, conditional=True, max_age=ONE_YEAR)
+
+    response.cache_control.public = True
+    response.cache_control.max_age = ONE_YEAR
+    response.cache_control.immutable = True
+    return response
@@ -18,16 +18,21 @@ mkdir -p uploads/post_photos
 chmod 755 uploads
 chmod 755 uploads/post_photos
 
-# Initialize database and create test user (with timeout)
+# Migrate and verify the database once, before any worker serves requests
 echo "🗄️ Initializing database..."
-timeout 30s python3 init_db.py || echo "⚠️ Database initialization failed or timed out, continuing..."
+timeout 30s python3 init_db.py || { echo "❌ Database initialization failed or timed out"; exit 1; }
 
 echo "👤 Creating test user..."
 timeout 30s python3 create_test_user.py || echo "⚠️ Test user creation failed or timed out, continuing..."
 
+# Follow-up work (fan-out, image variants) runs in the task worker, off the request path
+echo "⚙️ Starting background task worker..."
+python3 worker.py &
+
 # Get port from environment variable (Render sets this)
 PORT=${PORT:-10000}
 
 # Run the Flask application with Gunicorn
 echo "🌐 Starting Gunicorn server..."
-gunicorn --bind 0.0.0.0:$PORT --workers 1 --worker-class sync --timeout 60 --max-requests 1000 --max-requests-jitter 100 main:app 
\ No newline at end of file
+# gevent so /api/events streams don't each pin a worker
+gunicorn --bind 0.0.0.0:$PORT --workers 1 --worker-class gevent --worker-connections 2000 --timeout 60 --max-requests 1000 --max-requests-jitter 100 main:app 
\ No newline at end of file
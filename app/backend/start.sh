@@ -7,5 +7,9 @@ echo "🚀 Starting Flask application with Gunicorn..."
 export FLASK_APP=main.py
 export FLASK_ENV=production
 
+# Follow-up work (fan-out, image variants) runs in the task worker, off the request path
+echo "⚙️ Starting background task worker..."
+python3 worker.py &
+
 # Run the Flask application with Gunicorn
 gunicorn --config gunicorn_config.py main:app 
\ No newline at end of file
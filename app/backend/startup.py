@@ -0,0 +1,54 @@
+"""
+Boot-time database preparation.
+
+Runs once per deployment, before workers accept traffic: makes sure the
+instance directory exists, applies pending migrations and verifies the
+schema. Request handlers can then assume every table exists and never
+touch the schema catalog themselves.
+"""
+
+import os
+
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask_migrate import upgrade
+
+from models.user import db
+
+
+class SchemaError(RuntimeError):
+    """Raised when the database does not match the models after migrating"""
+
+
+def ensure_instance_dir():
+    """Create the instance directory that holds the SQLite database"""
+    instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+    os.makedirs(instance_path, exist_ok=True)
+    return instance_path
+
+
+def verify_schema(app):
+    """Check that the database is at the migration head and has every model table"""
+    with app.app_context():
+        script = ScriptDirectory.from_config(app.extensions['migrate'].migrate.get_config())
+        with db.engine.connect() as conn:
+            current = MigrationContext.configure(conn).get_current_revision()
+            tables = set(db.inspect(conn).get_table_names())
+
+        head = script.get_current_head()
+        if current != head:
+            raise SchemaError(f"Database is at revision {current}, expected {head}")
+
+        missing = sorted(set(db.metadata.tables) - tables)
+        if missing:
+            raise SchemaError(f"Missing tables: {missing}")
+
+
+def prepare_database(app):
+    """Apply migrations and verify the result; meant to run once at boot"""
+    ensure_instance_dir()
+    print("🔧 Applying database migrations...")
+    with app.app_context():
+        upgrade()
+    verify_schema(app)
+    print("✅ Database schema verified!")
@@ -0,0 +1,138 @@
+"""
+Tests for the payload cache
+"""
+
+import threading
+import time
+
+from services import cache as cache_module
+from services.cache import MISSING, LocalCache, SQLiteCache, TieredCache, cached, get_cache, invalidate
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2)
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, ttl=60)
+    assert cache.get('a') == 1
+    cache.set('c', 3, ttl=60)
+
+    assert cache.get('b') is MISSING
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_local_cache_entries_expire(monkeypatch):
+    cache = LocalCache()
+    cache.set('a', 1, ttl=5)
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 6)
+
+    assert cache.get('a') is MISSING
+
+
+def test_cached_loads_once_until_invalidated(app):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return {'n': len(loads)}
+
+    assert cached('key', 60, load) == {'n': 1}
+    assert cached('key', 60, load) == {'n': 1}
+    invalidate('key')
+    assert cached('key', 60, load) == {'n': 2}
+    assert cached('missing', 60, lambda: None) is None
+    assert cached('missing', 60, lambda: 'now there') == 'now there'
+
+
+def _workers(tmp_path, count=2):
+    """Caches as separate worker processes see them: own local tier, one shared file"""
+    return [TieredCache(LocalCache(), SQLiteCache(str(tmp_path / 'shared.db'))) for _ in range(count)]
+
+
+def test_tag_invalidation_reaches_every_worker(tmp_path):
+    first, second = _workers(tmp_path)
+    first.fetch('a', 60, lambda: {'v': 1}, tags=['user:1'])
+    first.fetch('b', 60, lambda: {'v': 1}, tags=['user:2'])
+    assert second.fetch('a', 60, lambda: {'v': 'reloaded'}, tags=['user:1']) == {'v': 1}
+
+    second.invalidate_tags('user:1')
+
+    assert first.get('a') is MISSING
+    assert first.get('b') == {'v': 1}
+    assert second.fetch('a', 60, lambda: {'v': 2}, tags=['user:1']) == {'v': 2}
+    assert first.get('a') == {'v': 2}
+    assert first.metrics()['stale'] == 1
+
+
+def test_tags_known_only_from_the_value(tmp_path):
+    cache, = _workers(tmp_path, 1)
+    cache.fetch('list', 60, lambda: [3, 4], value_tags=lambda ids: [f'post:{i}' for i in ids])
+
+    cache.invalidate_tags('post:5')
+    assert cache.get('list') == [3, 4]
+    cache.invalidate_tags('post:4')
+    assert cache.get('list') is MISSING
+
+
+def test_concurrent_misses_load_once(tmp_path):
+    first, second = _workers(tmp_path)
+    loads, started = [], threading.Event()
+
+    def slow_load():
+        loads.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {'v': len(loads)}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(first.fetch('hot', 60, slow_load)))]
+    threads[0].start()
+    started.wait()
+    threads += [threading.Thread(target=lambda cache=cache: results.append(cache.fetch('hot', 60, slow_load)))
+                for cache in (first, first, second)]
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [1]
+    assert results == [{'v': 1}] * 4
+    assert first.metrics()['coalesced'] + second.metrics()['coalesced'] == 3
+
+
+def test_metrics_count_hits_by_tier(tmp_path):
+    first, second = _workers(tmp_path)
+    first.fetch('a', 60, lambda: 1)
+    first.fetch('a', 60, lambda: 1)
+    second.fetch('a', 60, lambda: 1)
+    second.fetch('a', 60, lambda: 1)
+
+    assert first.metrics()['local_hits'] == 1 and first.metrics()['loads'] == 1
+    assert second.metrics()['shared_hits'] == 1 and second.metrics()['local_hits'] == 1
+    assert second.metrics()['loads'] == 0
+    assert second.metrics()['hit_rate'] == 1.0
+
+
+def test_long_listings_are_tagged_coarsely(app, client, make_user, monkeypatch):
+    monkeypatch.setattr(cache_module, 'MAX_BODY_TAGS', 3)
+    _, headers = make_user('author')
+    ids = [client.post('/api/posts', headers=headers, json={'content': f'Post {i}'}).get_json()['post']['id']
+           for i in range(5)]
+    client.get('/api/posts', headers=headers)
+
+    checked = []
+    tag_versions = get_cache().tag_versions
+
+    def spy(tags):
+        tags = list(tags)
+        checked.extend(tags)
+        return tag_versions(tags)
+
+    monkeypatch.setattr(get_cache(), 'tag_versions', spy)
+    client.get('/api/posts', headers=headers)
+    assert sorted(set(checked)) == ['post:*', 'posts']
+
+    # A write to any one post still reaches the listing
+    client.post(f'/api/posts/{ids[0]}/like', headers=headers)
+    listed = {post['id']: post for post in client.get('/api/posts', headers=headers).get_json()['posts']}
+    assert listed[ids[0]]['likes_count'] == 1
@@ -0,0 +1,114 @@
+"""
+Tests for negotiated response compression
+"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+from flask import Flask
+
+from config import Config
+from services import compression
+
+brotli = compression.brotli
+needs_brotli = pytest.mark.skipif(brotli is None, reason='brotli is not installed')
+
+
+def _seed(client, headers, count=20):
+    for i in range(count):
+        client.post('/api/posts', headers=headers, json={'content': f'Post {i} about shipping the new site #webdev'})
+
+
+def test_listing_is_compressed_with_the_best_accepted_encoding(client, make_user):
+    _, headers = make_user('author')
+    _seed(client, headers)
+    plain = client.get('/api/posts', headers=headers)
+
+    cases = [('gzip', 'gzip', gzip.decompress), ('br;q=0.5, gzip', 'gzip', gzip.decompress)]
+    if brotli is not None:
+        cases.append(('gzip, br', 'br', brotli.decompress))
+    for accept, encoding, decode in cases:
+        response = client.get('/api/posts', headers={**headers, 'Accept-Encoding': accept})
+        assert response.headers['Content-Encoding'] == encoding, accept
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert int(response.headers['Content-Length']) == len(response.data) < len(plain.data) / 3
+        assert json.loads(decode(response.data)) == plain.get_json()
+
+    assert 'Content-Encoding' not in plain.headers
+    identity = client.get('/api/posts', headers={**headers, 'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in identity.headers
+
+
+def test_small_bodies_and_conditional_answers_are_left_alone(client, make_user):
+    _, headers = make_user('author')
+    headers = {**headers, 'Accept-Encoding': 'gzip'}
+
+    small = client.get('/api/posts', headers=headers)
+    assert len(small.data) < 500 and 'Content-Encoding' not in small.headers
+    not_modified = client.get('/api/posts', headers={**headers, 'If-None-Match': small.headers['ETag']})
+    assert not_modified.status_code == 304 and 'Content-Encoding' not in not_modified.headers
+
+
+def test_compressed_variants_are_reused_until_the_body_changes(client, make_user, monkeypatch):
+    _, headers = make_user('author')
+    _seed(client, headers)
+    headers = {**headers, 'Accept-Encoding': 'gzip'}
+    calls = []
+    original = compression.compress
+    monkeypatch.setattr(compression, 'compress', lambda *args: calls.append(1) or original(*args))
+
+    first = client.get('/api/posts?limit=20', headers=headers)
+    assert client.get('/api/posts?limit=20', headers=headers).data == first.data
+    assert len(calls) == 1
+
+    client.post('/api/posts', headers=headers, json={'content': 'One more post to change the page'})
+    changed = client.get('/api/posts?limit=20', headers=headers)
+    assert len(calls) == 2
+    assert json.loads(gzip.decompress(changed.data))['posts'][0]['content'] == 'One more post to change the page'
+
+
+def test_bodies_sharing_a_weak_etag_are_not_served_each_other_s_bytes():
+    bodies = iter([{'n': 1, 'pad': 'x' * 600}, {'n': 2, 'pad': 'x' * 600}])
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    compression.init_compression(app)
+
+    @app.route('/test/weak')
+    def weak():
+        response = app.response_class(json.dumps(next(bodies)), mimetype='application/json')
+        response.set_etag('same-version', weak=True)
+        return response
+
+    client = app.test_client()
+    for n in (1, 2):
+        response = client.get('/test/weak', headers={'Accept-Encoding': 'gzip'})
+        assert json.loads(gzip.decompress(response.data))['n'] == n
+
+
+def test_streamed_bodies_are_compressed_chunk_by_chunk():
+    chunks = [json.dumps({'n': i}).encode() * 20 for i in range(3)]
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    compression.init_compression(app)
+
+    @app.route('/test/stream')
+    def stream():
+        return app.response_class((chunk for chunk in chunks), mimetype='application/json')
+
+    response = app.test_client().get('/test/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data) == b''.join(chunks)
+
+
+@pytest.mark.parametrize('encoding', ['gzip', pytest.param('br', marks=needs_brotli)])
+def test_each_streamed_chunk_is_decodable_on_arrival(encoding, app):
+    pieces = list(compression.compress_stream(iter([b'{"a":', b'1}']), encoding, app.config))
+    if encoding == 'gzip':
+        decoder = zlib.decompressobj(compression.GZIP_WBITS)
+        assert decoder.decompress(pieces[0]) == b'{"a":'
+    else:
+        decoder = brotli.Decompressor()
+        assert decoder.process(pieces[0]) == b'{"a":'
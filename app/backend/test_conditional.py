@@ -0,0 +1,76 @@
+"""
+Tests for ETag / Last-Modified conditional GETs
+"""
+
+
+def _revalidate(client, url, headers, etag):
+    return client.get(url, headers={**headers, 'If-None-Match': etag})
+
+
+def test_unchanged_listing_is_a_304_without_running_the_view(client, make_user, count_queries):
+    author, author_headers = make_user('author')
+    _, headers = make_user('viewer')
+    post = client.post('/api/posts', headers=author_headers, json={'content': 'Hello'}).get_json()['post']
+
+    first = client.get('/api/posts?limit=5', headers=headers)
+    etag = first.headers['ETag']
+    assert etag.startswith('W/"') and first.headers['Cache-Control'] == 'private, no-cache'
+    assert client.get('/api/posts?limit=5', headers=author_headers).headers['ETag'] != etag
+    assert client.get('/api/posts?limit=4', headers=headers).headers['ETag'] != etag
+
+    with count_queries() as statements:
+        response = _revalidate(client, '/api/posts?limit=5', headers, etag)
+    assert (response.status_code, response.data, response.headers['ETag']) == (304, b'', etag)
+    assert len(statements) == 1
+
+    client.post(f"/api/posts/{post['id']}/like", headers=author_headers)
+    response = _revalidate(client, '/api/posts?limit=5', headers, etag)
+    assert response.status_code == 200 and response.get_json()['posts'][0]['likes_count'] == 1
+
+    url = f'/api/posts/user/{author.id}'
+    etag = client.get(url, headers=headers).headers['ETag']
+    second = client.post('/api/posts', headers=author_headers, json={'content': 'Again'}).get_json()['post']
+    etag_with_second = _revalidate(client, url, headers, etag).headers['ETag']
+    assert etag_with_second != etag
+    client.delete(f"/api/posts/{second['id']}", headers=author_headers)
+    changed = _revalidate(client, url, headers, etag_with_second)
+    assert changed.status_code == 200
+
+    # Whole listings are stamped from cache tags, not by aggregating the table
+    with count_queries() as statements:
+        assert _revalidate(client, url, headers, changed.headers['ETag']).status_code == 304
+    assert statements == []
+
+
+def test_profile_carries_last_modified_and_changes_with_every_write(client, make_user):
+    member, member_headers = make_user('member')
+    _, headers = make_user('viewer')
+    url = f'/api/users/{member.id}/profile'
+
+    response = client.get(url, headers=headers)
+    assert 'Last-Modified' in response.headers
+    assert client.get(url, headers={**headers, 'If-Modified-Since': response.headers['Last-Modified']}).status_code == 304
+    etag = response.headers['ETag']
+    assert _revalidate(client, url, headers, etag).status_code == 304
+
+    achievement = client.post('/api/profile/achievements', headers=member_headers, json={'title': 'Award'}).get_json()
+    etag = _revalidate(client, url, headers, etag).headers['ETag']
+    # Same number of achievements afterwards: updated_at still tells them apart
+    client.delete(f"/api/profile/achievements/{achievement['achievement']['id']}", headers=member_headers)
+    client.post('/api/profile/achievements', headers=member_headers, json={'title': 'Other award'})
+    response = _revalidate(client, url, headers, etag)
+    assert response.status_code == 200
+    assert [a['title'] for a in response.get_json()['profile']['achievements']] == ['Other award']
+
+    own = client.get('/api/profile', headers=member_headers)
+    assert own.headers['ETag'] != response.headers['ETag']
+    assert _revalidate(client, '/api/profile', member_headers, own.headers['ETag']).status_code == 304
+
+
+def test_missing_and_failed_responses_carry_no_etag(client, make_user):
+    _, headers = make_user('viewer')
+
+    missing = client.get('/api/users/999999/profile', headers=headers)
+    assert missing.status_code == 404 and 'ETag' not in missing.headers
+    bad_cursor = client.get('/api/posts?cursor=nope', headers=headers)
+    assert bad_cursor.status_code == 400 and 'ETag' not in bad_cursor.headers
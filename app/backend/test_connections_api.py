@@ -0,0 +1,85 @@
+"""
+Tests for the connections (follow graph) API
+"""
+
+from models.user import User, db
+
+
+def _follow(client, headers, user_id):
+    return client.post('/api/connections', headers=headers, json={'user_id': user_id})
+
+
+def test_follow_is_idempotent_and_maintains_counts(client, make_user):
+    alice, alice_headers = make_user('alice')
+    bob, _ = make_user('bob')
+
+    assert _follow(client, alice_headers, bob.id).status_code == 201
+    assert _follow(client, alice_headers, bob.id).status_code == 200
+
+    db.session.expire_all()
+    assert (db.session.get(User, alice.id).following_count, db.session.get(User, bob.id).followers_count) == (1, 1)
+
+    assert client.delete(f'/api/connections/{bob.id}', headers=alice_headers).status_code == 200
+    assert client.delete(f'/api/connections/{bob.id}', headers=alice_headers).status_code == 404
+    db.session.expire_all()
+    assert (db.session.get(User, alice.id).following_count, db.session.get(User, bob.id).followers_count) == (0, 0)
+
+
+def test_follow_rejects_self_and_unknown_users(client, make_user):
+    alice, headers = make_user('alice')
+
+    assert _follow(client, headers, alice.id).status_code == 400
+    assert _follow(client, headers, 9999).status_code == 404
+    assert client.post('/api/connections', headers=headers, json={}).status_code == 400
+
+
+def test_connections_are_listed_in_both_directions_with_pages(client, make_user):
+    alice, alice_headers = make_user('alice')
+    others = [make_user(f'user{i}') for i in range(5)]
+    for user, headers in others:
+        _follow(client, alice_headers, user.id)
+        _follow(client, headers, alice.id)
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/connections?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=alice_headers).get_json()
+        seen += body['users']
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert body['following_count'] == 5
+    assert sorted(u['username'] for u in seen) == [f'user{i}' for i in range(5)]
+    assert all(u['following'] and u['followed_by'] for u in seen)
+
+    followers = client.get(f'/api/connections?direction=followers&user_id={alice.id}', headers=others[0][1]).get_json()
+    assert len(followers['users']) == 5
+    assert followers['followers_count'] == 5
+
+
+def test_bulk_status_lookup_is_one_query(client, make_user, count_queries):
+    alice, alice_headers = make_user('alice')
+    bob, bob_headers = make_user('bob')
+    carol, carol_headers = make_user('carol')
+    dave, _ = make_user('dave')
+    _follow(client, alice_headers, bob.id)
+    _follow(client, carol_headers, alice.id)
+    _follow(client, bob_headers, alice.id)
+
+    url = f'/api/connections/status?ids={bob.id},{carol.id},{dave.id}'
+
+    with count_queries() as statements:
+        body = client.get(url, headers=alice_headers).get_json()
+
+    assert len(statements) == 1
+    assert body['status'] == {
+        str(bob.id): {'following': True, 'followed_by': True},
+        str(carol.id): {'following': False, 'followed_by': True},
+        str(dave.id): {'following': False, 'followed_by': False},
+    }
+
+
+def test_bulk_status_lookup_is_capped(client, make_user):
+    _, headers = make_user('alice')
+    ids = ','.join(str(i) for i in range(501))
+    assert client.get(f'/api/connections/status?ids={ids}', headers=headers).status_code == 400
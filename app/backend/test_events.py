@@ -0,0 +1,145 @@
+"""
+Tests for real-time delivery: the pub/sub broker and the /api/events SSE stream
+"""
+
+import json
+import queue
+
+import pytest
+
+from services.events import LocalBackend, RedisBackend, get_broker
+
+
+class FakeRedis:
+    """Just enough of redis.Redis pub/sub for RedisBackend: one channel, messages in publish order"""
+
+    def __init__(self):
+        self.listeners = []
+
+    def pubsub(self):
+        client = self
+
+        class PubSub:
+            def subscribe(self, channel):
+                self.messages = queue.Queue()
+                self.messages.put({'type': 'subscribe', 'data': 1})
+                client.listeners.append(self.messages)
+
+            def listen(self):
+                while True:
+                    yield self.messages.get()
+        return PubSub()
+
+    def publish(self, channel, data):
+        for messages in self.listeners:
+            messages.put({'type': 'message', 'data': data.encode()})
+        return len(self.listeners)
+
+
+def _token(headers):
+    return headers['Authorization'].split()[1]
+
+
+def _frames(response, count):
+    """Read `count` non-keepalive SSE frames from a streamed response"""
+    frames, buffer = [], ''
+    chunks = iter(response.response)
+    while len(frames) < count:
+        chunk = next(chunks)
+        buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+        while '\n\n' in buffer:
+            frame, buffer = buffer.split('\n\n', 1)
+            if frame.startswith('event:') or frame.startswith('id:'):
+                fields = dict(line.split(': ', 1) for line in frame.splitlines())
+                frames.append((fields['event'], json.loads(fields['data'])))
+    return frames
+
+
+@pytest.fixture
+def stream(app, client):
+    """Open /api/events for a user and close it when the test ends"""
+    opened = []
+
+    def _stream(headers):
+        response = client.get(f'/api/events?token={_token(headers)}', buffered=False)
+        opened.append(response)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        return response
+    yield _stream
+    for response in opened:
+        response.close()
+
+
+def test_local_backend_delivers_only_to_subscribed_users():
+    backend = LocalBackend()
+    alice = backend.subscribe(1)
+    alice_tab = backend.subscribe(1)
+    bob = backend.subscribe(2)
+
+    assert backend.publish([1, 3], 'like', {'post_id': 7}) == 2
+    assert alice.get_nowait()['data'] == {'post_id': 7}
+    assert alice_tab.get_nowait()['event'] == 'like'
+    assert bob.empty()
+
+    backend.unsubscribe(1, alice)
+    backend.unsubscribe(1, alice_tab)
+    backend.unsubscribe(2, bob)
+    assert backend.connection_count() == 0
+
+
+def test_redis_backend_relays_events_between_processes():
+    client = FakeRedis()
+    publisher, worker = RedisBackend(None, client=client), RedisBackend(None, client=client)
+    alice = worker.subscribe(1)
+    bob = worker.subscribe(2)
+
+    assert publisher.publish([1, 1, 3], 'like', {'post_id': 7}) == 1
+    assert alice.get(timeout=2) == {'id': 1, 'event': 'like', 'data': {'post_id': 7}}
+    assert bob.empty()
+    worker.unsubscribe(1, alice)
+    worker.unsubscribe(2, bob)
+    assert worker.connection_count() == 0
+
+
+def test_reconnects_get_a_per_minute_limit(client, make_user, rate_limits):
+    _, headers = make_user('member')
+    url = f'/api/events?token={_token(headers)}'
+
+    for _ in range(30):
+        response = client.get(url, buffered=False)
+        assert response.status_code == 200
+        response.close()
+    assert client.get(url, buffered=False).status_code == 429
+
+
+def test_stream_requires_a_token(client):
+    assert client.get('/api/events').status_code == 401
+
+
+def test_messages_likes_and_posts_are_pushed(app, client, make_user, stream):
+    author, author_headers = make_user('author')
+    fan, fan_headers = make_user('fan')
+    client.post('/api/connections', headers=fan_headers, json={'user_id': author.id})
+    events = stream(author_headers)
+    fan_events = stream(fan_headers)
+
+    post = client.post('/api/posts', headers=author_headers, json={'content': 'Live'}).get_json()['post']
+    client.post(f"/api/posts/{post['id']}/like", headers=fan_headers)
+    client.post('/api/messages', headers=fan_headers, json={'receiver_id': author.id, 'content': 'Nice post'})
+
+    received = _frames(events, 3)
+    assert [event for event, _ in received] == ['post', 'like', 'message']
+    assert received[1][1] == {'post_id': post['id'], 'user_id': fan.id, 'liked': True, 'likes_count': 1}
+    assert received[2][1]['content'] == 'Nice post'
+    assert [event for event, _ in _frames(fan_events, 3)] == ['post', 'like', 'message']
+
+
+def test_closing_the_stream_unsubscribes(app, make_user, stream):
+    _, headers = make_user('viewer')
+    response = stream(headers)
+    next(iter(response.response))  # retry: frame
+    assert get_broker().connection_count() == 1
+
+    response.close()
+    assert get_broker().connection_count() == 0
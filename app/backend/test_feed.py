@@ -0,0 +1,182 @@
+"""
+Tests for the home timeline: fan-out-on-write with a fan-out-on-read fallback
+"""
+
+from datetime import timedelta
+
+from models.post import Post
+from models.timeline import TimelineEntry
+from models.user import db
+from services import tasks
+from services.tasks import Worker
+
+
+def _post(client, headers, content):
+    return client.post('/api/posts', headers=headers, json={'content': content}).get_json()['post']
+
+
+def _follow(client, headers, user):
+    assert client.post('/api/connections', headers=headers, json={'user_id': user.id}).status_code == 201
+
+
+def _read_feed(client, headers, limit):
+    seen, cursor = [], None
+    while True:
+        url = f'/api/feed?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=headers).get_json()
+        seen += [post['id'] for post in body['posts']]
+        cursor = body['next_cursor']
+        if not cursor:
+            return seen
+
+
+def test_new_posts_are_fanned_out_to_followers(client, make_user, run_tasks):
+    author, author_headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    _, stranger_headers = make_user('stranger')
+    _follow(client, viewer_headers, author)
+
+    post = _post(client, author_headers, 'Hello feed')
+    # Until the worker has fanned it out, the post is merged into feeds on read
+    assert TimelineEntry.query.filter_by(post_id=post['id']).count() == 0
+    assert _read_feed(client, viewer_headers, limit=2) == [post['id']]
+
+    assert run_tasks() == 1
+    assert db.session.get(Post, post['id']).fanned_out
+    assert TimelineEntry.query.filter_by(post_id=post['id']).count() == 2  # author and viewer
+    feed = client.get('/api/feed', headers=viewer_headers).get_json()
+    assert [p['id'] for p in feed['posts']] == [post['id']]
+    assert feed['posts'][0]['user']['username'] == 'author'
+    assert client.get('/api/feed', headers=stranger_headers).get_json()['posts'] == []
+
+
+def test_following_backfills_and_unfollowing_clears_the_timeline(client, make_user):
+    author, author_headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    posts = [_post(client, author_headers, f'Earlier {i}')['id'] for i in range(3)]
+
+    _follow(client, viewer_headers, author)
+    assert _read_feed(client, viewer_headers, limit=2) == sorted(posts, reverse=True)
+
+    client.delete(f'/api/connections/{author.id}', headers=viewer_headers)
+    assert _read_feed(client, viewer_headers, limit=2) == []
+
+
+def test_large_audiences_fall_back_to_fan_out_on_read(app, client, make_user, monkeypatch, run_tasks):
+    author, author_headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    _, stranger_headers = make_user('stranger')
+    _follow(client, viewer_headers, author)
+    fanned = [_post(client, author_headers, f'Small audience {i}')['id'] for i in range(3)]
+    run_tasks()
+    monkeypatch.setitem(app.config, 'FEED_FANOUT_LIMIT', 0)
+    on_read = [_post(client, author_headers, f'Large audience {i}')['id'] for i in range(3)]
+    run_tasks()
+    # Served by the per-author merge, not as posts waiting for the worker
+    monkeypatch.setitem(app.config, 'FEED_PENDING_SECONDS', 0)
+
+    assert TimelineEntry.query.filter(TimelineEntry.post_id.in_(on_read)).count() == 0
+    expected = sorted(fanned + on_read, reverse=True)
+    assert _read_feed(client, viewer_headers, limit=2) == expected
+    assert _read_feed(client, author_headers, limit=2) == expected
+    assert _read_feed(client, stranger_headers, limit=2) == []
+
+
+def test_feed_reads_never_walk_the_un_fanned_backlog(sqlite_only, client, make_user, count_queries):
+    author, author_headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    _follow(client, viewer_headers, author)
+    _post(client, author_headers, 'Pending')
+
+    with count_queries() as statements:
+        client.get('/api/feed?limit=5', headers=viewer_headers)
+    plans = []
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            if 'fanned_out' in statement:
+                plans += [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+    # Un-fanned posts are only ever sought by author or within the pending window
+    assert any('ix_post_fanned_out_created_at_id (fanned_out=? AND created_at>?)' in plan for plan in plans), plans
+    assert not any(plan.endswith('ix_post_fanned_out_created_at_id (fanned_out=?)') for plan in plans), plans
+
+
+def test_the_sweep_requeues_fan_out_lost_after_commit(app, client, make_user, monkeypatch, run_tasks):
+    author, author_headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    _follow(client, viewer_headers, author)
+    def unreachable(*args, **kwargs):
+        raise ConnectionError('queue unreachable')
+
+    with monkeypatch.context() as patched:
+        patched.setattr('api.posts.enqueue', unreachable)
+        post = _post(client, author_headers, 'Lost task')
+    assert tasks.get_task_queue().stats()['queued'] == 0
+
+    worker = Worker(app)
+    assert worker.run_periodic(force=True) >= 1
+    assert run_tasks() == 0  # too young to be missing yet
+    stored = db.session.get(Post, post['id'])
+    # Missed by every sweep until it fell out of the pending window
+    stored.created_at -= timedelta(seconds=app.config['FEED_PENDING_SECONDS'] + 1)
+    db.session.commit()
+    worker.run_periodic(force=True)
+    assert run_tasks() == 1
+    worker.run_periodic(force=True)
+    assert run_tasks() == 0
+
+    monkeypatch.setitem(app.config, 'FEED_PENDING_SECONDS', 0)
+    assert TimelineEntry.query.filter_by(post_id=post['id']).count() == 2
+    assert _read_feed(client, viewer_headers, limit=2) == [post['id']]
+
+
+def test_authors_dropping_below_the_limit_get_their_posts_fanned_out(app, client, make_user, monkeypatch, run_tasks):
+    author, author_headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    _, leaver_headers = make_user('leaver')
+    _follow(client, viewer_headers, author)
+    _follow(client, leaver_headers, author)
+    monkeypatch.setitem(app.config, 'FEED_FANOUT_LIMIT', 1)
+    monkeypatch.setitem(app.config, 'FEED_PENDING_SECONDS', 0)
+    on_read = [_post(client, author_headers, f'Large audience {i}')['id'] for i in range(3)]
+    run_tasks()
+    assert TimelineEntry.query.filter(TimelineEntry.post_id.in_(on_read)).count() == 0
+
+    client.delete(f'/api/connections/{author.id}', headers=leaver_headers)
+    assert run_tasks() == 1
+    assert _read_feed(client, viewer_headers, limit=2) == sorted(on_read, reverse=True)
+    assert all(db.session.get(Post, post_id).fanned_out for post_id in on_read)
+
+
+def test_feed_page_cost_does_not_grow_with_post_volume(client, make_user, count_queries):
+    author, author_headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    _follow(client, viewer_headers, author)
+
+    def page_queries():
+        with count_queries() as statements:
+            client.get('/api/feed?limit=5', headers=viewer_headers)
+        return len(statements)
+
+    for i in range(6):
+        _post(client, author_headers, f'Post {i}')
+    small = page_queries()
+    for i in range(40):
+        _post(client, author_headers, f'More {i}')
+    assert page_queries() == small
+
+
+def test_deleted_posts_leave_every_timeline(client, make_user):
+    author, author_headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    _follow(client, viewer_headers, author)
+    post = _post(client, author_headers, 'Soon gone')
+
+    client.delete(f"/api/posts/{post['id']}", headers=author_headers)
+
+    assert TimelineEntry.query.count() == 0
+    assert client.get('/api/feed', headers=viewer_headers).get_json()['posts'] == []
+
+
+def test_feed_rejects_invalid_cursor(client, make_user):
+    _, headers = make_user('viewer')
+    assert client.get('/api/feed?cursor=garbage', headers=headers).status_code == 400
@@ -0,0 +1,127 @@
+"""
+Tests for the image derivative pipeline
+"""
+
+import io
+
+import pytest
+
+from services import images
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color='teal').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_upload_schedules_variants_and_listing_exposes_them(client, make_user, run_tasks, monkeypatch):
+    _, headers = make_user('author')
+
+    uploaded = client.post('/api/posts/photo', headers=headers,
+                           data={'photo': (io.BytesIO(_png(1200, 600)), 'shot.png')})
+    photo_url = uploaded.get_json()['photo_url']
+    assert not images.schedule_derivatives(photo_url)  # already queued under the same key
+    assert run_tasks() == 1
+    client.post('/api/posts', headers=headers, json={'content': 'Look', 'image_url': photo_url})
+    run_tasks()  # records the variants on the post
+
+    # Listings read the recorded variants instead of probing the disk
+    with monkeypatch.context() as patched:
+        patched.setattr(images.os.path, 'exists', lambda path: pytest.fail(f'stat of {path}'))
+        post = client.get('/api/posts', headers=headers).get_json()['posts'][0]
+    webp = post['image_srcset']['webp']
+    assert post['image_srcset']['original'] == photo_url
+    assert sorted(webp) == ['320w', '680w', '96w']
+    with Image.open(images.local_path_for_url(webp['320w'])) as variant:
+        assert variant.format == 'WEBP'
+        assert variant.size == (320, 160)
+
+
+def test_traversal_urls_never_reach_the_worker(client, make_user):
+    _, headers = make_user('author')
+    traversal = '/uploads/../../etc/x.png'
+
+    response = client.post('/api/posts', headers=headers, json={'content': 'Look', 'image_url': traversal})
+    assert response.status_code == 400
+    assert not images.schedule_derivatives(traversal)
+    assert not images.schedule_derivatives('/uploads/post_photos/../../../etc/x.png')
+    assert images.local_path_for_url(traversal) is None
+    assert images.local_path_for_url('/uploads/blobs/../../../etc/passwd') is None
+    assert client.post('/api/posts', headers=headers,
+                       json={'content': 'Look', 'image_url': 'https://example.com/x.png'}).status_code == 400
+
+
+def test_small_images_are_not_upscaled(app, tmp_path):
+    original = tmp_path / 'uploads' / 'post_photos' / 'tiny.png'
+    original.parent.mkdir(parents=True)
+    original.write_bytes(_png(200, 100))
+
+    images.generate_derivatives(str(original))
+
+    variants = images.existing_variants(str(original)).split()
+    assert '96w.webp' in variants and '320w.webp' not in variants
+
+
+def test_recorded_variants_change_the_etag(client, make_user, run_tasks):
+    _, headers = make_user('member')
+    client.post('/api/profile/photo', headers=headers, data={'photo': (io.BytesIO(_png(800, 800)), 'me.png')})
+    uploaded = client.post('/api/posts/photo', headers=headers,
+                           data={'photo': (io.BytesIO(_png(1200, 600)), 'shot.png')})
+    client.post('/api/posts', headers=headers, json={'content': 'Look', 'image_url': uploaded.get_json()['photo_url']})
+    etags = {url: client.get(url, headers=headers).headers['ETag'] for url in ('/api/profile', '/api/posts')}
+
+    run_tasks()
+
+    for url, etag in etags.items():
+        assert client.get(url, headers={**headers, 'If-None-Match': etag}).status_code == 200, url
+
+
+def test_cached_payloads_pick_up_recorded_variants(client, make_user, run_tasks):
+    member, headers = make_user('member')
+    _, viewer_headers = make_user('viewer')
+    client.post('/api/profile/photo', headers=headers, data={'photo': (io.BytesIO(_png(800, 800)), 'me.png')})
+    uploaded = client.post('/api/posts/photo', headers=headers,
+                           data={'photo': (io.BytesIO(_png(1200, 600)), 'shot.png')})
+    client.post('/api/posts', headers=headers, json={'content': 'Look', 'image_url': uploaded.get_json()['photo_url']})
+
+    def payloads():
+        profile = client.get('/api/profile', headers=headers).get_json()['profile']
+        post = client.get('/api/posts', headers=viewer_headers).get_json()['posts'][0]
+        card = client.get(f'/api/users/cards?ids={member.id}', headers=viewer_headers).get_json()['cards'][str(member.id)]
+        return profile['photos'][0]['srcset'], post['image_srcset'], card['avatar']
+
+    profile_srcset, post_srcset, avatar = payloads()  # cached with originals only
+    assert 'webp' not in profile_srcset and 'webp' not in post_srcset
+    run_tasks()
+
+    profile_srcset, post_srcset, avatar = payloads()
+    assert '96w' in profile_srcset['webp'] and '320w' in post_srcset['webp']
+    assert avatar == profile_srcset['webp']['96w']
+
+
+def test_backfill_queues_derivatives_for_images_uploaded_before_variants(client, make_user, run_tasks):
+    from backfill_image_variants import backfill_image_variants
+    from models.post import Post
+    from models.profile import Profile, ProfilePhoto
+    from models.user import db
+    from services.blob_store import get_blob_store
+
+    user, headers = make_user('author')
+    # Rows as the image_variants migration left them: nothing recorded, no task queued
+    post_url, photo_url = (get_blob_store().put_bytes(_png(1200, 600 + i), 'png') for i in range(2))
+    db.session.add(Post(user_id=user.id, content='Old', image_url=post_url, image_variants=''))
+    profile = db.session.scalars(db.select(Profile).filter_by(user_id=user.id)).one()
+    db.session.add(ProfilePhoto(profile_id=profile.id, url=photo_url))
+    db.session.commit()
+
+    assert backfill_image_variants(batch_size=1)
+    assert run_tasks() == 2
+
+    post = client.get('/api/posts', headers=headers).get_json()['posts'][0]
+    assert sorted(post['image_srcset']['webp']) == ['320w', '680w', '96w']
+    assert db.session.scalars(db.select(ProfilePhoto.variants)).one().split()
+    assert backfill_image_variants()  # nothing left to queue
+    assert run_tasks() == 0
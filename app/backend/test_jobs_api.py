@@ -0,0 +1,101 @@
+"""
+Tests for the job board API and its full-text search
+"""
+
+from models.job import Job
+from models.user import db
+
+JOBS = [
+    ('Senior Python Engineer', 'Acme', 'Build APIs for payroll', 'Berlin', 'Flask, SQL'),
+    ('Frontend Developer', 'Globex', 'React dashboards, some Python scripting', 'Remote', 'TypeScript'),
+    ('Data Engineer', 'Acme', 'Pipelines and warehousing', 'Remote', 'Python, Spark'),
+    ('Office Manager', 'Initech', 'Keep the office running', 'Austin', None),
+]
+
+
+def _seed_jobs():
+    for title, company, description, location, requirements in JOBS:
+        db.session.add(Job(title=title, company=company, description=description,
+                           location=location, requirements=requirements))
+    db.session.commit()
+
+
+def _titles(body):
+    return [job['title'] for job in body['jobs']]
+
+
+def test_keyword_search_ranks_title_matches_first(client, make_user):
+    _, headers = make_user('seeker')
+    _seed_jobs()
+
+    body = client.get('/api/jobs?q=python', headers=headers).get_json()
+
+    assert _titles(body)[0] == 'Senior Python Engineer'
+    assert set(_titles(body)) == {'Senior Python Engineer', 'Frontend Developer', 'Data Engineer'}
+
+
+def test_search_stems_and_ignores_query_syntax(client, make_user):
+    _, headers = make_user('seeker')
+    _seed_jobs()
+
+    body = client.get('/api/jobs?q=engineers', headers=headers).get_json()
+    assert set(_titles(body)) == {'Senior Python Engineer', 'Data Engineer'}
+    response = client.get('/api/jobs?q=python" OR (NEAR', headers=headers)
+    assert response.status_code == 200
+
+
+def test_filters_combine_with_search(client, make_user):
+    _, headers = make_user('seeker')
+    _seed_jobs()
+
+    assert _titles(client.get('/api/jobs?q=python&location=Remote&company=Acme', headers=headers).get_json()) == [
+        'Data Engineer'
+    ]
+    assert _titles(client.get('/api/jobs?company=Acme', headers=headers).get_json()) == [
+        'Data Engineer', 'Senior Python Engineer'
+    ]
+
+
+def test_ranked_and_listing_results_page_by_keyset(client, make_user):
+    _, headers = make_user('seeker')
+    for i in range(7):
+        db.session.add(Job(title=f'Python role {i}', company='Acme', description='python ' * (i + 1)))
+    db.session.commit()
+
+    for query in ('q=python&', ''):
+        seen, cursor = [], None
+        while True:
+            url = f'/api/jobs?{query}limit=3' + (f'&cursor={cursor}' if cursor else '')
+            body = client.get(url, headers=headers).get_json()
+            seen += [job['id'] for job in body['jobs']]
+            cursor = body['next_cursor']
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)) == 7
+
+
+def test_index_follows_inserts_updates_and_deletes(client, make_user):
+    _, headers = make_user('recruiter')
+    created = client.post('/api/jobs', headers=headers, json={
+        'title': 'Rust Engineer', 'company': 'Hooli', 'description': 'Systems work'
+    })
+    assert created.status_code == 201
+    job = db.session.get(Job, created.get_json()['job']['id'])
+
+    assert _titles(client.get('/api/jobs?q=rust', headers=headers).get_json()) == ['Rust Engineer']
+
+    job.title = 'Go Engineer'
+    db.session.commit()
+    assert client.get('/api/jobs?q=rust', headers=headers).get_json()['jobs'] == []
+    assert _titles(client.get('/api/jobs?q=go', headers=headers).get_json()) == ['Go Engineer']
+
+    db.session.delete(job)
+    db.session.commit()
+    assert client.get('/api/jobs?q=go', headers=headers).get_json()['jobs'] == []
+
+
+def test_create_job_requires_fields(client, make_user):
+    _, headers = make_user('recruiter')
+    response = client.post('/api/jobs', headers=headers, json={'title': 'Engineer'})
+    assert response.status_code == 400
+    assert 'company' in response.get_json()['message']
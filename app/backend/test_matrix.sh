@@ -0,0 +1,23 @@
+#!/bin/bash
+
+# Run the API test suite against every supported database backend.
+# PostgreSQL needs a scratch database, e.g.  createdb peer_test
+# and TEST_POSTGRES_URL if it is not on localhost with the current user.
+
+cd "$(dirname "$0")"
+
+TEST_POSTGRES_URL=${TEST_POSTGRES_URL:-postgresql://localhost/peer_test}
+status=0
+
+echo "🧪 Running tests against SQLite..."
+TEST_DATABASE_URL=sqlite:// python -m pytest -q "$@" || status=1
+
+echo "🧪 Running tests against PostgreSQL ($TEST_POSTGRES_URL)..."
+if python -c "import psycopg, sys; psycopg.connect(sys.argv[1]).close()" "$TEST_POSTGRES_URL" 2>/dev/null; then
+    TEST_DATABASE_URL=$TEST_POSTGRES_URL python -m pytest -q "$@" || status=1
+else
+    echo "❌ Cannot connect to $TEST_POSTGRES_URL"
+    status=1
+fi
+
+exit $status
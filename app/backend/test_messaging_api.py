@@ -0,0 +1,89 @@
+"""
+Tests for the messaging API: conversations, history pages and unread counters
+"""
+
+from models.message import Conversation, Message
+
+
+def _send(client, headers, receiver, content):
+    return client.post('/api/messages', headers=headers, json={'receiver_id': receiver.id, 'content': content})
+
+
+def test_messages_between_a_pair_share_one_conversation(client, make_user):
+    alice, alice_headers = make_user('alice')
+    bob, bob_headers = make_user('bob')
+
+    first = _send(client, alice_headers, bob, 'Hi Bob').get_json()['data']
+    reply = _send(client, bob_headers, alice, 'Hi Alice').get_json()['data']
+
+    assert first['conversation_id'] == reply['conversation_id']
+    assert Conversation.query.count() == 1
+    conversation = Conversation.query.one()
+    assert conversation.last_message_id == reply['id']
+
+
+def test_send_validates_input(client, make_user):
+    alice, headers = make_user('alice')
+
+    assert client.post('/api/messages', headers=headers, json={'receiver_id': alice.id, 'content': 'Me'}).status_code == 400
+    assert client.post('/api/messages', headers=headers, json={'receiver_id': 999, 'content': 'Hi'}).status_code == 404
+    assert client.post('/api/messages', headers=headers, json={'receiver_id': alice.id}).status_code == 400
+
+
+def test_unread_counters_are_maintained_on_write(client, make_user):
+    alice, alice_headers = make_user('alice')
+    bob, bob_headers = make_user('bob')
+    carol, carol_headers = make_user('carol')
+    conversation_id = _send(client, alice_headers, bob, 'One').get_json()['data']['conversation_id']
+    _send(client, alice_headers, bob, 'Two')
+    _send(client, carol_headers, bob, 'Three')
+
+    assert client.get('/api/messages/unread', headers=bob_headers).get_json() == {'unread_count': 3}
+    assert client.get('/api/messages/unread', headers=alice_headers).get_json() == {'unread_count': 0}
+
+    read = client.post(f'/api/messages/conversations/{conversation_id}/read', headers=bob_headers)
+    assert read.get_json()['unread_count'] == 1
+    assert Message.query.filter_by(conversation_id=conversation_id, is_read=False).count() == 0
+    assert client.post(f'/api/messages/conversations/{conversation_id}/read', headers=carol_headers).status_code == 404
+
+
+def test_inbox_is_one_query_ordered_by_latest_message(client, make_user, count_queries):
+    me, my_headers = make_user('me')
+    friends = [make_user(f'friend{i}') for i in range(6)]
+    for friend, headers in friends:
+        _send(client, headers, me, f'Hello from {friend.username}')
+    _send(client, my_headers, friends[0][0], 'Reply to the first')
+
+    with count_queries() as statements:
+        body = client.get('/api/messages?limit=4', headers=my_headers).get_json()
+
+    inbox_queries = [s for s, _ in statements if 'conversation_member' in s]
+    assert len(inbox_queries) == 1
+    assert [c['user']['username'] for c in body['conversations']] == ['friend0', 'friend5', 'friend4', 'friend3']
+    assert body['conversations'][0]['last_message']['content'] == 'Reply to the first'
+    assert body['conversations'][0]['unread_count'] == 1
+    assert body['unread_count'] == 6
+
+    rest = client.get(f"/api/messages?limit=4&cursor={body['next_cursor']}", headers=my_headers).get_json()
+    assert [c['user']['username'] for c in rest['conversations']] == ['friend2', 'friend1']
+    assert rest['next_cursor'] is None
+
+
+def test_history_pages_by_keyset_and_is_private(client, make_user):
+    alice, alice_headers = make_user('alice')
+    bob, _ = make_user('bob')
+    _, eve_headers = make_user('eve')
+    sent = [_send(client, alice_headers, bob, f'Message {i}').get_json()['data'] for i in range(5)]
+    conversation_id = sent[0]['conversation_id']
+
+    seen, cursor = [], None
+    while True:
+        url = f'/api/messages/conversations/{conversation_id}?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=alice_headers).get_json()
+        seen += [m['id'] for m in body['messages']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == [m['id'] for m in reversed(sent)]
+    assert client.get(f'/api/messages/conversations/{conversation_id}', headers=eve_headers).status_code == 404
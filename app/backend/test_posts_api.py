@@ -0,0 +1,205 @@
+"""
+Tests for the posts API
+"""
+
+import io
+import os
+
+from models.post import Post, PostLike
+from models.user import db
+from services.cache import invalidate_tags, user_tag
+
+
+def _seed_posts(author, likers, count):
+    for i in range(count):
+        post = Post(user_id=author.id, content=f'Post {i} #webdev')
+        db.session.add(post)
+        db.session.flush()
+        for liker in likers:
+            db.session.add(PostLike(post_id=post.id, user_id=liker.id))
+        post.likes_count = len(likers)
+    db.session.commit()
+    invalidate_tags('posts', user_tag(author.id))
+
+
+def test_get_posts_returns_authors_and_likes(client, make_user):
+    author, _ = make_user('author')
+    viewer, headers = make_user('viewer')
+    _seed_posts(author, [author, viewer], 2)
+
+    response = client.get('/api/posts', headers=headers)
+
+    assert response.status_code == 200
+    posts = response.get_json()['posts']
+    assert len(posts) == 2
+    for post in posts:
+        assert post['user'] == {'id': author.id, 'username': 'author'}
+        assert post['likes_count'] == 2
+        assert post['liked_by_user'] is True
+
+
+def test_get_posts_query_count_is_constant(client, make_user, count_queries):
+    author, _ = make_user('author')
+    viewer, headers = make_user('viewer')
+
+    _seed_posts(author, [viewer], 5)
+    with count_queries() as small:
+        client.get('/api/posts', headers=headers)
+
+    _seed_posts(author, [author, viewer], 50)
+    with count_queries() as large:
+        client.get('/api/posts', headers=headers)
+
+    assert len(small) == len(large)
+    # Posts with authors, the viewer's likes, and the ETag version stamp
+    assert len(large) <= 3
+
+
+def test_get_user_posts_query_count_is_constant(client, make_user, count_queries):
+    author, headers = make_user('author')
+
+    _seed_posts(author, [author], 3)
+    with count_queries() as small:
+        client.get(f'/api/posts/user/{author.id}', headers=headers)
+
+    _seed_posts(author, [author], 30)
+    with count_queries() as large:
+        response = client.get(f'/api/posts/user/{author.id}', headers=headers)
+
+    assert len(response.get_json()['posts']) == 33
+    assert len(small) == len(large)
+
+
+def test_cursor_pagination_walks_every_post_once(client, make_user):
+    author, headers = make_user('author')
+    _seed_posts(author, [], 25)
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/posts?limit=10' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=headers).get_json()
+        seen.extend(post['id'] for post in body['posts'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_cursor_pagination_uses_index_seek(sqlite_only, client, make_user, count_queries):
+    author, headers = make_user('author')
+    _seed_posts(author, [], 3)
+    first = client.get(f'/api/posts/user/{author.id}?limit=1', headers=headers).get_json()
+
+    with count_queries() as statements:
+        client.get(f'/api/posts/user/{author.id}?limit=1&cursor={first["next_cursor"]}', headers=headers)
+
+    page_query, params = statements[0]
+    assert params[-1] == 0  # SQLite always renders OFFSET; it must stay at zero
+    with db.engine.connect() as conn:
+        plan = ' '.join(row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + page_query, params))
+    assert 'USING INDEX ix_post_user_id_created_at_id' in plan
+
+
+def test_invalid_cursor_is_rejected(client, make_user):
+    _, headers = make_user('viewer')
+
+    response = client.get('/api/posts?cursor=not-a-cursor', headers=headers)
+
+    assert response.status_code == 400
+
+
+def test_like_toggle_maintains_counter(client, make_user):
+    author, author_headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    post = Post(user_id=author.id, content='Hello')
+    db.session.add(post)
+    db.session.commit()
+
+    liked = client.post(f'/api/posts/{post.id}/like', headers=viewer_headers).get_json()
+    also_liked = client.post(f'/api/posts/{post.id}/like', headers=author_headers).get_json()
+    unliked = client.post(f'/api/posts/{post.id}/like', headers=viewer_headers).get_json()
+
+    assert (liked['likes_count'], liked['liked_by_user']) == (1, True)
+    assert also_liked['likes_count'] == 2
+    assert (unliked['likes_count'], unliked['liked_by_user']) == (1, False)
+    db.session.expire_all()
+    assert db.session.get(Post, post.id).likes_count == PostLike.query.filter_by(post_id=post.id).count()
+
+
+def test_listing_does_not_aggregate_likes(client, make_user, count_queries):
+    author, headers = make_user('author')
+    _seed_posts(author, [author], 3)
+
+    with count_queries() as statements:
+        client.get('/api/posts', headers=headers)
+
+    assert not any('count(' in statement.lower() and 'post_like' in statement.lower() for statement, _ in statements)
+
+
+PNG_BYTES = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+def test_photo_upload_is_sniffed_and_renamed(client, make_user):
+    _, headers = make_user('author')
+
+    response = client.post('/api/posts/photo', headers=headers,
+                           data={'photo': (io.BytesIO(PNG_BYTES), 'holiday.jpg')})
+
+    assert response.status_code == 201
+    url = response.get_json()['photo_url']
+    assert url.endswith('_holiday.png')
+    assert os.listdir('uploads/post_photos') == [url.rsplit('/', 1)[1]]
+
+
+def test_photo_upload_rejects_non_images(client, make_user):
+    _, headers = make_user('author')
+
+    response = client.post('/api/posts/photo', headers=headers,
+                           data={'photo': (io.BytesIO(b'<?php echo 1; ?>'), 'shell.png')})
+
+    assert response.status_code == 400
+    assert os.listdir('uploads/post_photos') == []
+
+
+def test_photo_upload_aborts_past_the_cap(app, client, make_user):
+    _, headers = make_user('author')
+    app.config['MAX_PHOTO_BYTES'] = 1024
+    try:
+        response = client.post('/api/posts/photo', headers=headers,
+                               data={'photo': (io.BytesIO(PNG_BYTES * 100), 'big.png')})
+    finally:
+        app.config['MAX_PHOTO_BYTES'] = 5 * 1024 * 1024
+
+    assert response.status_code == 413
+    assert os.listdir('uploads/post_photos') == []
+
+
+def test_post_listings_are_cached_per_viewer_until_a_write_touches_them(client, make_user, count_queries):
+    author, author_headers = make_user('author')
+    _, headers = make_user('viewer')
+    post = client.post('/api/posts', headers=author_headers, json={'content': 'First'}).get_json()['post']
+
+    def listings():
+        return (client.get('/api/posts', headers=headers).get_json()['posts'],
+                client.get(f'/api/posts/user/{author.id}?limit=5', headers=headers).get_json()['posts'])
+
+    listings()
+    with count_queries() as statements:
+        everyone, by_author = listings()
+    # Only the page's ETag version stamp; the whole listing is stamped from cache tags
+    assert len(statements) == 1
+    assert everyone[0]['liked_by_user'] is False
+
+    client.post(f"/api/posts/{post['id']}/like", headers=headers)
+    everyone, by_author = listings()
+    assert everyone[0]['liked_by_user'] is by_author[0]['liked_by_user'] is True
+    assert client.get('/api/posts', headers=author_headers).get_json()['posts'][0]['likes_count'] == 1
+
+    second = client.post('/api/posts', headers=author_headers, json={'content': 'Second'}).get_json()['post']
+    assert [len(posts) for posts in listings()] == [2, 2]
+    client.delete(f"/api/posts/{second['id']}", headers=author_headers)
+    assert [len(posts) for posts in listings()] == [1, 1]
@@ -0,0 +1,145 @@
+"""
+Tests for the profile API
+"""
+
+import base64
+import io
+import os
+
+from flask import current_app
+
+from models.profile import Education, Profile
+from models.user import db
+
+PNG_BYTES = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+PNG_DATA_URL = 'data:image/png;base64,' + base64.b64encode(PNG_BYTES).decode()
+
+
+def _blob_path(url):
+    relative = url[len('/uploads/blobs/'):]
+    return os.path.join(current_app.config['BLOB_STORE_ROOT'], relative)
+
+
+def test_data_url_photo_is_stored_as_blob(client, make_user):
+    _, headers = make_user('member')
+
+    response = client.post('/api/profile/photo', headers=headers, json={'photo_url': PNG_DATA_URL})
+
+    assert response.status_code == 201
+    url = response.get_json()['photo']['url']
+    assert url.startswith('/uploads/blobs/') and url.endswith('.png')
+    with open(_blob_path(url), 'rb') as blob:
+        assert blob.read() == PNG_BYTES
+    profile = client.get('/api/profile', headers=headers).get_json()['profile']
+    assert profile['photos'][0]['url'] == url
+
+
+def test_identical_photos_share_one_blob(client, make_user):
+    _, first_headers = make_user('first')
+    _, second_headers = make_user('second')
+
+    first = client.post('/api/profile/photo', headers=first_headers, json={'photo_url': PNG_DATA_URL})
+    second = client.post('/api/profile/photo', headers=second_headers, json={'photo_url': PNG_DATA_URL})
+
+    url = first.get_json()['photo']['url']
+    assert second.get_json()['photo']['url'] == url
+    assert os.listdir(os.path.dirname(_blob_path(url))) == [os.path.basename(url)]
+
+
+def test_undecodable_data_url_is_rejected(client, make_user):
+    _, headers = make_user('member')
+
+    response = client.post('/api/profile/photo', headers=headers, json={'photo_url': 'data:image/png;base64,@@@'})
+
+    assert response.status_code == 400
+
+
+def test_multipart_photo_is_streamed_into_blob_store(client, make_user):
+    _, headers = make_user('member')
+
+    response = client.post('/api/profile/photo', headers=headers,
+                           data={'photo': (io.BytesIO(PNG_BYTES), 'me.gif')})
+
+    assert response.status_code == 201
+    url = response.get_json()['photo']['url']
+    assert url.startswith('/uploads/blobs/') and url.endswith('.png')
+    with open(_blob_path(url), 'rb') as blob:
+        assert blob.read() == PNG_BYTES
+
+
+def test_file_parts_are_cleaned_up_when_the_photo_field_is_missing(client, make_user):
+    _, headers = make_user('member')
+
+    response = client.post('/api/profile/photo', headers=headers,
+                           data={'avatar': (io.BytesIO(PNG_BYTES), 'me.png')})
+
+    assert response.status_code == 400
+    root = current_app.config['BLOB_STORE_ROOT']
+    assert [name for _, _, names in os.walk(root) for name in names if name.endswith('.part')] == []
+
+
+def test_profile_aggregate_is_one_query_then_served_from_cache(client, make_user, count_queries):
+    user, headers = make_user('member')
+    profile_id = Profile.query.filter_by(user_id=user.id).one().id
+    db.session.add(Education(profile_id=profile_id, school='MIT', field_of_study='Math', start_year=2010))
+    db.session.commit()
+    client.post('/api/profile/experience', headers=headers,
+                json={'title': 'Engineer', 'company': 'Peer', 'start_date': '2024'})
+    client.post('/api/profile/achievements', headers=headers, json={'title': 'Award'})
+    client.post('/api/profile/photo', headers=headers, json={'photo_url': PNG_DATA_URL})
+
+    with count_queries() as statements:
+        body = client.get('/api/profile', headers=headers).get_json()
+    # The ETag version stamp and the aggregate
+    assert len(statements) == 2
+    assert body['user'] == {'id': user.id, 'username': 'member', 'email': 'member@example.com'}
+    assert [e['company'] for e in body['profile']['experience']] == ['Peer']
+    assert body['profile']['education'][0]['field'] == 'Math'
+    assert [a['title'] for a in body['profile']['achievements']] == ['Award']
+    assert body['profile']['photos'][0]['url'].startswith('/uploads/blobs/')
+
+    with count_queries() as statements:
+        assert client.get('/api/profile', headers=headers).get_json() == body
+    assert len(statements) == 1
+
+
+def test_profile_is_created_at_signup_not_on_read(client):
+    client.post('/api/signup', json={'username': 'newbie', 'email': 'n@example.com', 'password': 'password123'})
+    token = client.post('/api/login', json={'username': 'newbie', 'password': 'password123'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/api/profile', headers=headers).get_json()['profile']['full_name'] == 'newbie'
+
+    Profile.query.delete()
+    db.session.commit()
+    client.application.extensions['cache'].clear()
+    assert client.get('/api/profile', headers=headers).status_code == 404
+    assert Profile.query.count() == 0
+
+
+def test_every_profile_write_invalidates_the_cached_payload(client, make_user):
+    _, headers = make_user('member')
+
+    def profile():
+        return client.get('/api/profile', headers=headers).get_json()['profile']
+
+    profile()
+    client.put('/api/profile', headers=headers, json={'bio': 'Hello'})
+    assert profile()['bio'] == 'Hello'
+
+    experience = client.post('/api/profile/experience', headers=headers,
+                             json={'title': 'Engineer', 'company': 'Peer', 'start_date': '2024'}).get_json()
+    assert len(profile()['experience']) == 1
+    client.delete(f"/api/profile/experience/{experience['experience']['id']}", headers=headers)
+    assert profile()['experience'] == []
+
+    achievement = client.post('/api/profile/achievements', headers=headers, json={'title': 'Award'}).get_json()
+    assert len(profile()['achievements']) == 1
+    client.delete(f"/api/profile/achievements/{achievement['achievement']['id']}", headers=headers)
+    assert profile()['achievements'] == []
+
+    client.post('/api/profile/photo', headers=headers, json={'photo_url': PNG_DATA_URL})
+    assert len(profile()['photos']) == 1
+    client.delete('/api/profile/photo', headers=headers)
+    assert profile()['photos'] == []
@@ -0,0 +1,129 @@
+"""
+EXPLAIN-based guard against full table scans on every registered API endpoint
+"""
+
+import io
+import re
+
+from models.user import db
+
+PNG_BYTES = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89'
+    b'\x00\x00\x00\rIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82'
+)
+
+# "SCAN post" is a full table scan; "SCAN post USING INDEX ..." walks an index
+TABLE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+# Subquery results are scanned too, but their own plan is checked row by row
+SUBQUERY = re.compile(r'^(?:MATERIALIZE|CO-ROUTINE) (\w+)$')
+CATALOG_TABLES = {'sqlite_master', 'sqlite_schema', 'sqlite_temp_master'}
+
+
+def _exercise_endpoints(client, make_user, run_tasks):
+    """Call every registered endpoint once, plus the tasks they queue, and return the endpoint names hit"""
+    author, headers = make_user('author')
+    _, viewer_headers = make_user('viewer')
+    hit = set()
+
+    def call(endpoint, method, url, request_headers=headers, **kwargs):
+        response = client.open(url, method=method, headers=request_headers, **kwargs)
+        assert response.status_code < 500, (endpoint, response.get_json())
+        hit.add(endpoint)
+        return response.get_json()
+
+    call('auth.signup', 'POST', '/api/signup', request_headers={},
+         json={'username': 'newbie', 'email': 'newbie@example.com', 'password': 'password123'})
+    call('auth.login', 'POST', '/api/login', request_headers={},
+         json={'username': 'newbie', 'password': 'password123'})
+
+    call('profile.get_profile', 'GET', '/api/profile')
+    call('profile.update_profile', 'PUT', '/api/profile', json={'bio': 'Hello'})
+    experience = call('profile.add_experience', 'POST', '/api/profile/experience',
+                      json={'title': 'Engineer', 'company': 'Peer', 'start_date': '2024'})
+    call('profile.remove_experience', 'DELETE', f"/api/profile/experience/{experience['experience']['id']}")
+    achievement = call('profile.add_achievement', 'POST', '/api/profile/achievements', json={'title': 'Award'})
+    call('profile.remove_achievement', 'DELETE', f"/api/profile/achievements/{achievement['achievement']['id']}")
+    call('profile.upload_profile_photo', 'POST', '/api/profile/photo',
+         data={'photo': (io.BytesIO(PNG_BYTES), 'me.png')})
+    call('profile.remove_profile_photo', 'DELETE', '/api/profile/photo')
+    call('users.get_user_profile', 'GET', f'/api/users/{author.id}/profile', request_headers=viewer_headers)
+    call('users.get_user_cards', 'GET', f'/api/users/cards?ids={author.id},0', request_headers=viewer_headers)
+
+    post = call('posts.create_post', 'POST', '/api/posts', json={'content': 'Hello #peer'})['post']
+    call('posts.upload_post_photo', 'POST', '/api/posts/photo',
+         data={'photo': (io.BytesIO(PNG_BYTES), 'shot.png')})
+    call('posts.get_posts', 'GET', '/api/posts')
+    call('posts.get_posts', 'GET', '/api/posts?limit=5')
+    call('posts.get_user_posts', 'GET', f'/api/posts/user/{author.id}?limit=5')
+    call('tags.get_tag_posts', 'GET', '/api/tags/peer/posts?limit=5')
+    call('tags.get_trending_tags', 'GET', '/api/tags/trending')
+    call('connections.create_connection', 'POST', '/api/connections', request_headers=viewer_headers,
+         json={'user_id': author.id})
+    call('connections.get_connections', 'GET', '/api/connections?limit=5', request_headers=viewer_headers)
+    call('connections.get_connections', 'GET', f'/api/connections?direction=followers&user_id={author.id}')
+    call('connections.get_connection_status', 'GET', f'/api/connections/status?ids={author.id}',
+         request_headers=viewer_headers)
+    assert run_tasks() >= 1  # timeline fan-out
+    call('feed.get_feed', 'GET', '/api/feed?limit=5', request_headers=viewer_headers)
+    job = call('jobs.create_job', 'POST', '/api/jobs',
+               json={'title': 'Python Engineer', 'company': 'Peer', 'description': 'APIs', 'location': 'Remote'})['job']
+    call('jobs.get_jobs', 'GET', '/api/jobs?limit=5')
+    call('jobs.get_jobs', 'GET', '/api/jobs?q=python&limit=5')
+    call('jobs.get_jobs', 'GET', '/api/jobs?company=Peer&limit=5')
+    call('jobs.get_jobs', 'GET', '/api/jobs?location=Remote&limit=5')
+    call('jobs.get_job', 'GET', f"/api/jobs/{job['id']}")
+    search = call('search.search', 'GET', '/api/search?q=hello&limit=1')
+    call('search.search', 'GET', f"/api/search?q=hello&limit=1&cursor={search['next_cursor']}")
+    call('search.search_typeahead', 'GET', '/api/search/typeahead?q=pe')
+    call('search.search_typeahead', 'GET', '/api/search/typeahead?q=new&type=person')
+    events = client.get('/api/events', headers=viewer_headers, buffered=False)
+    assert events.status_code == 200
+    events.close()
+    hit.add('events.stream_events')
+    sent = call('messaging.create_message', 'POST', '/api/messages', request_headers=viewer_headers,
+                json={'receiver_id': author.id, 'content': 'Hi'})['data']
+    call('messaging.get_inbox', 'GET', '/api/messages?limit=5')
+    call('messaging.get_unread_count', 'GET', '/api/messages/unread')
+    call('messaging.get_conversation', 'GET', f"/api/messages/conversations/{sent['conversation_id']}?limit=5")
+    call('messaging.read_conversation', 'POST', f"/api/messages/conversations/{sent['conversation_id']}/read")
+    call('posts.like_post', 'POST', f"/api/posts/{post['id']}/like", request_headers=viewer_headers)
+    call('posts.delete_post', 'DELETE', f"/api/posts/{post['id']}")
+    call('connections.remove_connection', 'DELETE', f'/api/connections/{author.id}', request_headers=viewer_headers)
+    return hit
+
+
+def _api_endpoints(app):
+    endpoints = set()
+    for rule in app.url_map.iter_rules():
+        if rule.rule.startswith('/api/') and rule.methods - {'OPTIONS', 'HEAD'}:
+            endpoints.add(rule.endpoint)
+    return endpoints
+
+
+def _full_scans(statement, parameters):
+    with db.engine.connect() as conn:
+        plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    subqueries = {m.group(1) for m in (SUBQUERY.match(row[-1]) for row in plan) if m}
+    scans = []
+    for row in plan:
+        match = TABLE_SCAN.match(row[-1])
+        if match and match.group(1) not in CATALOG_TABLES | subqueries and match.group(1) != 'CONSTANT':
+            scans.append(match.group(1))
+    return scans
+
+
+def test_no_endpoint_query_does_a_full_table_scan(sqlite_only, app, client, make_user, count_queries, run_tasks):
+    with count_queries() as statements:
+        hit = _exercise_endpoints(client, make_user, run_tasks)
+
+    missing = _api_endpoints(app) - hit
+    assert not missing, f'add these endpoints to _exercise_endpoints: {sorted(missing)}'
+
+    offenders = {}
+    for statement, parameters in statements:
+        if not re.match(r'\s*(SELECT|UPDATE|DELETE|WITH)\b', statement, re.IGNORECASE):
+            continue
+        scans = _full_scans(statement, parameters)
+        if scans:
+            offenders[statement] = scans
+    assert not offenders, offenders
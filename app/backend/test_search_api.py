@@ -0,0 +1,119 @@
+"""
+Tests for unified post and people search
+"""
+
+from models.profile import Profile, Skill
+from models.search import SearchDocument
+from models.user import db
+from services.search import index_person
+
+
+def _post(client, headers, content):
+    return client.post('/api/posts', headers=headers, json={'content': content}).get_json()['post']
+
+
+def _results(body):
+    return [(result['type'], result[result['type']]['id']) for result in body['results']]
+
+
+def test_search_finds_posts_by_hashtag_and_people_by_profile(client, make_user):
+    ada, ada_headers = make_user('ada')
+    grace, grace_headers = make_user('grace')
+    client.put('/api/profile', headers=grace_headers, json={'full_name': 'Grace Hopper', 'bio': 'Compilers'})
+    client.post('/api/profile/experience', headers=grace_headers,
+                json={'title': 'Rear Admiral', 'company': 'Navy', 'start_date': '1943'})
+    post = _post(client, ada_headers, 'Shipping the new site #webdev')
+    _post(client, ada_headers, 'Lunch')
+
+    body = client.get('/api/search?q=%23webdev', headers=ada_headers).get_json()
+    assert _results(body) == [('post', post['id'])]
+    assert body['results'][0]['post']['user']['username'] == 'ada'
+    assert body['facets'] == {'post': 1, 'person': 0}
+
+    for query in ('hopper', 'navy', 'compilers'):
+        body = client.get(f'/api/search?q={query}', headers=ada_headers).get_json()
+        assert _results(body) == [('person', grace.id)], query
+        assert body['results'][0]['person']['full_name'] == 'Grace Hopper'
+
+
+def test_name_matches_outrank_bio_matches_and_type_filters(client, make_user):
+    _, headers = make_user('viewer')
+    rust, rust_headers = make_user('rustacean')
+    fan, fan_headers = make_user('fan')
+    client.put('/api/profile', headers=rust_headers, json={'full_name': 'Rust Cole'})
+    client.put('/api/profile', headers=fan_headers, json={'bio': 'I write a lot of rust'})
+    post = _post(client, fan_headers, 'Learning rust this week')
+
+    body = client.get('/api/search?q=rust', headers=headers).get_json()
+    assert _results(body)[0] == ('person', rust.id)
+    assert body['facets'] == {'post': 1, 'person': 2}
+
+    body = client.get('/api/search?q=rust&type=post', headers=headers).get_json()
+    assert _results(body) == [('post', post['id'])]
+    assert client.get('/api/search?q=post', headers=headers).get_json()['facets'] == {'post': 0, 'person': 0}
+    assert client.get('/api/search?q=rust&type=job', headers=headers).status_code == 400
+    assert client.get('/api/search?q=%22%28', headers=headers).status_code == 400
+
+
+def test_results_page_by_keyset_and_facets_come_with_the_first_page(client, make_user):
+    _, headers = make_user('poster')
+    for i in range(5):
+        _post(client, headers, 'python ' * (i + 1))
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/search?q=python&limit=2' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=headers).get_json()
+        assert ('facets' in body) == (cursor is None)
+        seen += _results(body)
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+
+def test_typeahead_matches_prefixes_of_names_and_skills(client, make_user):
+    _, headers = make_user('viewer')
+    jane, jane_headers = make_user('jdoe')
+    client.put('/api/profile', headers=jane_headers, json={'full_name': 'Jane Doe'})
+    profile = Profile.query.filter_by(user_id=jane.id).one()
+    db.session.add(Skill(profile_id=profile.id, name='Kubernetes'))
+    index_person(jane.id)
+    db.session.commit()
+
+    for query in ('ja', 'jane d', 'kube', 'jdo'):
+        suggestions = client.get(f'/api/search/typeahead?q={query}&type=person',
+                                 headers=headers).get_json()['suggestions']
+        assert [(s['type'], s['id'], s['label']) for s in suggestions] == [('person', jane.id, 'Jane Doe')], query
+
+    assert client.get('/api/search/typeahead?q=j', headers=headers).get_json()['suggestions'] == []
+
+
+def test_typeahead_keeps_up_with_typing(client, make_user, rate_limits):
+    _, headers = make_user('typist')
+    # Four searches, a request per keystroke: well past the hourly default
+    for _ in range(4):
+        for typed in range(1, len('software engineering') + 1):
+            response = client.get(f"/api/search/typeahead?q={'software engineering'[:typed]}", headers=headers)
+            assert response.status_code == 200
+
+
+def test_documents_follow_post_deletes_and_profile_edits(client, make_user):
+    user, headers = make_user('editor')
+    post = _post(client, headers, 'Temporary #draft')
+    client.delete(f"/api/posts/{post['id']}", headers=headers)
+    assert client.get('/api/search?q=draft', headers=headers).get_json()['results'] == []
+
+    client.put('/api/profile', headers=headers, json={'full_name': 'Old Name'})
+    client.put('/api/profile', headers=headers, json={'full_name': 'New Name'})
+    assert client.get('/api/search?q=old', headers=headers).get_json()['results'] == []
+    assert _results(client.get('/api/search?q=new', headers=headers).get_json()) == [('person', user.id)]
+    assert SearchDocument.query.filter_by(kind='person', ref_id=user.id).count() == 1
+
+
+def test_signup_makes_the_user_findable(client, make_user):
+    _, headers = make_user('viewer')
+    client.post('/api/signup', json={'username': 'newcomer', 'email': 'n@example.com', 'password': 'password123'})
+
+    suggestions = client.get('/api/search/typeahead?q=newc', headers=headers).get_json()['suggestions']
+    assert [s['username'] for s in suggestions] == ['newcomer']
@@ -0,0 +1,54 @@
+"""
+Tests for declarative serializers and the JSON provider
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from utils.serializers import Field, Nested, Serializer, dumps, loads
+
+
+def test_serializer_reads_paths_fields_nested_objects_and_functions():
+    author = SimpleNamespace(id=7, username='ada')
+    post = SimpleNamespace(id=1, content='Hi', author=author, image_url=None, likes=3)
+    serialize = Serializer(
+        id='id',
+        username='author.username',
+        image=Field('image_url', str.upper, optional=True),
+        user=Nested('author', Serializer(id='id', username='username')),
+        summary=Serializer(content='content'),
+        doubled=lambda row: row.likes * 2,
+    )
+
+    assert serialize(post) == {'id': 1, 'username': 'ada', 'image': None, 'user': {'id': 7, 'username': 'ada'},
+                               'summary': {'content': 'Hi'}, 'doubled': 6}
+    post.image_url = 'a.png'
+    assert serialize.many([post])[0]['image'] == 'A.PNG'
+    post.author = None
+    assert Serializer(user=Nested('author', Serializer(id='id')))(post) == {'user': None}
+
+
+def test_serializer_rejects_paths_that_are_not_attributes():
+    for path in ('author.__class__()', 'a; import os', 'a..b'):
+        try:
+            Serializer(bad=path)
+        except ValueError:
+            continue
+        raise AssertionError(path)
+
+
+def test_json_encodes_datetimes_as_iso_8601():
+    moment = datetime(2026, 10, 18, 12, 30, 5, 250)
+
+    assert loads(dumps({'at': moment, 'price': Decimal('1.5'), 1: 'x'})) == {
+        'at': moment.isoformat(), 'price': 1.5, '1': 'x'}
+
+
+def test_api_responses_carry_iso_timestamps(client, make_user):
+    _, headers = make_user('author')
+    created = client.post('/api/posts', headers=headers, json={'content': 'Hello'}).get_json()['post']
+
+    listed = client.get('/api/posts', headers=headers).get_json()['posts'][0]
+    assert listed == created
+    assert datetime.fromisoformat(listed['created_at'])
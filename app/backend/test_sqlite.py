@@ -0,0 +1,123 @@
+"""
+Tests for the SQLite production profile: pragmas and the serialized write path
+"""
+
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import services.sqlite as sqlite_profile
+from services.sqlite import SharedConnection, apply_pragmas, configure_sqlite, serialized_write
+
+
+def test_pragmas_apply_to_every_connection(app, tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "app.db"}')
+    apply_pragmas(engine, app.config['SQLITE_PRAGMAS'])
+
+    with engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_PRAGMAS']['busy_timeout']
+    engine.dispose()
+
+
+@pytest.fixture
+def write_lock(app, tmp_path, monkeypatch):
+    """Turn on the write lock as a file-backed deployment would"""
+    monkeypatch.setitem(app.extensions, 'sqlite_write_lock', str(tmp_path / 'app.db.write-lock'))
+    monkeypatch.setattr(sqlite_profile, 'RETRY_BASE_DELAY', 0)
+
+
+def _locked():
+    return OperationalError('INSERT', {}, sqlite3.OperationalError('database is locked'))
+
+
+def test_serialized_write_retries_when_sqlite_is_busy(app, write_lock):
+    calls = []
+
+    @serialized_write
+    def view():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _locked()
+        return 'ok'
+
+    with app.test_request_context():
+        assert view() == 'ok'
+    assert len(calls) == 3
+
+
+def test_serialized_write_retries_lock_errors_the_view_swallowed(app, write_lock, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'SQLITE_PRAGMAS', {'busy_timeout': 0})
+    engine = create_engine(f'sqlite:///{tmp_path / "app.db"}')
+    configure_sqlite(app, engine)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE note (body TEXT)'))
+
+    blocker = sqlite3.connect(str(tmp_path / 'app.db'))
+    blocker.execute('BEGIN EXCLUSIVE')
+    calls = []
+
+    @serialized_write
+    def view():
+        calls.append(1)
+        if len(calls) == 2:
+            blocker.rollback()
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO note VALUES ('hi')"))
+            return 'ok'
+        except Exception:
+            return 'error'
+
+    with app.test_request_context():
+        assert view() == 'ok'
+    assert len(calls) == 2
+    blocker.close()
+    engine.dispose()
+
+
+def test_serialized_write_gives_up_after_the_retry_budget(app, write_lock):
+    @serialized_write
+    def view():
+        raise _locked()
+
+    with app.test_request_context(), pytest.raises(OperationalError):
+        view()
+
+
+def test_other_database_errors_are_not_retried(app, write_lock):
+    calls = []
+
+    @serialized_write
+    def view():
+        calls.append(1)
+        raise OperationalError('INSERT', {}, sqlite3.OperationalError('no such table: post'))
+
+    with app.test_request_context(), pytest.raises(OperationalError):
+        view()
+    assert len(calls) == 1
+
+
+def test_side_stores_open_one_connection_per_process(tmp_path, monkeypatch):
+    connects = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(sqlite3, 'connect', lambda *args, **kwargs: connects.append(args) or connect(*args, **kwargs))
+    shared = SharedConnection(str(tmp_path / 'side.db'), 'CREATE TABLE IF NOT EXISTS hit (n INTEGER);')
+
+    def write(n):
+        with shared as connection:
+            connection.execute('INSERT INTO hit (n) VALUES (?)', [n])
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with shared as connection:
+        assert connection.execute('SELECT count(*) FROM hit').fetchone() == (8,)
+    assert len(connects) == 1
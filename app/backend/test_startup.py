@@ -0,0 +1,44 @@
+"""
+Tests for the boot-time database phase
+"""
+
+import pytest
+from sqlalchemy import text
+
+from models.user import db
+from startup import SchemaError, prepare_database, verify_schema
+
+
+@pytest.fixture
+def empty_db(app):
+    db.drop_all()
+    yield
+    db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+
+
+def test_prepare_database_migrates_and_verifies(app, empty_db):
+    prepare_database(app)
+
+    tables = set(db.inspect(db.engine).get_table_names())
+    assert set(db.metadata.tables) <= tables
+
+
+def test_verify_schema_reports_missing_tables(app, empty_db):
+    prepare_database(app)
+    db.session.execute(text('DROP TABLE post_like'))
+    db.session.commit()
+
+    with pytest.raises(SchemaError, match='post_like'):
+        verify_schema(app)
+
+
+def test_write_endpoints_do_not_inspect_the_schema(client, make_user, count_queries):
+    _, headers = make_user('author')
+
+    with count_queries() as statements:
+        client.post('/api/posts', headers=headers, json={'content': 'Hello'})
+        client.post('/api/profile/photo', headers=headers,
+                    json={'photo_url': 'data:image/png;base64,iVBORw0KGgo='})
+
+    assert not any('sqlite_master' in statement or 'PRAGMA' in statement for statement, _ in statements)
@@ -0,0 +1,83 @@
+"""
+Tests for hashtag pages and trending topics
+"""
+
+from datetime import datetime, timedelta
+
+from models.tag import PostTag, TagCount
+from models.user import db
+from services.tags import bucket_start, prune_counts
+
+
+def _post(client, headers, content):
+    return client.post('/api/posts', headers=headers, json={'content': content}).get_json()['post']
+
+
+def _trending(client, headers):
+    return [(t['tag'], t['count']) for t in client.get('/api/tags/trending', headers=headers).get_json()['tags']]
+
+
+def test_hashtags_are_extracted_once_per_post_and_case_insensitively(client, make_user):
+    _, headers = make_user('poster')
+    post = _post(client, headers, 'Hello #React and #threejs, more #react')
+
+    assert sorted(t.tag for t in PostTag.query.filter_by(post_id=post['id'])) == ['react', 'threejs']
+    body = client.get('/api/tags/%23REACT/posts', headers=headers).get_json()
+    assert body['tag'] == 'react'
+    assert [p['id'] for p in body['posts']] == [post['id']]
+
+
+def test_tag_posts_page_newest_first_by_keyset(client, make_user):
+    _, headers = make_user('poster')
+    ids = [_post(client, headers, f'Post {i} #career')['id'] for i in range(5)]
+    _post(client, headers, 'Unrelated #other')
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/tags/career/posts?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=headers).get_json()
+        seen += [p['id'] for p in body['posts']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert seen == ids[::-1]
+
+
+def test_trending_counts_posts_in_the_window_and_follows_deletes(client, make_user):
+    _, headers = make_user('poster')
+    _post(client, headers, '#python #webdev')
+    doomed = _post(client, headers, '#python')
+    _post(client, headers, '#python')
+    assert _trending(client, headers) == [('python', 3), ('webdev', 1)]
+
+    client.delete(f"/api/posts/{doomed['id']}", headers=headers)
+    assert _trending(client, headers) == [('python', 2), ('webdev', 1)]
+    assert client.get('/api/tags/python/posts', headers=headers).get_json()['posts'][0]['id'] != doomed['id']
+
+
+def test_trending_window_slides_over_hourly_buckets(app, client, make_user):
+    _, headers = make_user('viewer')
+    now = bucket_start(datetime.utcnow())
+    window = app.config['TRENDING_WINDOW_HOURS']
+    db.session.add_all([
+        TagCount(tag='fresh', bucket=now, count=2),
+        TagCount(tag='fresh', bucket=now - timedelta(hours=window - 1), count=1),
+        TagCount(tag='stale', bucket=now - timedelta(hours=window), count=50),
+    ])
+    db.session.commit()
+
+    assert _trending(client, headers) == [('fresh', 3)]
+
+    prune_counts(now=now + timedelta(hours=app.config['TRENDING_RETENTION_HOURS'] - window + 1))
+    db.session.commit()
+    assert [c.tag for c in TagCount.query] == ['fresh', 'fresh']
+
+
+def test_trending_reads_counters_not_post_history(client, make_user, count_queries):
+    _, headers = make_user('poster')
+    for _ in range(3):
+        _post(client, headers, '#startup')
+
+    with count_queries() as statements:
+        client.get('/api/tags/trending', headers=headers)
+    assert not any('post_tag' in statement or 'FROM post' in statement for statement, _ in statements)
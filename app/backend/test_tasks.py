@@ -0,0 +1,135 @@
+"""
+Tests for the background task queue and worker
+"""
+
+import time
+
+import pytest
+
+from services.tasks import HANDLERS, SQLiteTaskQueue, Worker, enqueue, get_task_queue, retry_delay
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    """Register test handlers that record their calls; 'test.flaky' raises until told otherwise"""
+    calls = []
+    failures = {'left': 0}
+
+    def record(**payload):
+        calls.append(payload)
+
+    def flaky(**payload):
+        calls.append(payload)
+        if failures['left']:
+            failures['left'] -= 1
+            raise RuntimeError('boom')
+
+    monkeypatch.setitem(HANDLERS, 'test.record', record)
+    monkeypatch.setitem(HANDLERS, 'test.flaky', flaky)
+    return calls, failures
+
+
+def test_tasks_run_once_and_are_marked_done(app, handled, run_tasks):
+    calls, _ = handled
+    assert enqueue('test.record', {'n': 1})
+    assert enqueue('test.record', {'n': 2})
+
+    assert run_tasks() == 2
+    assert calls == [{'n': 1}, {'n': 2}]
+    assert run_tasks() == 0
+    assert get_task_queue().stats() == {'queued': 0, 'running': 0, 'done': 2, 'failed': 0}
+
+
+def test_idempotency_keys_queue_work_once(app, handled, run_tasks):
+    calls, _ = handled
+    assert enqueue('test.record', {'n': 1}, key='same')
+    assert not enqueue('test.record', {'n': 2}, key='same')
+    run_tasks()
+    assert not enqueue('test.record', {'n': 3}, key='same')
+
+    assert calls == [{'n': 1}]
+    get_task_queue().prune(older_than=-1)
+    assert enqueue('test.record', {'n': 4}, key='same')
+
+
+def test_unknown_tasks_are_rejected_at_enqueue(app):
+    with pytest.raises(ValueError):
+        enqueue('test.missing')
+
+
+def test_failures_are_retried_with_backoff_then_kept_as_failed(app, handled, monkeypatch):
+    calls, failures = handled
+    monkeypatch.setitem(app.config, 'TASK_MAX_ATTEMPTS', 3)
+    monkeypatch.setitem(app.config, 'TASK_RETRY_BASE_DELAY', 60)
+    failures['left'] = 10
+    queue = get_task_queue()
+    worker = Worker(app)
+    enqueue('test.flaky', {'n': 1}, key='flaky')
+
+    assert worker.run_once() == 1
+    assert worker.run_once() == 0  # backing off
+    for _ in range(2):
+        monkeypatch.setattr(time, 'time', lambda now=time.time(): now + 3600)
+        assert worker.run_once() == 1
+
+    assert len(calls) == 3
+    assert queue.stats()['failed'] == 1
+    [failed] = queue.failed()
+    assert (failed['name'], failed['attempts'], failed['error']) == ('test.flaky', 3, 'RuntimeError: boom')
+
+    # Queueing the same key again re-arms the dead task
+    failures['left'] = 0
+    assert enqueue('test.flaky', {'n': 1}, key='flaky')
+    assert worker.run_until_idle() == 1
+    assert queue.stats() == {'queued': 0, 'running': 0, 'done': 1, 'failed': 0}
+
+
+def test_retry_delay_doubles_up_to_the_cap(app):
+    config = {'TASK_RETRY_BASE_DELAY': 2, 'TASK_RETRY_MAX_DELAY': 10}
+    for attempts, delay in ((1, 2), (2, 4), (3, 8), (10, 10)):
+        assert delay / 2 <= retry_delay(attempts, config) <= delay
+
+
+def test_expired_leases_are_claimed_again(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / 'tasks.db'))
+    queue.enqueue('test.record', {'n': 1}, max_attempts=2)
+
+    [first] = queue.claim(10, visibility_timeout=-1)  # its worker died holding it
+    [second] = queue.claim(10, visibility_timeout=60)
+    assert (second.id, second.attempts) == (first.id, 2)
+    assert queue.claim(10, visibility_timeout=60) == []
+
+    assert not queue.complete(first)
+    assert queue.complete(second)
+
+
+def test_a_task_that_outlives_its_last_lease_fails(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / 'tasks.db'))
+    queue.enqueue('test.record', {}, max_attempts=1)
+
+    assert len(queue.claim(10, visibility_timeout=-1)) == 1
+    assert queue.claim(10, visibility_timeout=60) == []
+    assert queue.failed()[0]['error'] == 'Lease expired on the last attempt'
+
+
+def test_stopping_hands_the_rest_of_the_batch_back(app, handled):
+    calls, _ = handled
+    worker = Worker(app)
+    HANDLERS['test.record'] = lambda **payload: (calls.append(payload), worker.stop())
+    for n in range(3):
+        enqueue('test.record', {'n': n})
+
+    assert worker.run_once() == 3
+    assert calls == [{'n': 0}]
+    assert get_task_queue().stats()['queued'] == 2
+    assert Worker(app).run_until_idle() == 2
+
+
+def test_new_posts_are_fanned_out_by_the_worker(client, make_user, run_tasks):
+    _, headers = make_user('author')
+    post = client.post('/api/posts', headers=headers, json={'content': 'Hello'}).get_json()['post']
+
+    assert get_task_queue().stats()['queued'] == 1
+    assert not enqueue('feed.fan_out', {'post_id': post['id']}, key=f"fan-out:{post['id']}")
+    assert run_tasks() == 1
+    assert client.get('/').get_json()['tasks']['done'] == 1
@@ -0,0 +1,67 @@
+"""
+Tests for serving /uploads with cache validators and ranges
+"""
+
+from services.blob_store import get_blob_store
+from services.uploads import accel_location, send_upload
+
+PNG_BYTES = b'\x89PNG\r\n\x1a\n' + bytes(range(256))
+
+
+def _stored_blob():
+    return get_blob_store().put_bytes(PNG_BYTES, 'png')
+
+
+def test_uploads_are_immutable_with_strong_etag(app, client):
+    with app.app_context():
+        url = _stored_blob()
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.data == PNG_BYTES
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/')
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_uploads_answer_range_requests(app, client):
+    with app.app_context():
+        url = _stored_blob()
+
+    response = client.get(url, headers={'Range': 'bytes=0-7'})
+
+    assert response.status_code == 206
+    assert response.data == PNG_BYTES[:8]
+    assert response.headers['Content-Range'] == f'bytes 0-7/{len(PNG_BYTES)}'
+
+
+def test_x_accel_mode_hands_off_to_nginx(app, client, monkeypatch):
+    with app.app_context():
+        url = _stored_blob()
+    monkeypatch.setitem(app.config, 'UPLOADS_SENDFILE_MODE', 'x-accel')
+
+    response = client.get(url)
+    assert response.data == b''
+    assert response.headers['X-Accel-Redirect'] == '/protected-blobs/' + url[len('/uploads/blobs/'):]
+    assert 'immutable' in response.headers['Cache-Control']
+
+
+def test_x_accel_sends_files_outside_its_roots_itself(app, tmp_path, monkeypatch):
+    elsewhere = tmp_path / 'elsewhere'
+    elsewhere.mkdir()
+    (elsewhere / 'shot.png').write_bytes(PNG_BYTES)
+    monkeypatch.setitem(app.config, 'UPLOADS_SENDFILE_MODE', 'x-accel')
+
+    with app.test_request_context('/uploads/shot.png'):
+        assert accel_location(str(elsewhere / 'shot.png')) is None
+        response = send_upload(str(elsewhere), 'shot.png')
+        response.direct_passthrough = False
+        assert 'X-Accel-Redirect' not in response.headers
+        assert response.get_data() == PNG_BYTES
+
+
+def test_missing_upload_is_404(client):
+    assert client.get('/uploads/blobs/00/00/missing.png').status_code == 404
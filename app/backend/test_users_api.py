@@ -0,0 +1,68 @@
+"""
+Tests for public profiles and user cards
+"""
+
+import base64
+
+PNG_DATA_URL = 'data:image/png;base64,' + base64.b64encode(base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)).decode()
+
+
+def test_public_profile_hides_the_email(client, make_user):
+    member, member_headers = make_user('member')
+    _, headers = make_user('viewer')
+    client.put('/api/profile', headers=member_headers, json={'full_name': 'Ada Member', 'bio': 'Hello'})
+
+    body = client.get(f'/api/users/{member.id}/profile', headers=headers).get_json()
+    assert body['user'] == {'id': member.id, 'username': 'member'}
+    assert (body['profile']['full_name'], body['profile']['bio']) == ('Ada Member', 'Hello')
+    assert client.get('/api/profile', headers=member_headers).get_json()['user']['email'] == 'member@example.com'
+    assert client.get('/api/users/999999/profile', headers=headers).status_code == 404
+
+
+def test_cards_load_in_one_query_and_then_only_the_misses(client, make_user, count_queries):
+    _, headers = make_user('viewer')
+    users = [make_user(f'member{i}')[0] for i in range(5)]
+    ids = ','.join(str(user.id) for user in users[:3])
+
+    with count_queries() as statements:
+        cards = client.get(f'/api/users/cards?ids={ids},999999', headers=headers).get_json()['cards']
+    assert len(statements) == 1
+    assert list(cards) == [str(user.id) for user in users[:3]]
+    assert cards[str(users[0].id)]['username'] == 'member0'
+
+    ids = ','.join(str(user.id) for user in users)
+    with count_queries() as statements:
+        cards = client.get(f'/api/users/cards?ids={ids}', headers=headers).get_json()['cards']
+    assert len(statements) == 1
+    _, parameters = statements[0]
+    assert {users[3].id, users[4].id} <= set(parameters) and users[0].id not in parameters
+    assert len(cards) == 5
+
+
+def test_cards_show_headline_and_avatar_and_follow_profile_edits(client, make_user):
+    member, member_headers = make_user('member')
+    _, headers = make_user('viewer')
+
+    def card():
+        return client.get(f'/api/users/cards?ids={member.id}', headers=headers).get_json()['cards'][str(member.id)]
+
+    assert card() == {'id': member.id, 'username': 'member', 'full_name': 'member', 'headline': None,
+                      'avatar': None}
+    client.put('/api/profile', headers=member_headers, json={'full_name': 'Ada Member'})
+    client.post('/api/profile/experience', headers=member_headers,
+                json={'title': 'Engineer', 'company': 'Peer', 'start_date': '2024'})
+    photo = client.post('/api/profile/photo', headers=member_headers, json={'photo_url': PNG_DATA_URL}).get_json()
+
+    assert card() == {'id': member.id, 'username': 'member', 'full_name': 'Ada Member',
+                      'headline': 'Engineer at Peer', 'avatar': photo['photo']['url']}
+
+
+def test_cards_reject_bad_and_too_many_ids(client, make_user):
+    _, headers = make_user('viewer')
+
+    assert client.get('/api/users/cards?ids=1,x', headers=headers).status_code == 400
+    ids = ','.join(str(i) for i in range(201))
+    assert client.get(f'/api/users/cards?ids={ids}', headers=headers).status_code == 400
+    assert client.get('/api/users/cards', headers=headers).get_json() == {'cards': {}}
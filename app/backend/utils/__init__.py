@@ -0,0 +1,6 @@
+from .pagination import CursorPage, InvalidCursor
+
+__all__ = [
+    'CursorPage',
+    'InvalidCursor'
+]
@@ -0,0 +1,162 @@
+"""
+Full-text search on the database's own inverted index.
+
+SQLite gets an external-content FTS5 table (`<table>_fts`) kept in sync by
+insert/update/delete triggers. PostgreSQL gets a generated, weighted
+`search_vector` tsvector column with a GIN index. Either way the index is
+maintained by the database on every write, and queries rank with bm25 or
+ts_rank_cd.
+
+Facet columns, such as the type of a row, count matches by value. SQLite
+indexes them in the FTS table next to the text, so counting never reads the
+content table.
+
+A FullTextIndex installs its DDL whenever its table is created (tests,
+create_all) and exposes the same statements to migrations.
+"""
+
+import re
+
+from sqlalchemy import Float, column, event, func, literal, literal_column, select, table
+
+WORD = re.compile(r'\w+', re.UNICODE)
+HASHTAG = re.compile(r'#(\w+)', re.UNICODE)
+
+# PostgreSQL weight classes for column weights, highest first
+PG_WEIGHTS = 'ABCD'
+
+
+def search_terms(q, limit=8):
+    """Split user input into plain word tokens; FTS syntax characters are dropped"""
+    return WORD.findall(q or '')[:limit]
+
+
+def hashtags(text):
+    """Distinct lower-cased hashtags in `text`, in order of appearance"""
+    return list(dict.fromkeys(tag.lower() for tag in HASHTAG.findall(text or '')))
+
+
+class FullTextIndex:
+    """Inverted index over `columns` of `table`, weighted for ranking"""
+
+    def __init__(self, indexed_table, columns, weights, stem=True, prefix=None, facets=()):
+        self.table = indexed_table
+        self.columns = columns
+        self.weights = weights
+        # Exact-match columns that matches are counted by (count_statement)
+        self.facets = list(facets)
+        # Stemming matches "engineers" to "engineer" but gets in the way of
+        # prefix matching on partly typed words and names
+        self.tokenize = 'porter unicode61' if stem else 'unicode61 remove_diacritics 2'
+        self.pg_config = 'english' if stem else 'simple'
+        # SQLite only: prefix lengths (e.g. '2 3') FTS5 keeps extra index
+        # entries for, so short prefix queries read one doclist
+        self.prefix = prefix
+        self.name = f'{indexed_table.name}_fts'
+        self.fts = table(self.name, column('rowid'))
+        event.listen(indexed_table, 'after_create', self._after_create)
+        event.listen(indexed_table, 'before_drop', self._before_drop)
+
+    def create_statements(self, dialect):
+        table_name, name = self.table.name, self.name
+        if dialect == 'sqlite':
+            indexed = self.columns + self.facets
+            columns = ', '.join(indexed)
+            new_values = ', '.join(f'new.{c}' for c in indexed)
+            old_values = ', '.join(f'old.{c}' for c in indexed)
+            delete_old = (f"INSERT INTO {name}({name}, rowid, {columns}) "
+                          f"VALUES ('delete', old.id, {old_values});")
+            insert_new = f"INSERT INTO {name}(rowid, {columns}) VALUES (new.id, {new_values});"
+            options = f", prefix='{self.prefix}'" if self.prefix else ''
+            return [
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({columns}, "
+                f"content='{table_name}', content_rowid='id', tokenize='{self.tokenize}'{options})",
+                f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {table_name} BEGIN {insert_new} END",
+                f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {table_name} BEGIN {delete_old} END",
+                f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE ON {table_name} BEGIN {delete_old} {insert_new} END",
+                # Index rows that existed before the table was indexed
+                f"INSERT INTO {name}({name}) VALUES ('rebuild')",
+            ]
+        if dialect == 'postgresql':
+            vector = ' || '.join(
+                f"setweight(to_tsvector('{self.pg_config}', coalesce({c}, '')), '{PG_WEIGHTS[min(rank, 3)]}')"
+                for rank, c in self._columns_by_weight()
+            )
+            return [
+                f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS search_vector tsvector '
+                f'GENERATED ALWAYS AS ({vector}) STORED',
+                f'CREATE INDEX IF NOT EXISTS ix_{table_name}_search_vector ON "{table_name}" USING GIN (search_vector)',
+            ]
+        return []
+
+    def drop_statements(self, dialect):
+        if dialect == 'sqlite':
+            return [f'DROP TABLE IF EXISTS {self.name}']
+        if dialect == 'postgresql':
+            return [f'DROP INDEX IF EXISTS ix_{self.table.name}_search_vector',
+                    f'ALTER TABLE "{self.table.name}" DROP COLUMN IF EXISTS search_vector']
+        return []
+
+    def _columns_by_weight(self):
+        distinct = sorted(set(self.weights), reverse=True)
+        return [(distinct.index(w), c) for c, w in zip(self.columns, self.weights)]
+
+    def _after_create(self, target, connection, **kw):
+        for statement in self.create_statements(connection.dialect.name):
+            connection.exec_driver_sql(statement)
+
+    def _before_drop(self, target, connection, **kw):
+        # The PostgreSQL column goes with its table; only SQLite's FTS table is separate
+        if connection.dialect.name == 'sqlite':
+            for statement in self.drop_statements('sqlite'):
+                connection.exec_driver_sql(statement)
+
+    def row_id(self, dialect):
+        """The matched row's id; on SQLite the FTS rowid, which FTS5 can return in order without sorting"""
+        return self.fts.c.rowid if dialect == 'sqlite' else self.table.c.id
+
+    def _match(self, terms, prefix, facet_values):
+        # Each term and value quoted, so user input is never parsed as FTS5 syntax
+        match = ' '.join(f'"{t}"' + ('*' if prefix else '') for t in terms)
+        if self.facets:
+            match = f"{{{' '.join(self.columns)}}} : ({match})"
+        for name, value in facet_values.items():
+            escaped = str(value).replace('"', '""')
+            match += f' AND {name} : "{escaped}"'
+        return literal(match)
+
+    def _tsquery(self, terms, prefix):
+        return func.to_tsquery(self.pg_config, literal(
+            ' & '.join(t + (':*' if prefix else '') for t in terms)
+        ))
+
+    def search(self, query, dialect, terms, prefix=False):
+        """Restrict `query` to rows matching every term; returns (query, score), higher score first"""
+        if dialect == 'sqlite':
+            fts = literal_column(self.name)
+            query = query.join(self.fts, self.fts.c.rowid == self.table.c.id) \
+                .filter(fts.op('MATCH')(self._match(terms, prefix, {})))
+            weights = [float(w) for w in self.weights] + [0.0] * len(self.facets)
+            score = -func.bm25(fts, *weights, type_=Float)
+            return query, score
+        if dialect == 'postgresql':
+            tsquery = self._tsquery(terms, prefix)
+            vector = literal_column(f'"{self.table.name}".search_vector')
+            score = func.ts_rank_cd(vector, tsquery, type_=Float)
+            return query.filter(vector.op('@@')(tsquery)), score
+        raise NotImplementedError(f'Full-text search is not available on {dialect}')
+
+    def count_statement(self, dialect, terms, prefix=False, **facet_values):
+        """SELECT of the number of rows matching every term and facet value"""
+        if dialect == 'sqlite':
+            fts = literal_column(self.name)
+            return select(func.count()).select_from(self.fts) \
+                .where(fts.op('MATCH')(self._match(terms, prefix, facet_values)))
+        if dialect == 'postgresql':
+            vector = literal_column(f'"{self.table.name}".search_vector')
+            statement = select(func.count()).select_from(self.table) \
+                .where(vector.op('@@')(self._tsquery(terms, prefix)))
+            for name, value in facet_values.items():
+                statement = statement.where(self.table.c[name] == value)
+            return statement
+        raise NotImplementedError(f'Full-text search is not available on {dialect}')
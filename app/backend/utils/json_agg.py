@@ -0,0 +1,27 @@
+"""
+Portable JSON aggregation, for loading child rows alongside their parent in
+one query instead of one query per relationship.
+"""
+
+import json
+
+from sqlalchemy import func, literal, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+
+def json_array_agg(dialect, fields, order_by):
+    """Aggregate rows into a JSON array of {name: column} objects; '[]' when there are none"""
+    pairs = [item for name, column in fields.items() for item in (literal(name), column)]
+    if dialect == 'postgresql':
+        return func.coalesce(
+            func.json_agg(aggregate_order_by(func.json_build_object(*pairs), order_by)),
+            literal_column("'[]'::json")
+        )
+    # SQLite aggregates in scan order, which is id order when the rows are
+    # found through an index on their parent's id
+    return func.json_group_array(func.json_object(*pairs))
+
+
+def load_json(value):
+    """Drivers return JSON aggregates parsed (psycopg) or as text (sqlite3)"""
+    return json.loads(value) if isinstance(value, str) else value
@@ -0,0 +1,84 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are selected with an index seek on the ordering columns
+(`WHERE (created_at, id) < (:created_at, :id)`) instead of OFFSET, so the
+cost of a page does not depend on how deep into the listing it is.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor or page size from the client cannot be used"""
+
+
+def encode_cursor(values):
+    """Pack the ordering values of the last row into an opaque token"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Unpack a token produced by encode_cursor using the column types"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise InvalidCursor("Invalid cursor")
+        values = []
+        for value, column in zip(payload, columns):
+            python_type = column.type.python_type
+            if python_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            else:
+                values.append(python_type(value))
+        return values
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+class CursorPage:
+    """A requested page: `limit` rows after `cursor`, newest first"""
+
+    def __init__(self, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        self.limit = limit
+        self.cursor = cursor
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a page from `limit`/`cursor` query params, or None when neither is given"""
+        if 'limit' not in args and 'cursor' not in args:
+            return None
+        try:
+            limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise InvalidCursor("limit must be an integer")
+        if limit < 1:
+            raise InvalidCursor("limit must be positive")
+        return cls(min(limit, MAX_PAGE_SIZE), args.get('cursor') or None)
+
+    def apply(self, query, *columns):
+        """Order `query` by `columns` descending and seek past the cursor"""
+        self.columns = columns
+        if self.cursor:
+            values = decode_cursor(self.cursor, columns)
+            query = query.filter(tuple_(*columns) < tuple_(*values))
+        return query.order_by(None).order_by(*[c.desc() for c in columns]).limit(self.limit + 1)
+
+    def finish(self, items, key):
+        """Trim the look-ahead row and return (items, next_cursor)"""
+        if len(items) <= self.limit:
+            return items, None
+        items = items[:self.limit]
+        return items, encode_cursor(key(items[-1]))
@@ -0,0 +1,163 @@
+"""
+Declarative row serializers and the app's JSON provider.
+
+A Serializer lists the fields of a payload once:
+
+    serialize_post = Serializer(
+        id='id',
+        created_at='created_at',
+        user=Nested('author', Serializer(id='id', username='username')),
+        image_srcset=Field('image_url', srcset_for),
+    )
+
+and compiles them into a single function whose body is one dict display
+(`{'id': row.id, 'user': {...}, ...}`), so serializing a row costs the
+attribute reads and nothing else. Values stay Python objects: datetimes go
+out as they are and the JSON provider writes them as ISO 8601.
+
+The provider uses orjson, which encodes datetimes natively and several
+times faster than the standard library. Without orjson installed the app
+falls back to the stdlib encoder with the same datetime format.
+"""
+
+import datetime
+import decimal
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder produces the same JSON
+    orjson = None
+
+
+class Field:
+    """The value at `path` on the row, passed through convert() if given; convert is skipped for None when optional"""
+
+    def __init__(self, path, convert=None, optional=False):
+        self.path = path
+        self.convert = convert
+        self.optional = optional
+
+
+class Nested:
+    """A nested payload built by `serializer` from the object at `path`; None when that is None"""
+
+    def __init__(self, path, serializer):
+        self.path = path
+        self.serializer = serializer
+
+
+def _attribute(source, path):
+    parts = path.split('.')
+    if not all(part.isidentifier() for part in parts):
+        raise ValueError(f"Invalid attribute path {path!r}")
+    return '.'.join([source, *parts])
+
+
+class Serializer:
+    """Declarative row-to-dict serializer, compiled to one function.
+
+    Each keyword is an output key; its value is an attribute path ('author.id'),
+    a Field, a Nested serializer, another Serializer over the same row, or a
+    function of the row.
+    """
+
+    def __init__(self, **fields):
+        self.fields = fields
+        namespace = {}
+        source = f"def serialize(row):\n    return {self._display('row', namespace)}\n"
+        exec(compile(source, f"<serializer {', '.join(fields)}>", 'exec'), namespace)
+        self._serialize = namespace['serialize']
+
+    def _display(self, source, namespace):
+        """Source of the dict display that serializes the object named `source`"""
+        return '{' + ', '.join(
+            f'{name!r}: {self._value(spec, source, namespace)}' for name, spec in self.fields.items()
+        ) + '}'
+
+    @staticmethod
+    def _bind(namespace, value):
+        name = f'_v{len(namespace)}'
+        namespace[name] = value
+        return name
+
+    def _value(self, spec, source, namespace):
+        if isinstance(spec, str):
+            return _attribute(source, spec)
+        if isinstance(spec, Field):
+            value = _attribute(source, spec.path)
+            if spec.convert is None:
+                return value
+            convert = self._bind(namespace, spec.convert)
+            if not spec.optional:
+                return f'{convert}({value})'
+            local = self._bind(namespace, None)
+            return f'(None if ({local} := {value}) is None else {convert}({local}))'
+        if isinstance(spec, Serializer):
+            return spec._display(source, namespace)
+        if isinstance(spec, Nested):
+            local = self._bind(namespace, None)
+            return (f'(None if ({local} := {_attribute(source, spec.path)}) is None '
+                    f'else {spec.serializer._display(local, namespace)})')
+        if callable(spec):
+            return f'{self._bind(namespace, spec)}({source})'
+        raise TypeError(f"Unsupported serializer field {spec!r}")
+
+    def __call__(self, row):
+        return self._serialize(row)
+
+    def many(self, rows):
+        serialize = self._serialize
+        return [serialize(row) for row in rows]
+
+
+def _default(value):
+    """Types neither encoder handles on its own"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return _default(value)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumpb(value):
+        """JSON bytes for `value`"""
+        return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumpb(value):
+        """JSON bytes for `value`"""
+        return json.dumps(value, default=_stdlib_default, separators=(',', ':')).encode()
+
+    loads = json.loads
+
+
+def dumps(value):
+    """JSON text for `value`"""
+    return dumpb(value).decode()
+
+
+class AppJSONProvider(DefaultJSONProvider):
+    """Flask JSON through dumpb(): ISO 8601 datetimes, and orjson speed when installed"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        return self._app.response_class(dumpb(self._prepare_response_obj(args, kwargs)),
+                                        mimetype=self.mimetype)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Background task worker for Peer backend
+
+Runs the tasks the web workers queue (services.tasks) until SIGTERM or
+SIGINT, then finishes the task in hand and exits. Run one or more beside
+gunicorn on the same host: `python3 worker.py`, or `python3 worker.py --once`
+to drain what is due and exit.
+"""
+
+import signal
+import sys
+
+
+def run_worker(once=False):
+    from main import app
+    from services.tasks import Worker
+
+    worker = Worker(app)
+    if once:
+        print(f"⚙️ Ran {worker.run_until_idle()} tasks")
+        return
+
+    def _stop(signum, frame):
+        print(f"⚙️ Received signal {signum}, stopping after the current task...")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    run_worker(once='--once' in sys.argv[1:])